@@ -14,7 +14,13 @@ def t(key, default=None):
     return LANG.get("en", {}).get(key, default if default is not None else key)
 
 
-from services import document_processor, lightrag_service, supabase_service
+from services import (
+    document_processor,
+    ingestion_service,
+    lightrag_service,
+    supabase_service,
+    warmup,
+)
 import config
 import time
 from utils.helpers import count_words
@@ -135,6 +141,13 @@ def render_sidebar():
         if uploaded_files:
             for f in uploaded_files:
                 handle_file_upload(f)
+        if st.session_state.get("ingest_jobs"):
+            _render_ingest_jobs()
+        if warmup.enabled():
+            if warmup.status()["status"] == "warming":
+                _render_warmup_status()
+            else:
+                _warmup_caption(warmup.status())
 
         if st.session_state.documents:
             st.markdown(f"### {t('docs_section')}")
@@ -230,8 +243,8 @@ def render_sidebar():
             )
             st.session_state.rag_mode = st.selectbox(
                 t("rag_mode"),
-                ["hybrid", "local", "global", "naive"],
-                index=["hybrid", "local", "global", "naive"].index(
+                ["hybrid", "local", "global", "naive", "fusion"],
+                index=["hybrid", "local", "global", "naive", "fusion"].index(
                     st.session_state.rag_mode
                 ),
             )
@@ -331,6 +344,16 @@ def render_sidebar():
         )
 
 
+def _pending_path(base_name: str) -> str:
+    """Where an upload is parked until its ingestion job finishes."""
+    uid = (
+        st.session_state.user.id
+        if hasattr(st.session_state.get("user"), "id")
+        else "guest"
+    )
+    return os.path.join(config.LIGHTRAG_WORK_DIR, "documents", f".pending_{uid}_{base_name}")
+
+
 def handle_file_upload(uploaded_file):
     key = f"up_{uploaded_file.name}_{uploaded_file.size}"
     if key in st.session_state:
@@ -339,12 +362,134 @@ def handle_file_upload(uploaded_file):
         st.sidebar.error(f"❌ Unsupported format: {uploaded_file.name}")
         return
 
-    # Logical Versioning (v1, v2)
     base_name = uploaded_file.name
-    existing_docs = [d["filename"] for d in st.session_state.documents]
-    if base_name in existing_docs:
-        import re
 
+    # Save physical file to disk for Viewer
+    doc_dir = os.path.join(config.LIGHTRAG_WORK_DIR, "documents")
+    os.makedirs(doc_dir, exist_ok=True)
+    data = bytes(uploaded_file.getbuffer())
+    with open(_pending_path(base_name), "wb") as f:
+        f.write(data)
+
+    # Extraction + knowledge-graph insert run on the ingestion workers;
+    # _render_ingest_jobs polls them instead of blocking the UI.
+    try:
+        job_id = ingestion_service.submit(uploaded_file.name, data)
+    except Exception as e:
+        os.remove(_pending_path(base_name))
+        st.sidebar.error(f"❌ {str(e)}")
+        return
+    st.session_state.setdefault("ingest_jobs", {})[job_id] = {
+        "base_name": base_name,
+        "upload_key": key,
+    }
+    st.session_state[key] = True
+
+
+@st.fragment(run_every=2)
+def _render_ingest_jobs():
+    """Live progress of queued/running ingestion jobs; finalizes finished ones."""
+    jobs = st.session_state.get("ingest_jobs", {})
+    finished = False
+    for job_id, meta in list(jobs.items()):
+        job = ingestion_service.get_job(job_id)
+        if job is None:
+            jobs.pop(job_id, None)
+            continue
+
+        if job["status"] in ("queued", "running"):
+            label = (
+                t("ingest_queued")
+                if job["status"] == "queued"
+                else t(
+                    f"ingest_stage_{job['stage']}",
+                    ingestion_service.STAGE_LABELS.get(job["stage"], "…"),
+                )
+            )
+            st.progress(job["progress"], text=f"{meta['base_name']} · {label}")
+            # Once LightRAG is indexing the document it has to finish
+            if job["cancellable"] and st.button(
+                t("ingest_cancel"), key=f"cancel_{job_id}", use_container_width=True
+            ):
+                ingestion_service.cancel(job_id)
+            continue
+
+        if job["status"] == "completed":
+            _finalize_document(meta["base_name"], job["result"])
+        else:
+            if job["status"] == "failed":
+                st.session_state.toast_msg = f"❌ {meta['base_name']}: {job['error']}"
+            else:
+                st.session_state.toast_msg = t("ingest_cancelled").format(
+                    name=meta["base_name"]
+                )
+            st.session_state.pop(meta["upload_key"], None)
+            pending_path = _pending_path(meta["base_name"])
+            if os.path.exists(pending_path):
+                os.remove(pending_path)
+        jobs.pop(job_id, None)
+        ingestion_service.forget(job_id)
+        finished = True
+
+    if finished:
+        st.rerun()
+
+
+def _warmup_stage_label(stage: str) -> str:
+    return t(f"warmup_stage_{stage}", warmup.STAGE_LABELS[stage])
+
+
+def _warmup_caption(state: dict):
+    if state["status"] == "ready":
+        st.caption(t("warmup_ready").format(seconds=state["seconds"]))
+    elif state["status"] == "failed":
+        failed = [
+            _warmup_stage_label(s) for s, e in state["stages"].items() if e["status"] == "failed"
+        ]
+        st.caption(t("warmup_failed").format(stages=", ".join(failed)))
+    else:
+        marks = {"ready": "✓", "running": "…", "pending": "·", "failed": "✖"}
+        st.caption(
+            t("warmup_running").format(
+                stages=" · ".join(
+                    f"{_warmup_stage_label(s)} {marks[e['status']]}"
+                    for s, e in state["stages"].items()
+                )
+            )
+        )
+
+
+@st.fragment(run_every=2)
+def _render_warmup_status():
+    """Polls the background warm-up until it finishes."""
+    state = warmup.status()
+    _warmup_caption(state)
+    if state["status"] != "warming":
+        st.rerun()
+
+
+def _finalize_document(base_name: str, result: dict):
+    """Registers an ingested document in Supabase and the session."""
+    report = result.get("ingest_report", {})
+    doc_dir = os.path.join(config.LIGHTRAG_WORK_DIR, "documents")
+    uid = (
+        st.session_state.user.id
+        if hasattr(st.session_state.get("user"), "id")
+        else "guest"
+    )
+    pending_path = _pending_path(base_name)
+
+    existing = st.session_state.documents
+    fhash = result.get("file_hash")
+    if fhash and any(d.get("file_hash") == fhash for d in existing):
+        if os.path.exists(pending_path):
+            os.remove(pending_path)
+        st.session_state.toast_msg = t("doc_unchanged").format(name=base_name)
+        return
+
+    # Logical Versioning (v1, v2) — only for changed content under the same name
+    existing_docs = [d["filename"] for d in existing]
+    if base_name in existing_docs:
         version_count = sum(
             1 for d in existing_docs if d.startswith(base_name.rsplit(".", 1)[0])
         )
@@ -354,72 +499,58 @@ def handle_file_upload(uploaded_file):
         else:
             base_name = f"{base_name}_v{version_count + 1}"
 
-    with st.sidebar:
-        with st.spinner(f"📥 {base_name}..."):
-            try:
-                # Save physical file to disk for Viewer
-                import os
-
-                doc_dir = os.path.join(config.LIGHTRAG_WORK_DIR, "documents")
-                os.makedirs(doc_dir, exist_ok=True)
-                uid = (
-                    st.session_state.user.id
-                    if hasattr(st.session_state.get("user"), "id")
-                    else "guest"
-                )
-                safe_name = f"{uid}_{base_name}"
-                file_path = os.path.join(doc_dir, safe_name)
-                with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-
-                result = document_processor.process_to_chunks(
-                    uploaded_file, uploaded_file.name
-                )
-                if not result["full_text"].strip():
-                    st.error(f"❌ {t('no_text')}")
-                    return
-                # Quality check
-                quality = document_processor.document_quality_score(result)
-                # 3) Save to Supabase
-                doc_record = {}
-                try:
-                    uid = (
-                        st.session_state.user.id
-                        if hasattr(st.session_state.get("user"), "id")
-                        else None
-                    )
-                    doc_record = supabase_service.save_document(
-                        filename=base_name,
-                        page_count=result["page_count"],
-                        chunk_count=result.get("chunk_count", 0),
-                        user_id=uid,
-                    )
-                except Exception:  # Changed from except: to except Exception:
-                    pass
-                with st.spinner("🧠 Knowledge Graph..."):
-                    lightrag_service.insert_document(result["full_text"])
-                wc = count_words(result["full_text"])
-                st.session_state.documents.append(
-                    {
-                        "filename": base_name,
-                        "page_count": result["page_count"],
-                        "chunk_count": result.get("chunk_count", 0),
-                        "word_count": wc,
-                        "full_text": result["full_text"],
-                        "id": doc_record.get("id"),
-                        "format": result.get("format", "unknown"),
-                        "quality": quality,
-                    }
-                )
-                st.session_state.has_documents = True
-                st.session_state.current_doc_id = doc_record.get("id")
-                st.session_state.total_words_processed += wc
-                st.session_state[key] = True
-                fmt = result.get("format", "").upper()
-                grade = quality.get("grade", "?")
-                st.success(f"✅ {uploaded_file.name} ({fmt} · Quality: {grade})")
-            except Exception as e:
-                st.error(f"❌ {str(e)}")
+    # The upload was parked under a pending name until its final name was known
+    try:
+        os.replace(pending_path, os.path.join(doc_dir, f"{uid}_{base_name}"))
+    except OSError:
+        pass
+
+    doc_record = {}
+    try:
+        uid = (
+            st.session_state.user.id
+            if hasattr(st.session_state.get("user"), "id")
+            else None
+        )
+        doc_record = supabase_service.save_document(
+            filename=base_name,
+            page_count=result["page_count"],
+            chunk_count=result.get("chunk_count", 0),
+            user_id=uid,
+        )
+    except Exception:
+        pass
+    wc = count_words(result["full_text"])
+    quality = result.get("quality", {})
+    st.session_state.documents.append(
+        {
+            "filename": base_name,
+            "page_count": result["page_count"],
+            "chunk_count": result.get("chunk_count", 0),
+            "word_count": wc,
+            "full_text": result["full_text"],
+            "id": (doc_record or {}).get("id"),
+            "format": result.get("format", "unknown"),
+            "quality": quality,
+            "file_hash": result.get("file_hash"),
+            "ingest_report": report,
+        }
+    )
+    st.session_state.has_documents = True
+    st.session_state.current_doc_id = (doc_record or {}).get("id")
+    st.session_state.total_words_processed += wc
+    fmt = result.get("format", "").upper()
+    grade = quality.get("grade", "?")
+    msg = t("doc_loaded").format(name=base_name, fmt=fmt, grade=grade)
+    if report.get("duplicate_file"):
+        msg += t("doc_duplicate_file")
+    elif report.get("skipped_chunks"):
+        msg += t("doc_skipped_chunks").format(
+            skipped=report["skipped_chunks"],
+            total=report["total_chunks"],
+            pct=report["skipped_chunks"] / max(1, report["total_chunks"]),
+        )
+    st.session_state.toast_msg = msg
 
 
 # ══════════════════════════════════════════════════════════
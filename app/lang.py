@@ -277,6 +277,51 @@ LANG = {
         "admin_title": "Administration Panel",
         "admin_desc": "Financial metrics & system health reports",
         "admin_unauthorized": "You are unauthorized to view this page.",
+        "semantic_reused": "♻️ Önceki bir sorunun yanıtı kullanıldı:",
+        "semantic_false_hit": "👎 Sorduğum bu değildi",
+        "dash_pool": "🔌 LLM bağlantı havuzu — {pools}",
+        "dash_pool_item": "{url}: {hits} yeniden kullanıldı / {misses} yeni, {open} açık",
+        "dash_query_cache": "🗂️ RAG sorgu önbelleği (graf v{version}) — {modes}",
+        "dash_query_cache_mode": "{mode}: {rate:.0%} isabet",
+        "dash_emb_cache": "🧮 Embedding önbelleği — {rate:.0%} isabet ({hits:,}/{total:,} metin), {items:,} vektör · {mb:.1f} MB",
+        "dash_batcher": "📦 Embedding toplayıcı — {batches:,} toplu işte {requests:,} istek (ort. {avg:.1f} metin, en çok {max}), saniyede {rate:,.0f} metin, ort. kuyruk bekleme {wait:.1f} ms",
+        "dash_bm25": "🔤 BM25 dizini — {docs:,} parça, {terms:,} terim, {mb:.1f} MB posting",
+        "dash_reranker": "🎯 Yeniden sıralayıcı — tur başına {saved:,.0f} prompt token tasarrufu (getirilen bağlamın {pct:.0%}'i), ort. {ms:.0f} ms, {capped} tur {cap} ms sınırına takıldı, skor önbelleği {hit:.0%} isabet",
+        "dash_reranker_error": "🎯 Yeniden sıralayıcı kullanılamıyor — {error}",
+        "dash_packer": "🗜️ Bağlam paketleyici — {calls:,} promptta {tokens_in:,} → {tokens_out:,} token ({pct:.0%} tasarruf, {compressed:,} sıkıştırıldı) · son {label}: {budget:,} bütçede {last_in:,} → {last_out:,}",
+        "dash_packer_call": "çağrı",
+        "dash_latency": "⏱️ Sohbet gecikmesi — {modes}{provider}",
+        "dash_latency_mode": "{mode}: ilk token {ttft:.1f}s, toplam {total:.1f}s ({turns} tur)",
+        "dash_latency_provider": " · sağlayıcı ilk parça {ms:.0f} ms ({streams} akış)",
+        "dash_critic_failures": "⚠️ Eleştirmen {count:,} swarm yanıtında kullanılamadı (incelenmeden yayınlandı)",
+        "dash_gate": "🚦 Eleştirmen kapısı — {reviews:,} incelemenin {skip:.0%}'i atlandı, eleştirmen onayı {approval:.0%}{audit}, ~{saved:.0f}s tasarruf (eleştirmen ort. {critic_s:.1f}s, kapı ort. {gate_ms:.0f} ms)",
+        "dash_gate_audit": ", denetlenen {count} atlamanın {rate:.0%}'i onaylandı",
+        "dash_web": "🌐 Web yedeği — {turns:,} tur, {fetches:,} sayfa indirme, önbellek isabeti {hit:.0%}, p50 {p50:.0f} ms / p95 {p95:.0f} ms, {errors} hata, {late} süre aşımı",
+        "dash_memory": "🧠 Sohbet belleği — geçmiş promptu tur başına {sent:.0f} token, son 20 mesaj için {baseline:.0f} ({pct:.0%} tasarruf), {folds} özetleme (ort. {fold_s:.1f}s, {errors} başarısız)",
+        "dash_first_query": "🔥 Yeniden başlatma sonrası ilk RAG sorgusu — soğuk: {cold} · ılık: {warm}{current}",
+        "dash_first_query_avg": "{runs} çalıştırmada ort. {avg}s",
+        "dash_first_query_na": "yok",
+        "dash_first_query_current": " · bu çalıştırma: {latency}s ({start})",
+        "dash_start_cold": "soğuk",
+        "dash_start_warm": "ılık",
+        "dash_semantic": "🧭 Anlamsal önbellek — {hits}/{lookups} isabet ({rate:.0%}), {false_hits} yanlış isabet ({false_rate:.0%}), ort. benzerlik {similarity:.3f} @ eşik {threshold}",
+        "ingest_queued": "⏳ Sırada",
+        "ingest_stage_extract": "📄 Metin çıkarılıyor",
+        "ingest_stage_chunk": "✂️ Parçalanıyor",
+        "ingest_stage_embed": "🔢 Parçalar vektörleştiriliyor",
+        "ingest_stage_extract_entities": "🧠 Varlıklar çıkarılıyor",
+        "ingest_stage_merge_graph": "🕸️ Grafa ekleniyor",
+        "ingest_cancel": "✖ İptal",
+        "ingest_cancelled": "✖ {name} yüklemesi iptal edildi",
+        "doc_unchanged": "♻️ {name} zaten yüklü (değişmemiş).",
+        "doc_loaded": "✅ {name} ({fmt} · Kalite: {grade})",
+        "doc_duplicate_file": " · ♻️ zaten bilgi grafında, çıkarma atlandı",
+        "doc_skipped_chunks": " · ♻️ {skipped}/{total} parça değişmemiş ({pct:.0%} atlandı)",
+        "warmup_ready": "🟢 RAG motoru hazır (ısınma {seconds}s)",
+        "warmup_failed": "🟠 Isınma tamamlanmadı: {stages} ilk kullanımda yüklenecek",
+        "warmup_running": "⏳ RAG motoru ısınıyor — {stages}",
+        "warmup_stage_embedding": "Embedding modeli",
+        "warmup_stage_rag": "Bilgi grafı depolaması",
     },
     "en": {
         "nav": "🧭 navigation",
@@ -539,5 +584,50 @@ LANG = {
         "admin_title": "Administration Panel",
         "admin_desc": "Financial statistics and token consumption metrics",
         "admin_unauthorized": "You do not have permission to access this page.",
+        "semantic_reused": "♻️ Reused answer to:",
+        "semantic_false_hit": "👎 Not what I asked",
+        "dash_pool": "🔌 LLM connection pool — {pools}",
+        "dash_pool_item": "{url}: {hits} reused / {misses} new, {open} open",
+        "dash_query_cache": "🗂️ RAG query cache (graph v{version}) — {modes}",
+        "dash_query_cache_mode": "{mode}: {rate:.0%} hit",
+        "dash_emb_cache": "🧮 Embedding cache — {rate:.0%} hit ({hits:,}/{total:,} texts), {items:,} vectors · {mb:.1f} MB",
+        "dash_batcher": "📦 Embedding batcher — {requests:,} requests in {batches:,} batches (avg {avg:.1f} texts, max {max}), {rate:,.0f} texts/s, avg queue wait {wait:.1f} ms",
+        "dash_bm25": "🔤 BM25 index — {docs:,} chunks, {terms:,} terms, {mb:.1f} MB postings",
+        "dash_reranker": "🎯 Reranker — saves {saved:,.0f} prompt tokens/turn ({pct:.0%} of retrieved context), avg {ms:.0f} ms, {capped} turns hit the {cap} ms cap, {hit:.0%} score cache hit",
+        "dash_reranker_error": "🎯 Reranker unavailable — {error}",
+        "dash_packer": "🗜️ Context packer — {tokens_in:,} → {tokens_out:,} tokens over {calls:,} prompts ({pct:.0%} saved, {compressed:,} compressed) · last {label}: {last_in:,} → {last_out:,} of {budget:,}",
+        "dash_packer_call": "call",
+        "dash_latency": "⏱️ Chat latency — {modes}{provider}",
+        "dash_latency_mode": "{mode}: first token {ttft:.1f}s, total {total:.1f}s ({turns} turns)",
+        "dash_latency_provider": " · provider first delta {ms:.0f} ms ({streams} streams)",
+        "dash_critic_failures": "⚠️ Critic unavailable on {count:,} swarm answers (published unreviewed)",
+        "dash_gate": "🚦 Critic gate — skipped {skip:.0%} of {reviews:,} reviews, critic approval {approval:.0%}{audit}, ~{saved:.0f}s saved (critic avg {critic_s:.1f}s, gate avg {gate_ms:.0f} ms)",
+        "dash_gate_audit": ", audited skips approved {rate:.0%} of {count}",
+        "dash_web": "🌐 Web fallback — {turns:,} turns, {fetches:,} page fetches, cache hit {hit:.0%}, p50 {p50:.0f} ms / p95 {p95:.0f} ms, {errors} errors, {late} past deadline",
+        "dash_memory": "🧠 Conversation memory — history prompt {sent:.0f} tokens/turn vs {baseline:.0f} for the last 20 messages ({pct:.0%} saved), {folds} folds (avg {fold_s:.1f}s, {errors} failed)",
+        "dash_first_query": "🔥 First RAG query after restart — cold: {cold} · warm: {warm}{current}",
+        "dash_first_query_avg": "{avg}s avg over {runs}",
+        "dash_first_query_na": "n/a",
+        "dash_first_query_current": " · this run: {latency}s ({start})",
+        "dash_start_cold": "cold",
+        "dash_start_warm": "warm",
+        "dash_semantic": "🧭 Semantic cache — {hits}/{lookups} hits ({rate:.0%}), {false_hits} false hits ({false_rate:.0%}), avg similarity {similarity:.3f} @ threshold {threshold}",
+        "ingest_queued": "⏳ Queued",
+        "ingest_stage_extract": "📄 Extracting text",
+        "ingest_stage_chunk": "✂️ Chunking",
+        "ingest_stage_embed": "🔢 Embedding chunks",
+        "ingest_stage_extract_entities": "🧠 Extracting entities",
+        "ingest_stage_merge_graph": "🕸️ Merging into graph",
+        "ingest_cancel": "✖ Cancel",
+        "ingest_cancelled": "✖ {name} ingestion cancelled",
+        "doc_unchanged": "♻️ {name} is already loaded (unchanged).",
+        "doc_loaded": "✅ {name} ({fmt} · Quality: {grade})",
+        "doc_duplicate_file": " · ♻️ already in knowledge graph, extraction skipped",
+        "doc_skipped_chunks": " · ♻️ {skipped}/{total} chunks unchanged ({pct:.0%} skipped)",
+        "warmup_ready": "🟢 RAG engine ready (warm-up {seconds}s)",
+        "warmup_failed": "🟠 Warm-up incomplete: {stages} will load on first use",
+        "warmup_running": "⏳ Warming up RAG engine — {stages}",
+        "warmup_stage_embedding": "Embedding model",
+        "warmup_stage_rag": "Knowledge graph storage",
     },
 }
@@ -90,6 +90,12 @@ def init_session_state():
 
 init_session_state()
 
+# Opt-in: start loading the RAG engine before the first request needs it
+from services import warmup
+
+if warmup.enabled():
+    warmup.start()
+
 # ══════════════════════════════════════════════════════════
 # ROUTING & PAGE IMPORTS
 # ══════════════════════════════════════════════════════════
@@ -483,6 +483,7 @@ def _render_chat_interface():
             status_obj = None
             resp_area = st.empty()
             full = ""
+            semantic_hit = None
             try:
                 echarts_json = None
 
@@ -494,7 +495,6 @@ def _render_chat_interface():
                         write_file,
                         execute_bash,
                     )
-                    import json
 
                     status_obj = st.status(
                         "💻 Autonomous Developer activated, examining system...",
@@ -507,108 +507,38 @@ def _render_chat_interface():
                             "content": "You are LunarTech AI's autonomous Core Developer. You have permissions to read files, write code, and use the terminal. Code the given task completely. When the task is completed, explain what you did to the user nicely using Markdown.",
                         }
                     ] + st.session_state.messages
-
-                    current_msg = chat_service.chat_completion(
-                        messages=messages_for_dev,
-                        model=st.session_state.selected_model,
-                        temperature=0.2,
-                        tools=DEV_TOOLS_SCHEMA,
-                        use_cache=False,
-                    )
-
-                    iterations = 0
-                    max_iterations = 8  # Limit recursive calls
-
-                    while (
-                        hasattr(current_msg, "tool_calls")
-                        and current_msg.tool_calls
-                        and iterations < max_iterations
-                    ):
-                        iterations += 1
-                        status_obj.write(
-                            f"🔄 Tool Call ({iterations}): LLM triggering {len(current_msg.tool_calls)} function(s)."
-                        )
-
-                        tool_calls_dict = []
-                        for tc in current_msg.tool_calls:
-                            tool_calls_dict.append(
-                                {
-                                    "id": tc.id,
-                                    "type": tc.type,
-                                    "function": {
-                                        "name": tc.function.name,
-                                        "arguments": tc.function.arguments,
-                                    },
-                                }
-                            )
-
-                        messages_for_dev.append(
-                            {
-                                "role": "assistant",
-                                "content": current_msg.content or "",
-                                "tool_calls": tool_calls_dict,
-                            }
-                        )
-
-                        for tc in current_msg.tool_calls:
-                            func_name = tc.function.name
-                            try:
-                                args = json.loads(tc.function.arguments)
-                                if func_name == "read_file":
-                                    status_obj.write(
-                                        f"📄 Reading: `{args.get('filepath')}`"
-                                    )
-                                    res = read_file(args.get("filepath"))
-                                elif func_name == "write_file":
-                                    status_obj.write(
-                                        f"✏️ Writing: `{args.get('filepath')}`"
-                                    )
-                                    res = write_file(
-                                        args.get("filepath"), args.get("content")
-                                    )
-                                elif func_name == "execute_bash":
-                                    status_obj.write(
-                                        f"🖥️ Terminal: `{args.get('command')}`"
-                                    )
-                                    res = execute_bash(args.get("command"))
-                                else:
-                                    res = f"Unknown function: {func_name}"
-                            except Exception as e:
-                                res = f"Error: {str(e)}"
-
-                            messages_for_dev.append(
-                                {
-                                    "role": "tool",
-                                    "tool_call_id": tc.id,
-                                    "name": func_name,
-                                    "content": str(res),
-                                }
-                            )
-
-                        current_msg = chat_service.chat_completion(
-                            messages=messages_for_dev,
+                    tool_runs = []
+
+                    def _run_dev_tool(func_name, args):
+                        tool_runs.append(func_name)
+                        if func_name == "read_file":
+                            status_obj.write(f"📄 Reading: `{args.get('filepath')}`")
+                            return read_file(args.get("filepath"))
+                        if func_name == "write_file":
+                            status_obj.write(f"✏️ Writing: `{args.get('filepath')}`")
+                            return write_file(args.get("filepath"), args.get("content"))
+                        if func_name == "execute_bash":
+                            status_obj.write(f"🖥️ Terminal: `{args.get('command')}`")
+                            return execute_bash(args.get("command"))
+                        return f"Unknown function: {func_name}"
+
+                    full, status_obj, _ = _render_stream(
+                        chat_service.stream_tool_loop(
+                            messages_for_dev,
+                            DEV_TOOLS_SCHEMA,
+                            _run_dev_tool,
                             model=st.session_state.selected_model,
+                            max_iterations=8,  # Limit recursive calls
                             temperature=0.2,
-                            tools=DEV_TOOLS_SCHEMA,
-                            use_cache=False,
-                        )
-
+                        ),
+                        resp_area,
+                        status_obj,
+                    )
                     status_obj.update(
-                        label=f"Autonomous Development Completed ({iterations} rounds)",
+                        label=f"Autonomous Development Completed ({len(tool_runs)} tool calls)",
                         state="complete",
                         expanded=False,
                     )
-                    full = (
-                        current_msg.content
-                        if not hasattr(current_msg, "tool_calls")
-                        else (current_msg.content or "All tools executed.")
-                    )
-
-                    chunk_size = 15
-                    for j in range(0, len(full), chunk_size):
-                        resp_area.markdown(full[: j + chunk_size] + "▌")
-                        time.sleep(0.01)
-                    resp_area.markdown(full)
 
                 elif st.session_state.get("data_analyst_mode", False):
                     # --- Data Analyst Mode --
@@ -638,11 +568,6 @@ def _render_chat_interface():
                     else:
                         full = raw_response
 
-                    # Pseudo streaming
-                    chunk_size = 15
-                    for j in range(0, len(full), chunk_size):
-                        resp_area.markdown(full[: j + chunk_size] + "▌")
-                        time.sleep(0.01)
                     resp_area.markdown(full)
 
                     if echarts_json:
@@ -661,6 +586,7 @@ def _render_chat_interface():
                 ):
                     # --- Handbook Intent Router (Engineering Assignment) ---
                     from core.longwriter import generate_handbook
+                    from services import handbook_service
 
                     match = re.search(
                         r"(?i)^(?:create a handbook|handbook olu[sş]tur|kitap yaz|el kitab[ıi] yaz)(?:\s+(?:on|hakk[ıi]nda|for|i[cç]in|about))?\s*(.*)",
@@ -679,16 +605,32 @@ def _render_chat_interface():
                     # Placeholder for full context loading if documents exist
                     context_text = "Scanning reference documents..."
                     if st.session_state.has_documents:
-                        context_text = lightrag_service.query(
+                        context_text = lightrag_service.get_rag_context(
                             topic, mode=st.session_state.rag_mode
                         )
 
-                    handbook_result = generate_handbook(
+                    # Chapters are shown as soon as each one is written
+                    full = f"# {topic} - Comprehensive Handbook\n\n"
+                    resp_area.markdown(full + "▌")
+
+                    def _show_section(sec):
+                        nonlocal full
+                        full += f"## {sec.get('title')}\n\n{sec.get('content')}\n\n"
+                        resp_area.markdown(full + "▌")
+
+                    generate_handbook(
                         topic=topic,
                         context=context_text,
                         target_words=20000,
                         model=st.session_state.selected_model,
                         progress_callback=_update_progress,
+                        # Section queries are prefetched concurrently after planning
+                        rag_query_func=(
+                            handbook_service.make_rag_query_func(st.session_state.rag_mode)
+                            if st.session_state.has_documents
+                            else None
+                        ),
+                        section_callback=_show_section,
                     )
 
                     status_obj.update(
@@ -696,53 +638,29 @@ def _render_chat_interface():
                         state="complete",
                         expanded=False,
                     )
-
-                    # Assemble sections
-                    full = f"# {topic} - Comprehensive Handbook\n\n"
-                    for sec in handbook_result.get("sections", []):
-                        full += f"## {sec.get('title')}\n\n{sec.get('content')}\n\n"
-
-                    # Pseudo streaming output to chat
-                    chunk_size = 50
-                    for j in range(0, len(full), chunk_size):
-                        resp_area.markdown(full[: j + chunk_size] + "▌")
-                        time.sleep(0.005)
                     resp_area.markdown(full)
 
                 else:
                     # --- Standard RAG Swarm Mode ---
-                    for item in chat_service.stream_answer(
-                        question=prompt,
-                        chat_history=st.session_state.messages[:-1],
-                        model=st.session_state.selected_model,
-                        has_documents=st.session_state.has_documents,
-                        rag_mode=st.session_state.rag_mode,
-                        temperature=st.session_state.temperature,
-                        max_tokens=st.session_state.max_tokens,
-                        custom_prompt=st.session_state.custom_prompt,
-                        auto_rag=st.session_state.get("auto_rag", False),
-                        use_persona=st.session_state.get("use_persona", False),
-                    ):
-                        if isinstance(item, dict):
-                            t_item = item.get("type", "chunk")
-                            text_val = item.get("text", "")
-                            if t_item == "status":
-                                st_state = item.get("state")
-                                if st_state == "running":
-                                    status_obj = st.status(text_val, expanded=True)
-                                elif st_state == "update" and status_obj:
-                                    status_obj.write(text_val)
-                                elif st_state == "complete" and status_obj:
-                                    status_obj.update(
-                                        label=text_val, state="complete", expanded=False
-                                    )
-                            elif t_item == "chunk":
-                                full += text_val
-                                resp_area.markdown(full + "▌")
-                        else:
-                            full += str(item)
-                            resp_area.markdown(full + "▌")
-                    resp_area.markdown(full)
+                    full, status_obj, semantic_hit = _render_stream(
+                        chat_service.stream_answer(
+                            question=prompt,
+                            chat_history=st.session_state.messages[:-1],
+                            model=st.session_state.selected_model,
+                            has_documents=st.session_state.has_documents,
+                            rag_mode=st.session_state.rag_mode,
+                            temperature=st.session_state.temperature,
+                            max_tokens=st.session_state.max_tokens,
+                            custom_prompt=st.session_state.custom_prompt,
+                            auto_rag=st.session_state.get("auto_rag", False),
+                            use_persona=st.session_state.get("use_persona", False),
+                            doc_scope=",".join(
+                                sorted(d["filename"] for d in st.session_state.documents)
+                            ),
+                            conversation_id=_conversation_id(),
+                        ),
+                        resp_area,
+                    )
                 elapsed = time.time() - start_t
                 st.toast(f"Response generated in {elapsed:.1f} seconds.", icon="⏱️")
             except Exception as e:
@@ -781,6 +699,18 @@ def _render_chat_interface():
         except Exception:
             pass
 
+        # Semantic cache: let the user flag a cached answer that missed the question
+        if semantic_hit:
+            from services import semantic_cache
+
+            st.caption(f"{t('semantic_reused')} “{semantic_hit['question']}”")
+            st.button(
+                t("semantic_false_hit"),
+                key=f"semfalse_{semantic_hit['entry_id']}",
+                on_click=semantic_cache.report_false_hit,
+                args=(semantic_hit["entry_id"],),
+            )
+
         # Text-To-Speech (Seslendir) Butonu
         if full and not full.startswith(t("error_prefix")):
             col1, col2 = st.columns([2, 5])
@@ -821,6 +751,58 @@ def _render_chat_interface():
                         st.rerun()
 
 
+def _conversation_id():
+    """Key of the current conversation's rolling memory (workspace or user, then conversation name)."""
+    owner = st.session_state.get("workspace_id") or getattr(
+        st.session_state.get("user"), "id", None
+    )
+    return f"{owner or 'local'}:{st.session_state.current_conv}"
+
+
+def _render_stream(events, resp_area, status_obj=None):
+    """
+    Draws a chat_service event stream as it arrives: answer text into
+    resp_area, status and tool-call progress into an st.status box.
+    Returns (answer text, status box, semantic cache hit or None).
+    """
+    full = ""
+    semantic_hit = None
+    tool_calls = {}  # call index -> [tool name, argument chars received]
+    for item in events:
+        if not isinstance(item, dict):
+            item = {"type": "chunk", "text": str(item)}
+        t_item = item.get("type", "chunk")
+        text_val = item.get("text", "")
+        if t_item == "cache_hit":
+            semantic_hit = item
+        elif t_item == "status":
+            st_state = item.get("state")
+            if st_state == "running":
+                status_obj = st.status(text_val, expanded=True)
+            elif st_state == "update" and status_obj:
+                status_obj.write(text_val)
+            elif st_state == "complete" and status_obj:
+                status_obj.update(label=text_val, state="complete", expanded=False)
+        elif t_item == "chunk":
+            full += text_val
+            resp_area.markdown(full + "▌")
+        elif t_item == "replace":
+            # Pipelined swarm: the critic rejected the streamed draft
+            full = text_val
+            resp_area.markdown(full + "▌")
+        elif t_item == "tool_call_delta" and status_obj:
+            # Tool arguments (e.g. a whole file for write_file) stream in before the call runs
+            if item.get("name"):
+                tool_calls[item["index"]] = [item["name"], 0]
+                status_obj.write(f"🔄 Tool call: `{item['name']}`")
+            call = tool_calls.get(item["index"])
+            if call and item.get("arguments"):
+                call[1] += len(item["arguments"])
+                status_obj.update(label=f"🔧 `{call[0]}`: {call[1]:,} argument characters received...")
+    resp_area.markdown(full)
+    return full, status_obj, semantic_hit
+
+
 def _render_welcome():
     st.markdown(
         f'<div class="welcome"><h2>{t("welcome_title")}</h2><p>{t("welcome_desc")}</p></div>',
@@ -10,7 +10,23 @@ def t(key):
     lang = st.session_state.get('lang', 'tr')
     return LANG.get(lang, LANG['tr']).get(key, key)
 
-from services import lightrag_service, llm_service, cache_service
+from services import (
+    lightrag_service,
+    llm_service,
+    cache_service,
+    semantic_cache,
+    query_cache,
+    embedding_cache,
+    embedding_batcher,
+    warmup,
+    bm25_index,
+    reranker,
+    context_packer,
+    chat_service,
+    critic_gate,
+    web_context,
+    conversation_memory,
+)
 import config
 
 def render_dashboard_page():
@@ -54,6 +70,197 @@ def render_dashboard_page():
                 f'<div class="m-card"><div class="m-val">{vl}</div><div class="m-lbl">{ic} {lb}</div></div>',
                 unsafe_allow_html=True,
             )
+    if token_data.get("pool"):
+        st.caption(
+            t("dash_pool").format(
+                pools=" · ".join(
+                    t("dash_pool_item").format(
+                        url=url,
+                        hits=p["hits"],
+                        misses=p["misses"],
+                        open="?" if p["open_connections"] is None else p["open_connections"],
+                    )
+                    for url, p in token_data["pool"].items()
+                )
+            )
+        )
+    rag_modes = query_cache.stats()["modes"]
+    if rag_modes:
+        st.caption(
+            t("dash_query_cache").format(
+                version=lightrag_service.get_graph_version(),
+                modes=" · ".join(
+                    t("dash_query_cache_mode").format(mode=mode, rate=m["hit_rate"])
+                    for mode, m in sorted(rag_modes.items())
+                ),
+            )
+        )
+    if embedding_cache.enabled():
+        emb = embedding_cache.stats()
+        if emb["hits"] + emb["misses"]:
+            st.caption(
+                t("dash_emb_cache").format(
+                    rate=emb["hit_rate"],
+                    hits=emb["hits"],
+                    total=emb["hits"] + emb["misses"],
+                    items=emb["items"],
+                    mb=emb["bytes_used"] / 1e6,
+                )
+            )
+    batcher = embedding_batcher.stats()
+    if batcher["batches"]:
+        st.caption(
+            t("dash_batcher").format(
+                requests=batcher["requests"],
+                batches=batcher["batches"],
+                avg=batcher["avg_batch"],
+                max=batcher["max_batch"],
+                rate=batcher["texts_per_sec"],
+                wait=batcher["avg_wait_ms"],
+            )
+        )
+    if config.BM25_ENABLED:
+        bm25 = bm25_index.stats()
+        if bm25["docs"]:
+            st.caption(
+                t("dash_bm25").format(
+                    docs=bm25["docs"], terms=bm25["terms"], mb=bm25["postings_bytes"] / 1e6
+                )
+            )
+    if reranker.enabled():
+        rr = reranker.stats()
+        if rr["turns"]:
+            st.caption(
+                t("dash_reranker").format(
+                    saved=rr["avg_saved_tokens"],
+                    pct=rr["saved_pct"],
+                    ms=rr["avg_ms"],
+                    capped=rr["capped"],
+                    cap=config.RERANK_MAX_MS,
+                    hit=rr["cache_hit_rate"],
+                )
+            )
+        elif rr["error"]:
+            st.caption(t("dash_reranker_error").format(error=rr["error"]))
+    packer = context_packer.stats()
+    if packer["calls"]:
+        last = packer["last"]
+        st.caption(
+            t("dash_packer").format(
+                tokens_in=packer["tokens_in"],
+                tokens_out=packer["tokens_out"],
+                calls=packer["calls"],
+                pct=packer["saved_pct"],
+                compressed=packer["compressed"],
+                label=last["label"] or t("dash_packer_call"),
+                last_in=last["tokens_in"],
+                last_out=last["tokens_out"],
+                budget=last["budget"],
+            )
+        )
+    swarm = chat_service.latency_stats()
+    if swarm:
+        provider = (
+            t("dash_latency_provider").format(
+                ms=token_data["avg_ttft_ms"], streams=token_data["streams"]
+            )
+            if token_data["streams"]
+            else ""
+        )
+        st.caption(
+            t("dash_latency").format(
+                modes=" · ".join(
+                    t("dash_latency_mode").format(
+                        mode=mode,
+                        ttft=s["avg_ttft_s"],
+                        total=s["avg_total_s"],
+                        turns=s["turns"],
+                    )
+                    for mode, s in sorted(swarm.items())
+                ),
+                provider=provider,
+            )
+        )
+        failures = chat_service.critic_failures()
+        if failures:
+            st.caption(t("dash_critic_failures").format(count=failures))
+    gate = critic_gate.stats()
+    if gate["reviews"]:
+        audit = (
+            t("dash_gate_audit").format(rate=gate["audit_approval_rate"], count=gate["audited"])
+            if gate["audited"]
+            else ""
+        )
+        st.caption(
+            t("dash_gate").format(
+                skip=gate["skip_rate"],
+                reviews=gate["reviews"],
+                approval=gate["approval_rate"],
+                audit=audit,
+                saved=gate["saved_s"],
+                critic_s=gate["avg_critic_s"],
+                gate_ms=gate["avg_gate_ms"],
+            )
+        )
+    web = web_context.stats()
+    if web["fetches"]:
+        st.caption(
+            t("dash_web").format(
+                turns=web["turns"],
+                fetches=web["fetches"],
+                hit=web["cache_hit_rate"],
+                p50=web["p50_ms"],
+                p95=web["p95_ms"],
+                errors=web["errors"],
+                late=web["late"],
+            )
+        )
+    memory = conversation_memory.stats()
+    if memory["turns"]:
+        st.caption(
+            t("dash_memory").format(
+                sent=memory["avg_sent_tokens"],
+                baseline=memory["avg_baseline_tokens"],
+                pct=memory["saved_pct"],
+                folds=memory["folds"],
+                fold_s=memory["avg_fold_s"],
+                errors=memory["fold_errors"],
+            )
+        )
+    first = warmup.latency_report()
+    if first["cold"]["runs"] or first["warm"]["runs"]:
+        cold, warm = (
+            t("dash_first_query_avg").format(avg=r["avg_s"], runs=r["runs"])
+            if r["runs"]
+            else t("dash_first_query_na")
+            for r in (first["cold"], first["warm"])
+        )
+        current = first["current"]
+        st.caption(
+            t("dash_first_query").format(
+                cold=cold,
+                warm=warm,
+                current=t("dash_first_query_current").format(
+                    latency=current["latency_s"],
+                    start=t("dash_start_warm" if current["warm"] else "dash_start_cold"),
+                )
+                if current
+                else "",
+            )
+        )
+    if semantic_cache.enabled():
+        sem = semantic_cache.stats()
+        st.caption(
+            t("dash_semantic").format(
+                hits=sem["hits"],
+                lookups=sem["lookups"],
+                rate=sem["hit_rate"],
+                false_hits=sem["false_hits"],
+                false_rate=sem["false_hit_rate"],
+                similarity=sem["avg_hit_similarity"],
+                threshold=sem["threshold"],
+            )
+        )
 
     st.markdown("<br>", unsafe_allow_html=True)
     left, right = st.columns(2)
@@ -24,6 +24,34 @@ OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
 OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1")
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
+
+# ── LLM HTTP Connection Pool ──────────────────────────────
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "20"))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "10"))
+LLM_POOL_KEEPALIVE_EXPIRY = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() == "true"
+
+# ── LLM Rate Limits (0 = unlimited) ───────────────────────
+RATE_LIMITS = {
+    "gemini": {
+        "rpm": int(os.getenv("GEMINI_RPM", "5")),  # free tier quota
+        "tpm": int(os.getenv("GEMINI_TPM", "250000")),
+        "concurrency": int(os.getenv("GEMINI_MAX_CONCURRENCY", "0")),
+    },
+    "ollama": {
+        "rpm": 0,
+        "tpm": 0,
+        # Match the server's OLLAMA_NUM_PARALLEL so requests queue here, not in Ollama
+        "concurrency": int(os.getenv("OLLAMA_NUM_PARALLEL", "1")),
+    },
+    "openrouter": {
+        "rpm": int(os.getenv("OPENROUTER_RPM", "0")),
+        "tpm": int(os.getenv("OPENROUTER_TPM", "0")),
+        "concurrency": int(os.getenv("OPENROUTER_MAX_CONCURRENCY", "8")),
+    },
+}
+RATE_LIMIT_DEFAULT_BACKOFF = float(os.getenv("RATE_LIMIT_DEFAULT_BACKOFF", "10"))
 
 # ── LLM Modelleri ─────────────────────────────────────────
 AVAILABLE_MODELS = {
@@ -59,21 +87,105 @@ MODEL_INFO = {
     "qwen/qwen3-235b-a22b": {"ctx": "128K", "speed": "⚡ Orta", "cost": "💰"},
 }
 
+# ── Response Cache ────────────────────────────────────────
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_SWEEP_INTERVAL = int(os.getenv("CACHE_SWEEP_INTERVAL", "300"))  # seconds
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", str(24 * 3600)))  # seconds
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+
 # ── Embedding ─────────────────────────────────────────────
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
 EMBEDDING_DIM = 384
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # torch | onnx | onnx-int8
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))  # 0 = library default
+EMBEDDING_ONNX_QCONFIG = os.getenv("EMBEDDING_ONNX_QCONFIG", "")  # avx2/avx512/avx512_vnni/arm64; auto if empty
+EMBEDDING_PARITY_MIN = float(os.getenv("EMBEDDING_PARITY_MIN", "0.98"))  # min cosine vs torch
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBED_BATCH_MAX_TEXTS = int(os.getenv("EMBED_BATCH_MAX_TEXTS", "256"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))  # model forward-pass size
 
 # ── LightRAG ──────────────────────────────────────────────
 LIGHTRAG_WORK_DIR = os.path.join(os.path.dirname(__file__), "data", "lightrag_store")
+# Chat/handbook prompt with raw retrieved context instead of LightRAG's own answer
+RAG_CONTEXT_ONLY = os.getenv("RAG_CONTEXT_ONLY", "true").lower() == "true"
+RAG_CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", "6000"))
+RAG_QUERY_CONCURRENCY = int(os.getenv("RAG_QUERY_CONCURRENCY", "4"))
+RAG_QUERY_TIMEOUT = float(os.getenv("RAG_QUERY_TIMEOUT", "120"))  # seconds per query
+LIGHTRAG_LLM_TIMEOUT = float(os.getenv("LIGHTRAG_LLM_TIMEOUT", "600"))  # seconds per LightRAG LLM call
+# Local vector store when SUPABASE_DB_URL is unset: "nano" (LightRAG default) or "ann" (IVF, memory-mapped)
+LOCAL_VECTOR_STORAGE = os.getenv("LOCAL_VECTOR_STORAGE", "nano")
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "8"))  # IVF lists scanned per query
+ANN_MIN_TRAIN = int(os.getenv("ANN_MIN_TRAIN", "2048"))  # exact scan below this size
+ANN_LIST_FACTOR = float(os.getenv("ANN_LIST_FACTOR", "1.0"))  # lists = factor * sqrt(n)
+# BM25 index over stored chunks, fused with vector hits in the "fusion" RAG mode
+BM25_ENABLED = os.getenv("BM25_ENABLED", "true").lower() == "true"
+RRF_K = int(os.getenv("RRF_K", "60"))  # reciprocal-rank fusion constant
+FUSION_TOP_K = int(os.getenv("FUSION_TOP_K", "20"))  # hits per retriever and fused
+# Load the embedding model and LightRAG storages in the background at app start
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "false").lower() == "true"
+
+# ── Reranking ─────────────────────────────────────────────
+# Cross-encoder rerank of retrieved context before it reaches the chat prompt
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_TOKENS = int(os.getenv("RERANK_TOKENS", "3000"))  # context kept after reranking
+RERANK_MAX_MS = int(os.getenv("RERANK_MAX_MS", "300"))  # scoring time cap per turn
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "10000"))  # cached (query, passage) scores
+
+# ── Prompt Context Packing ────────────────────────────────
+# Share of a model's MODEL_INFO window a prompt may use (rest is tokenizer slack)
+CONTEXT_FILL_RATIO = float(os.getenv("CONTEXT_FILL_RATIO", "0.9"))
+CONTEXT_DEFAULT_WINDOW = int(os.getenv("CONTEXT_DEFAULT_WINDOW", "8192"))  # models not in MODEL_INFO
+CONTEXT_MIN_TOKENS = int(os.getenv("CONTEXT_MIN_TOKENS", "512"))  # floor when the window is tight
+
+# ── Chat Swarm (drafter → critic → refiner) ───────────────
+# "pipelined": draft streams to the user while the critic reviews it; "serial": draft, critic, then answer
+SWARM_MODE = os.getenv("SWARM_MODE", "pipelined")
+SWARM_CRITIC_START_CHARS = int(os.getenv("SWARM_CRITIC_START_CHARS", "400"))  # partial draft size the critic starts on
+SWARM_CRITIC_COVERAGE = float(os.getenv("SWARM_CRITIC_COVERAGE", "0.8"))  # approved share of the draft needed to skip a final check
+# Skip the critic for drafts that are clearly grounded in the retrieved context
+CRITIC_GATE_ENABLED = os.getenv("CRITIC_GATE_ENABLED", "true").lower() == "true"
+CRITIC_GATE_THRESHOLD = float(os.getenv("CRITIC_GATE_THRESHOLD", "0.85"))  # grounded share of the draft to skip
+CRITIC_GATE_SIMILARITY = float(os.getenv("CRITIC_GATE_SIMILARITY", "0.6"))  # cosine for a sentence to count as grounded
+CRITIC_GATE_AUDIT_RATE = float(os.getenv("CRITIC_GATE_AUDIT_RATE", "0.1"))  # confident drafts still sent to the critic
+CRITIC_GATE_MAX_SENTENCES = int(os.getenv("CRITIC_GATE_MAX_SENTENCES", "400"))  # context sentences embedded
+
+# ── Conversation Memory ───────────────────────────────────
+# Running summary + a verbatim window of recent messages instead of the last 20 messages
+MEMORY_ENABLED = os.getenv("MEMORY_ENABLED", "true").lower() == "true"
+MEMORY_MODEL = os.getenv("MEMORY_MODEL", "")  # model that writes summaries; the chat model if empty
+MEMORY_WINDOW_TOKENS = int(os.getenv("MEMORY_WINDOW_TOKENS", "1500"))  # recent messages kept verbatim
+MEMORY_WINDOW_MIN_MESSAGES = int(os.getenv("MEMORY_WINDOW_MIN_MESSAGES", "2"))  # kept verbatim regardless of size
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "400"))  # running summary length
+MEMORY_FOLD_MESSAGE_TOKENS = int(os.getenv("MEMORY_FOLD_MESSAGE_TOKENS", "300"))  # per message read by the summariser
+MEMORY_FOLD_BATCH = int(os.getenv("MEMORY_FOLD_BATCH", "4"))  # messages out of the window before a summary update
+
+# ── Web Fallback (thin document context) ──────────────────
+WEB_MAX_RESULTS = int(os.getenv("WEB_MAX_RESULTS", "2"))  # search results fetched per turn
+WEB_DEADLINE = float(os.getenv("WEB_DEADLINE", "4"))  # seconds for search + all fetches
+WEB_FETCH_TIMEOUT = float(os.getenv("WEB_FETCH_TIMEOUT", "3"))  # seconds per page request
+WEB_FETCH_WORKERS = int(os.getenv("WEB_FETCH_WORKERS", "8"))
+WEB_PAGE_CHARS = int(os.getenv("WEB_PAGE_CHARS", "1500"))  # paragraph text kept per page
+WEB_MAX_BYTES = int(os.getenv("WEB_MAX_BYTES", str(2 * 1024 * 1024)))  # download cap per page
+WEB_PAGE_TTL = int(os.getenv("WEB_PAGE_TTL", str(6 * 3600)))  # seconds a fetched page is reused
+WEB_SEARCH_TTL = int(os.getenv("WEB_SEARCH_TTL", "3600"))  # seconds a search result list is reused
 
 # ── Handbook / LongWriter ─────────────────────────────────
 MAX_HANDBOOK_WORDS = int(os.getenv("MAX_HANDBOOK_WORDS", "20000"))
 WORDS_PER_SECTION = 2000
 MAX_SECTIONS = 15
+# Source-context caps for the planner and each section (≈ the old 15000/8000-char slices)
+PLAN_CONTEXT_TOKENS = int(os.getenv("PLAN_CONTEXT_TOKENS", "4000"))
+SECTION_CONTEXT_TOKENS = int(os.getenv("SECTION_CONTEXT_TOKENS", "2000"))
 
 # ── PDF İşleme ────────────────────────────────────────────
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
 
 # ── Uygulama Ayarları ─────────────────────────────────────
 APP_TITLE = "🌙 LunarTech AI"
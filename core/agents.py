@@ -206,38 +206,25 @@ def translator_agent(text: str, target_lang: str = "English", model: str = None)
 # 15. KONUŞMA HAFIZASI
 # ══════════════════════════════════════════════════════════
 
-MEMORY_PROMPT = """Extract a 3-5 sentence summary of the following chat history. Identify important topics, the user's preferences, and the main themes of their questions.
-
-Chat:
-{chat_history}
-
-Summary:"""
-
+def summarize_conversation(
+    messages: list[dict], model: str = None, summary: str = ""
+) -> str:
+    """
+    Sohbet geçmişini özetler (hafıza için). With `summary`, only `messages`
+    (the new ones) are folded into it instead of re-summarising the history.
+    """
+    from services import conversation_memory
 
-def summarize_conversation(messages: list[dict], model: str = None) -> str:
-    """Sohbet geçmişini özetler (hafıza için)."""
+    messages = [m for m in messages or [] if m and isinstance(m, dict)]
     if not messages:
-        return ""
-
-    history = "\n".join(
-        [
-            f"{'User' if m.get('role', '') == 'user' else 'AI'}: {m.get('content', '')[:200]}"
-            for m in messages[-20:]
-            if m and isinstance(m, dict)
-        ]
-    )
+        return summary
+    if not summary:
+        messages = messages[-20:]
 
     try:
-        return llm_service.chat_completion(
-            messages=[
-                {"role": "user", "content": MEMORY_PROMPT.format(chat_history=history)}
-            ],
-            model=model,
-            max_tokens=300,
-            temperature=0.3,
-        )
+        return conversation_memory.fold(summary, messages, model)
     except Exception:
-        return ""
+        return summary
 
 
 # ══════════════════════════════════════════════════════════
@@ -13,8 +13,8 @@ import os, sys, json, re, time
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 import config
-from services import llm_service
-from utils import logger
+from services import llm_service, context_packer
+from utils import logger, tokens
 from utils.helpers import count_words
 
 # ── Format tanımları ──
@@ -112,8 +112,13 @@ def create_plan(
         output_format, FORMAT_INSTRUCTIONS["handbook"]
     )
 
+    plan_budget = context_packer.budget(
+        model,
+        reserved=tokens.count(PLAN_PROMPT, model) + 4096,
+        cap=config.PLAN_CONTEXT_TOKENS,
+    )
     prompt = PLAN_PROMPT.format(
-        context=context[:15000],
+        context=context_packer.pack(context, topic, plan_budget, label="plan", model=model),
         topic=topic,
         target_words=target_words,
     )
@@ -158,14 +163,27 @@ def write_section(
         recent = previous_sections[-2:]
         summaries = []
         for sec in recent:
-            summary = sec[:500] + "..." if len(sec) > 500 else sec
+            summary = tokens.truncate_to_tokens(sec, 125, model, suffix="...")
             summaries.append(f"Chapter: {summary}")
         previous_summary = "\n\n".join(summaries)
 
+    section_query = f"{section.get('title', '')} {' '.join(section.get('key_points', []))}"
+    general_budget = context_packer.budget(
+        model,
+        reserved=sum(
+            tokens.count_many(
+                [WRITE_SECTION_PROMPT, section_context or "", previous_summary], model
+            )
+        )
+        + 8192,
+        cap=config.SECTION_CONTEXT_TOKENS,
+    )
     prompt = WRITE_SECTION_PROMPT.format(
         topic=topic,
         section_context=section_context or "No specific context available.",
-        general_context=context[:8000],
+        general_context=context_packer.pack(
+            context, section_query, general_budget, label="section", model=model
+        ),
         section_title=section.get("title", ""),
         section_description=section.get("description", ""),
         target_words=section.get("target_words", 2000),
@@ -26,6 +26,7 @@ def generate_handbook(
     model: str = None,
     progress_callback: Optional[Callable] = None,
     rag_query_func: Optional[Callable] = None,
+    section_callback: Optional[Callable] = None,
 ) -> dict:
     """
     Produces a complete handbook.
@@ -33,6 +34,10 @@ def generate_handbook(
     Args:
         rag_query_func: Function to make section-specific RAG queries.
                         Signature: rag_query_func(query: str) -> str
+                        Optional attribute prefetch(queries: list[str]) is
+                        called once with every section query after planning.
+        section_callback: Called with each written section dict as soon as
+                          it is finished, so callers can show chapters live.
     """
     target_words = target_words or config.MAX_HANDBOOK_WORDS
     start_time = datetime.now()
@@ -45,6 +50,11 @@ def generate_handbook(
     )
 
     total_steps = len(plan) + 1
+
+    # Run all section RAG queries concurrently up front when supported
+    if rag_query_func and hasattr(rag_query_func, "prefetch"):
+        rag_query_func.prefetch([s.get("rag_query") for s in plan])
+
     _notify(
         progress_callback,
         1,
@@ -108,6 +118,11 @@ def generate_handbook(
                 "word_count": section_words,
             }
         )
+        if section_callback:
+            try:
+                section_callback(written_sections[-1])
+            except Exception:
+                pass
 
         _notify(
             progress_callback,
@@ -7,7 +7,9 @@ auto summary, finding extraction, quiz, comparison, tagging.
 import os, sys, json, re
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
 from services import llm_service
+from utils import tokens
 
 
 # ══════════════════════════════════════════════════════════
@@ -27,7 +29,8 @@ def extract_citations(rag_context: str) -> list[dict]:
 
     if matches:
         seen = set()
-        for pg in matches:
+        for groups in matches:
+            pg = groups[0] or groups[1]
             if pg not in seen:
                 citations.append({"page": int(pg), "type": "page"})
                 seen.add(pg)
@@ -112,6 +115,17 @@ def generate_followup_questions(
 # ══════════════════════════════════════════════════════════
 
 
+# Exact terms embeddings blur: quoted phrases, codes like "ISO-27001" / "ERR1042",
+# versions like "v2.1" / "3.10.4", and IDs of 5+ digits. Years, "Q3" or "GPT4" are not.
+_EXACT_TERM = re.compile(
+    r"[\"“«][^\"”»]{2,}[\"”»]"
+    r"|\b[A-Za-z]{2,}-?\d{3,}\b"
+    r"|\b[vV]\d+(?:\.\d+)+\b"
+    r"|\b\d+(?:\.\d+){2,}\b"
+    r"|\b\d{5,}\b"
+)
+
+
 def smart_rag_mode(question: str) -> str:
     """Analyzes the question and selects the most appropriate RAG mode."""
     q = question.lower().strip()
@@ -163,6 +177,9 @@ def smart_rag_mode(question: str) -> str:
     global_score = sum(1 for s in global_signals if s in q)
     naive_score = sum(1 for s in naive_signals if s in q)
 
+    # Exact codes/versions/IDs/quotes → fusion (BM25 + vector), unless it is a broad question
+    if config.BM25_ENABLED and global_score <= local_score and _EXACT_TERM.search(question):
+        return "fusion"
     if naive_score > local_score and naive_score > global_score:
         return "naive"
     if global_score > local_score:
@@ -187,7 +204,7 @@ Summary:"""
 
 def auto_summarize(text: str, model: str = None) -> str:
     """Extracts a short summary of the text."""
-    chunk = text[:6000]
+    chunk = tokens.truncate_to_tokens(text, 1500, model)
     try:
         return llm_service.chat_completion(
             messages=[{"role": "user", "content": SUMMARY_PROMPT.format(text=chunk)}],
@@ -219,7 +236,7 @@ Rules:
 
 def extract_key_findings(text: str, model: str = None) -> str:
     """Extracts key findings from the text."""
-    chunk = text[:8000]
+    chunk = tokens.truncate_to_tokens(text, 2000, model)
     try:
         return llm_service.chat_completion(
             messages=[{"role": "user", "content": FINDINGS_PROMPT.format(text=chunk)}],
@@ -262,7 +279,7 @@ def generate_quiz(
         "open ended": "Each question should have a short model answer below it",
         "true/false": "State whether each statement is true or false",
     }
-    chunk = text[:6000]
+    chunk = tokens.truncate_to_tokens(text, 1500, model)
     try:
         return llm_service.chat_completion(
             messages=[
@@ -311,8 +328,8 @@ def compare_documents(
     doc1_text: str, doc1_name: str, doc2_text: str, doc2_name: str, model: str = None
 ) -> str:
     """Compares two documents."""
-    t1 = doc1_text[:4000]
-    t2 = doc2_text[:4000]
+    t1 = tokens.truncate_to_tokens(doc1_text, 1000, model)
+    t2 = tokens.truncate_to_tokens(doc2_text, 1000, model)
     try:
         return llm_service.chat_completion(
             messages=[
@@ -353,7 +370,7 @@ Return ONLY JSON:"""
 
 def auto_tag_document(text: str, model: str = None) -> dict:
     """Automatically tags the document."""
-    chunk = text[:3000]
+    chunk = tokens.truncate_to_tokens(text, 750, model)
     try:
         response = llm_service.chat_completion(
             messages=[{"role": "user", "content": TAG_PROMPT.format(text=chunk)}],
@@ -439,7 +456,7 @@ mindmap
 
 def generate_mind_map(text: str, model: str = None) -> str:
     """Generates Mermaid mindmap code from the text."""
-    chunk = text[:5000]
+    chunk = tokens.truncate_to_tokens(text, 1250, model)
     try:
         response = llm_service.chat_completion(
             messages=[{"role": "user", "content": MINDMAP_PROMPT.format(text=chunk)}],
@@ -482,7 +499,7 @@ Write in English:"""
 
 def generate_swot(text: str, model: str = None) -> str:
     """Generates a SWOT analysis table."""
-    chunk = text[:5000]
+    chunk = tokens.truncate_to_tokens(text, 1250, model)
     try:
         return llm_service.chat_completion(
             messages=[{"role": "user", "content": SWOT_PROMPT.format(text=chunk)}],
@@ -522,7 +539,7 @@ def generate_flashcards(
     text: str, count: int = 10, difficulty: str = "medium", model: str = None
 ) -> str:
     """Generates study flashcards."""
-    chunk = text[:5000]
+    chunk = tokens.truncate_to_tokens(text, 1250, model)
     try:
         return llm_service.chat_completion(
             messages=[
@@ -563,7 +580,7 @@ Write in English, in Markdown format:"""
 
 def generate_reading_guide(text: str, model: str = None) -> str:
     """Generates a personalized reading guide."""
-    chunk = text[:6000]
+    chunk = tokens.truncate_to_tokens(text, 1500, model)
     try:
         return llm_service.chat_completion(
             messages=[
@@ -601,7 +618,7 @@ Return ONLY JSON:"""
 
 def document_health_score(text: str, model: str = None) -> dict:
     """Calculates document quality score."""
-    chunk = text[:5000]
+    chunk = tokens.truncate_to_tokens(text, 1250, model)
     try:
         response = llm_service.chat_completion(
             messages=[{"role": "user", "content": HEALTH_PROMPT.format(text=chunk)}],
@@ -643,7 +660,7 @@ Return ONLY JSON:"""
 
 def sentiment_analysis(text: str, model: str = None) -> dict:
     """Text sentiment and tone analysis."""
-    chunk = text[:4000]
+    chunk = tokens.truncate_to_tokens(text, 1000, model)
     try:
         response = llm_service.chat_completion(
             messages=[{"role": "user", "content": SENTIMENT_PROMPT.format(text=chunk)}],
@@ -688,7 +705,7 @@ Add English description:"""
 
 def citation_generator(text: str, filename: str = "Document", model: str = None) -> str:
     """Generates an academic citation."""
-    chunk = text[:3000]
+    chunk = tokens.truncate_to_tokens(text, 750, model)
     try:
         return llm_service.chat_completion(
             messages=[
@@ -725,7 +742,7 @@ In Markdown format, wrap code blocks with ```:"""
 
 def extract_code_blocks(text: str, model: str = None) -> str:
     """Extracts and explains code blocks from the text."""
-    chunk = text[:6000]
+    chunk = tokens.truncate_to_tokens(text, 1500, model)
     try:
         return llm_service.chat_completion(
             messages=[{"role": "user", "content": CODE_PROMPT.format(text=chunk)}],
@@ -761,7 +778,7 @@ Write in English:"""
 
 def document_timeline(text: str, model: str = None) -> str:
     """Generates a document timeline."""
-    chunk = text[:5000]
+    chunk = tokens.truncate_to_tokens(text, 1250, model)
     try:
         return llm_service.chat_completion(
             messages=[{"role": "user", "content": TIMELINE_PROMPT.format(text=chunk)}],
@@ -794,7 +811,7 @@ Write in English, in Markdown format:"""
 
 def writing_coach(text: str, model: str = None) -> str:
     """Writing coach — grammar, style, sentence structure analysis."""
-    chunk = text[:4000]
+    chunk = tokens.truncate_to_tokens(text, 1000, model)
     try:
         return llm_service.chat_completion(
             messages=[{"role": "user", "content": COACH_PROMPT.format(text=chunk)}],
@@ -894,7 +911,7 @@ PARAPHRASE_STYLES = {
 def paraphrase_text(text: str, style: str = "academic", model: str = None) -> str:
     """Rewrites the text in different styles."""
     s = PARAPHRASE_STYLES.get(style, PARAPHRASE_STYLES["academic"])
-    chunk = text[:4000]
+    chunk = tokens.truncate_to_tokens(text, 1000, model)
     try:
         return llm_service.chat_completion(
             messages=[
@@ -934,7 +951,7 @@ Write in English, in Markdown format:"""
 
 def gap_analysis(text: str, model: str = None) -> str:
     """Document gap analysis."""
-    chunk = text[:5000]
+    chunk = tokens.truncate_to_tokens(text, 1250, model)
     try:
         return llm_service.chat_completion(
             messages=[{"role": "user", "content": GAP_PROMPT.format(text=chunk)}],
@@ -969,7 +986,7 @@ Return ONLY a JSON array:"""
 
 def interactive_glossary(text: str, model: str = None) -> list:
     """Creates a document glossary of terms."""
-    chunk = text[:5000]
+    chunk = tokens.truncate_to_tokens(text, 1250, model)
     try:
         response = llm_service.chat_completion(
             messages=[{"role": "user", "content": GLOSSARY_PROMPT.format(text=chunk)}],
@@ -1006,7 +1023,7 @@ Write in English:"""
 
 def table_extractor(text: str, model: str = None) -> str:
     """Extracts and formats tables from the text."""
-    chunk = text[:6000]
+    chunk = tokens.truncate_to_tokens(text, 1500, model)
     try:
         return llm_service.chat_completion(
             messages=[{"role": "user", "content": TABLE_PROMPT.format(text=chunk)}],
@@ -1053,7 +1070,7 @@ def ai_persona_chat(
     p = PERSONAS.get(persona, PERSONAS["teacher"])
     system = p["prompt"]
     if context:
-        system += f"\n\nContext:\n{context[:3000]}"
+        system += f"\n\nContext:\n{tokens.truncate_to_tokens(context, 750, model)}"
     try:
         return llm_service.chat_completion(
             messages=[
@@ -1092,7 +1109,7 @@ def multi_file_analysis(documents: list, model: str = None) -> str:
     docs_text = ""
     for i, doc in enumerate(documents[:8], 1):
         name = doc.get("name", f"Document {i}")
-        text = doc.get("text", "")[:1500]
+        text = tokens.truncate_to_tokens(doc.get("text", ""), 375, model)
         docs_text += f"\n### Document {i}: {name}\n{text}\n"
     try:
         return llm_service.chat_completion(
@@ -1139,7 +1156,7 @@ Write in English, numbered list:"""
 
 def question_bank_generator(text: str, count: int = 20, model: str = None) -> str:
     """Comprehensive question bank based on Bloom's taxonomy."""
-    chunk = text[:5000]
+    chunk = tokens.truncate_to_tokens(text, 1250, model)
     try:
         return llm_service.chat_completion(
             messages=[
@@ -1182,8 +1199,8 @@ def document_diff(
     text_a: str, name_a: str, text_b: str, name_b: str, model: str = None
 ) -> str:
     """Shows the differences between two texts."""
-    chunk_a = text_a[:3000]
-    chunk_b = text_b[:3000]
+    chunk_a = tokens.truncate_to_tokens(text_a, 750, model)
+    chunk_b = tokens.truncate_to_tokens(text_b, 750, model)
     try:
         return llm_service.chat_completion(
             messages=[
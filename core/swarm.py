@@ -14,10 +14,13 @@ If a CORRECTION is needed, briefly state the error and what needs to be done (Ne
 """
 
 
-def generate_draft(
-    messages: list, model: str, max_tokens: int, temperature: float
-) -> str:
-    """Drafter agent prepares the initial draft."""
+PARTIAL_DRAFT_NOTE = """
+NOTE: The draft is still being written and may stop mid-sentence. Judge only the
+part that is present; do not reject it for being incomplete.
+"""
+
+
+def _draft_messages(messages: list) -> list:
     messages_draft = messages.copy()
     messages_draft.append(
         {
@@ -25,8 +28,15 @@ def generate_draft(
             "content": "You are a Drafter agent. Prepare a draft based on the provided information.",
         }
     )
+    return messages_draft
+
+
+def generate_draft(
+    messages: list, model: str, max_tokens: int, temperature: float
+) -> str:
+    """Drafter agent prepares the initial draft."""
     return llm_service.chat_completion(
-        messages=messages_draft,
+        messages=_draft_messages(messages),
         model=model,
         max_tokens=max_tokens,
         temperature=temperature,
@@ -34,8 +44,24 @@ def generate_draft(
     )
 
 
-def critique_draft(question: str, context: str, draft: str, model: str) -> str:
-    """Critic agent inspects the draft."""
+def stream_draft(messages: list, model: str, max_tokens: int, temperature: float):
+    """Drafter agent, streamed: yields the draft as it is generated."""
+    yield from llm_service.stream_completion(
+        messages=_draft_messages(messages),
+        model=model,
+        max_tokens=max_tokens,
+        temperature=temperature,
+    )
+
+
+def is_approved(critique: str) -> bool:
+    return "APPROVED" in critique.upper()
+
+
+def critique_draft(
+    question: str, context: str, draft: str, model: str, partial: bool = False
+) -> str:
+    """Critic agent inspects the draft (partial=True: a prefix of a draft still being written)."""
     user_prompt = f"""
 USER QUESTION: {question}
 
@@ -44,7 +70,7 @@ CONTEXT:
 
 DRAFTER AGENT'S DRAFT:
 {draft}
-
+{PARTIAL_DRAFT_NOTE if partial else ""}
 Make your decision:
 """
     messages = [
@@ -0,0 +1,427 @@
+"""
+LunarTech AI — ANN Index
+IVF (inverted-file) cosine index over a memory-mapped float32 vector file.
+Metadata and list assignments live in SQLite, so reopening only reads the
+small id table; vectors stay on disk until a probed list touches them.
+
+Benchmark recall@k vs. latency against brute force with:
+
+    python -m services.ann_index [n] [dim]
+"""
+
+import json
+import os
+import sys
+import time
+import sqlite3
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+
+INITIAL_ROWS = 1024
+TRAIN_SAMPLE = 20000
+KMEANS_ITERS = 10
+_CHUNK = 8192  # rows per block when scanning/assigning
+
+
+class IVFIndex:
+    """
+    Cosine-similarity IVF index.
+
+    Below ANN_MIN_TRAIN vectors every query is an exact scan. Once trained,
+    vectors are assigned to the nearest of ~sqrt(n) centroids and a query
+    scans only the ANN_NPROBE closest lists. The centroids are retrained
+    when the live count doubles since the last training.
+    """
+
+    def __init__(
+        self, path_prefix: str, dim: int, nprobe: int = None, index_fields: tuple = ()
+    ):
+        self.dim = dim
+        self.nprobe = nprobe or config.ANN_NPROBE
+        self.min_train = config.ANN_MIN_TRAIN
+        self._vectors_path = path_prefix + ".f32"
+        self._centroids_path = path_prefix + ".centroids.npy"
+        self._lock = threading.RLock()
+
+        self._db = sqlite3.connect(
+            path_prefix + ".db", check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS rows (
+                id TEXT PRIMARY KEY,
+                row INTEGER NOT NULL,
+                list INTEGER NOT NULL,
+                created_at INTEGER NOT NULL,
+                meta TEXT NOT NULL
+            );
+            """
+        )
+        # Expression indexes over metadata fields looked up by find()
+        for field in index_fields:
+            if not field.isidentifier():
+                raise ValueError(f"invalid metadata field name: {field!r}")
+            self._db.execute(
+                f"CREATE INDEX IF NOT EXISTS meta_{field} ON rows (json_extract(meta, '$.{field}'))"
+            )
+        self._open()
+
+    # ── Persistence ───────────────────────────────────────
+
+    def _open(self):
+        rows = self._db.execute("SELECT id, row, list FROM rows").fetchall()
+        self._row_of = {r[0]: r[1] for r in rows}
+        self._id_of = {r[1]: r[0] for r in rows}
+        self._list_of = {r[1]: r[2] for r in rows}
+
+        self._vectors = None
+        if os.path.exists(self._vectors_path) and os.path.getsize(self._vectors_path):
+            capacity = os.path.getsize(self._vectors_path) // (4 * self.dim)
+            self._vectors = np.memmap(
+                self._vectors_path, dtype="float32", mode="r+", shape=(capacity, self.dim)
+            )
+        elif rows:
+            # Metadata without vectors cannot be searched; start over
+            self._db.execute("DELETE FROM rows")
+            self._row_of, self._id_of, self._list_of = {}, {}, {}
+
+        used = set(self._id_of)
+        high = max(used) + 1 if used else 0
+        self._free = sorted(set(range(high)) - used, reverse=True)
+        self._next_row = high
+
+        self._centroids = None
+        self._trained_on = 0
+        if os.path.exists(self._centroids_path) and self._row_of:
+            self._centroids = np.load(self._centroids_path)
+            self._trained_on = len(self._row_of)
+        self._lists_dirty = True
+        self._lists = {}
+        self._all_rows = None
+
+    def _ensure_capacity(self, rows: int):
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, INITIAL_ROWS, capacity * 2)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self._vectors = np.memmap(
+            self._vectors_path, dtype="float32", mode="r+", shape=(new_capacity, self.dim)
+        )
+
+    def flush(self):
+        """Persists vectors and retrains the coarse quantizer if the index has grown."""
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+            n = len(self._row_of)
+            if n >= self.min_train and (
+                self._centroids is None or n >= 2 * self._trained_on
+            ):
+                self.train()
+
+    # ── Mutations ─────────────────────────────────────────
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype="float32").reshape(-1, vectors.shape[-1])
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def upsert(self, ids: list[str], vectors: np.ndarray, metas: list[dict]):
+        """Adds or replaces vectors (normalised here) with their metadata."""
+        if not ids:
+            return
+        vectors = self._normalize(vectors)
+        if len(set(ids)) != len(ids):
+            last = {id_: i for i, id_ in enumerate(ids)}
+            keep = sorted(last.values())
+            ids = [ids[i] for i in keep]
+            vectors = vectors[keep]
+            metas = [metas[i] for i in keep]
+        now = int(time.time())
+        with self._lock:
+            rows = []
+            for id_ in ids:
+                row = self._row_of.get(id_)
+                if row is None:
+                    row = self._free.pop() if self._free else self._next_row
+                    self._next_row = max(self._next_row, row + 1)
+                rows.append(row)
+            self._ensure_capacity(self._next_row)
+            self._vectors[rows] = vectors
+            lists = self._assign(vectors) if self._centroids is not None else [-1] * len(ids)
+
+            records = []
+            for id_, row, lst, meta in zip(ids, rows, lists, metas):
+                self._row_of[id_] = row
+                self._id_of[row] = id_
+                self._list_of[row] = int(lst)
+                records.append((id_, row, int(lst), now, json.dumps(meta, default=str)))
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT OR REPLACE INTO rows (id, row, list, created_at, meta) VALUES (?, ?, ?, ?, ?)",
+                records,
+            )
+            self._db.execute("COMMIT")
+            self._lists_dirty = True
+
+    def delete(self, ids: list[str]) -> int:
+        with self._lock:
+            rows = [(i, self._row_of.pop(i)) for i in ids if i in self._row_of]
+            if not rows:
+                return 0
+            for _, row in rows:
+                self._id_of.pop(row, None)
+                self._list_of.pop(row, None)
+                self._free.append(row)
+            self._free.sort(reverse=True)
+            self._db.execute("BEGIN")
+            self._db.executemany("DELETE FROM rows WHERE id = ?", [(i,) for i, _ in rows])
+            self._db.execute("COMMIT")
+            self._lists_dirty = True
+            return len(rows)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM rows")
+            self._vectors = None
+            for path in (self._vectors_path, self._centroids_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._open()
+
+    # ── Reads ─────────────────────────────────────────────
+
+    def __len__(self):
+        return len(self._row_of)
+
+    def __contains__(self, id_: str):
+        return id_ in self._row_of
+
+    def get(self, ids: list[str]) -> list[dict]:
+        """Stored records ({"id", "created_at", **meta}) for the ids that exist."""
+        if not ids:
+            return []
+        found = {}
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                part = ids[start : start + 500]
+                marks = ",".join("?" * len(part))
+                for id_, created_at, meta in self._db.execute(
+                    f"SELECT id, created_at, meta FROM rows WHERE id IN ({marks})", part
+                ):
+                    found[id_] = {**json.loads(meta), "id": id_, "created_at": created_at}
+        return [found[i] for i in ids if i in found]
+
+    def get_vectors(self, ids: list[str]) -> dict[str, np.ndarray]:
+        with self._lock:
+            return {i: np.array(self._vectors[self._row_of[i]]) for i in ids if i in self._row_of}
+
+    def find(self, field: str, value) -> list[str]:
+        """Ids whose metadata has meta[field] == value (indexed if field is in index_fields)."""
+        if not field.isidentifier():
+            raise ValueError(f"invalid metadata field name: {field!r}")
+        with self._lock:
+            return [
+                r[0]
+                for r in self._db.execute(
+                    f"SELECT id FROM rows WHERE json_extract(meta, '$.{field}') = ?", (value,)
+                )
+            ]
+
+    def search(self, query: np.ndarray, top_k: int, threshold: float = None, exact: bool = False):
+        """
+        Returns [(id, cosine)] best first. `exact=True` forces a full scan
+        (used as the brute-force reference in the benchmark).
+        """
+        query = self._normalize(np.asarray(query))[0]
+        with self._lock:
+            if not self._row_of:
+                return []
+            candidates = self._candidates(query, exact)
+            if not len(candidates):
+                return []
+            scores = self._score(candidates, query)
+            k = min(top_k, len(scores))
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            return [
+                (self._id_of[int(candidates[i])], float(scores[i]))
+                for i in best
+                if threshold is None or scores[i] >= threshold
+            ]
+
+    def _score(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(rows), dtype="float32")
+        for start in range(0, len(rows), _CHUNK):
+            block = rows[start : start + _CHUNK]
+            scores[start : start + _CHUNK] = self._vectors[block] @ query
+        return scores
+
+    def _candidates(self, query: np.ndarray, exact: bool) -> np.ndarray:
+        self._rebuild_lists()
+        if exact or self._centroids is None:
+            candidates = self._all_rows
+        else:
+            nprobe = min(self.nprobe, len(self._centroids))
+            probe = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+            parts = [self._lists.get(int(p)) for p in probe]
+            # Rows added before the first training have no list yet
+            parts.append(self._lists.get(-1))
+            candidates = np.concatenate([p for p in parts if p is not None] or [np.empty(0, "int64")])
+        return np.sort(candidates)  # sequential reads from the memmap
+
+    def _rebuild_lists(self):
+        if not self._lists_dirty:
+            return
+        rows = np.fromiter(self._list_of.keys(), dtype="int64", count=len(self._list_of))
+        lists = np.fromiter(self._list_of.values(), dtype="int64", count=len(self._list_of))
+        order = np.argsort(lists, kind="stable")
+        rows, lists = rows[order], lists[order]
+        bounds = np.flatnonzero(np.diff(lists)) + 1
+        self._lists = {
+            int(group[0]): r for group, r in zip(np.split(lists, bounds), np.split(rows, bounds)) if len(group)
+        }
+        self._all_rows = np.sort(rows)
+        self._lists_dirty = False
+
+    # ── Training ──────────────────────────────────────────
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        out = np.empty(len(vectors), dtype="int64")
+        for start in range(0, len(vectors), _CHUNK):
+            out[start : start + _CHUNK] = np.argmax(
+                vectors[start : start + _CHUNK] @ self._centroids.T, axis=1
+            )
+        return out
+
+    def train(self):
+        """Spherical k-means on a sample, then reassigns every live vector."""
+        with self._lock:
+            rows = np.array(sorted(self._id_of), dtype="int64")
+            n = len(rows)
+            nlist = max(1, min(int(np.sqrt(n) * config.ANN_LIST_FACTOR), n // 8 or 1))
+            rng = np.random.default_rng(0)
+            sample = np.sort(rng.choice(rows, size=min(n, TRAIN_SAMPLE), replace=False))
+            data = np.asarray(self._vectors[sample])
+
+            centroids = data[rng.choice(len(data), size=nlist, replace=False)]
+            for _ in range(KMEANS_ITERS):
+                assign = np.argmax(data @ centroids.T, axis=1)
+                order = np.argsort(assign, kind="stable")
+                counts = np.bincount(assign, minlength=nlist)
+                starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+                sums = np.zeros_like(centroids)
+                filled = counts > 0
+                sums[filled] = np.add.reduceat(data[order], starts[filled], axis=0)
+                empty = counts == 0
+                # Re-seed empty lists with random points
+                sums[empty] = data[rng.choice(len(data), size=int(empty.sum()))]
+                centroids = self._normalize(sums)
+
+            self._centroids = centroids.astype("float32")
+            lists = np.empty(n, dtype="int64")
+            for start in range(0, n, _CHUNK):
+                block = rows[start : start + _CHUNK]
+                lists[start : start + _CHUNK] = self._assign(np.asarray(self._vectors[block]))
+
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "UPDATE rows SET list = ? WHERE id = ?",
+                [(int(l), self._id_of[int(r)]) for l, r in zip(lists, rows)],
+            )
+            self._db.execute("COMMIT")
+            np.save(self._centroids_path, self._centroids)
+            self._list_of = {int(r): int(l) for r, l in zip(rows, lists)}
+            self._trained_on = n
+            self._lists_dirty = True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "vectors": len(self._row_of),
+                "lists": 0 if self._centroids is None else len(self._centroids),
+                "nprobe": self.nprobe,
+                "trained_on": self._trained_on,
+                "bytes": 0 if self._vectors is None else self._vectors.shape[0] * self.dim * 4,
+            }
+
+
+# ── Benchmark ─────────────────────────────────────────────
+
+
+def _clustered(n: int, dim: int, rng) -> np.ndarray:
+    """Synthetic embeddings: gaussian blobs on the unit sphere."""
+    centers = rng.standard_normal((max(8, n // 500), dim)).astype("float32")
+    data = centers[rng.integers(0, len(centers), n)] + 0.35 * rng.standard_normal((n, dim)).astype("float32")
+    return data
+
+
+def benchmark(n: int = 50000, dim: int = 384, queries: int = 200, k: int = 10) -> list[dict]:
+    import tempfile
+
+    rng = np.random.default_rng(42)
+    data = _clustered(n + queries, dim, rng)
+    base, probes = data[:n], data[n:]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = IVFIndex(os.path.join(tmp, "bench"), dim)
+        started = time.perf_counter()
+        for start in range(0, n, 5000):
+            ids = [str(i) for i in range(start, min(n, start + 5000))]
+            index.upsert(ids, base[start : start + 5000], [{}] * len(ids))
+        index.flush()
+        build_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        reopened = IVFIndex(os.path.join(tmp, "bench"), dim)
+        reopen_s = time.perf_counter() - started
+
+        truth, exact_ms = [], []
+        for q in probes:
+            t0 = time.perf_counter()
+            truth.append({i for i, _ in reopened.search(q, k, exact=True)})
+            exact_ms.append((time.perf_counter() - t0) * 1000)
+
+        results = [{"nprobe": "exact", "recall": 1.0, "p50_ms": float(np.median(exact_ms))}]
+        for nprobe in (1, 2, 4, 8, 16, 32):
+            reopened.nprobe = nprobe
+            hits, lat = 0, []
+            for q, expected in zip(probes, truth):
+                t0 = time.perf_counter()
+                got = {i for i, _ in reopened.search(q, k)}
+                lat.append((time.perf_counter() - t0) * 1000)
+                hits += len(got & expected)
+            results.append(
+                {
+                    "nprobe": nprobe,
+                    "recall": hits / (k * len(probes)),
+                    "p50_ms": float(np.median(lat)),
+                }
+            )
+        meta = dict(reopened.stats(), build_s=build_s, reopen_s=reopen_s)
+    return [meta] + results
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 384
+    meta, *rows = benchmark(n, dim)
+    print(
+        f"IVF benchmark: {meta['vectors']:,} vectors x {dim}d, {meta['lists']} lists, "
+        f"build {meta['build_s']:.1f}s, reopen {meta['reopen_s'] * 1000:.0f} ms"
+    )
+    print(f"{'nprobe':>7} {'recall@10':>10} {'p50 ms':>8}")
+    for r in rows:
+        print(f"{r['nprobe']:>7} {r['recall']:>10.3f} {r['p50_ms']:>8.2f}")
@@ -0,0 +1,164 @@
+"""
+LunarTech AI — ANN Vector Storage
+LightRAG vector storage backed by services.ann_index.IVFIndex. Used instead
+of NanoVectorDBStorage for the local (non-Postgres) setup: vectors stay in a
+memory-mapped file, queries scan only the nearest IVF lists, and reopening
+does not load the whole store into RAM.
+"""
+
+import asyncio
+import base64
+import json
+import os
+import sys
+import zlib
+from dataclasses import dataclass
+from typing import Any, final
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+from utils import logger
+
+from lightrag.base import BaseVectorStorage
+from lightrag.utils import compute_mdhash_id
+
+from services.ann_index import IVFIndex
+
+STORAGE_NAME = "AnnVectorDBStorage"
+RELATION_FIELDS = ("src_id", "tgt_id")  # indexed for delete_entity_relation
+
+
+def register() -> str:
+    """Makes the storage selectable by name in LightRAG; returns that name."""
+    from lightrag import kg
+
+    kg.STORAGES[STORAGE_NAME] = "services.ann_vector_storage"
+    impls = kg.STORAGE_IMPLEMENTATIONS["VECTOR_STORAGE"]["implementations"]
+    if STORAGE_NAME not in impls:
+        impls.append(STORAGE_NAME)
+    kg.STORAGE_ENV_REQUIREMENTS.setdefault(STORAGE_NAME, [])
+    return STORAGE_NAME
+
+
+@final
+@dataclass
+class AnnVectorDBStorage(BaseVectorStorage):
+    def __post_init__(self):
+        self._validate_embedding_func()
+        kwargs = self.global_config.get("vector_db_storage_cls_kwargs", {})
+        threshold = kwargs.get("cosine_better_than_threshold")
+        if threshold is None:
+            raise ValueError(
+                "cosine_better_than_threshold must be specified in vector_db_storage_cls_kwargs"
+            )
+        self.cosine_better_than_threshold = threshold
+
+        workspace = getattr(self, "workspace", "") or ""
+        self._dir = os.path.join(self.global_config["working_dir"], workspace)
+        os.makedirs(self._dir, exist_ok=True)
+        self._max_batch_size = self.global_config.get("embedding_batch_num", 32)
+        self._index = IVFIndex(
+            os.path.join(self._dir, f"ann_{self.namespace}"),
+            self.embedding_func.embedding_dim,
+            index_fields=RELATION_FIELDS if set(RELATION_FIELDS) <= set(self.meta_fields) else (),
+        )
+        self._migrate_nano()
+
+    def _migrate_nano(self):
+        """One-time import of an existing NanoVectorDB JSON store (no re-embedding)."""
+        path = os.path.join(self._dir, f"vdb_{self.namespace}.json")
+        if len(self._index) or not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                store = json.load(f)
+            raw = base64.b64decode(store["matrix"])
+            try:
+                raw = zlib.decompress(raw)
+            except zlib.error:
+                pass
+            matrix = np.frombuffer(raw, dtype="float32").reshape(-1, store["embedding_dim"])
+            data = store["data"]
+            self._index.upsert(
+                [d["__id__"] for d in data],
+                matrix[: len(data)],
+                [
+                    {k: v for k, v in d.items() if not k.startswith("__") and k != "vector"}
+                    for d in data
+                ],
+            )
+            self._index.flush()
+            logger.info("Imported NanoVectorDB store", namespace=self.namespace, vectors=len(data))
+        except Exception as e:
+            logger.warning("NanoVectorDB import skipped", namespace=self.namespace, error=str(e))
+
+    async def upsert(self, data: dict[str, dict[str, Any]]) -> None:
+        if not data:
+            return
+        ids = list(data)
+        contents = [v["content"] for v in data.values()]
+        batches = [
+            contents[i : i + self._max_batch_size]
+            for i in range(0, len(contents), self._max_batch_size)
+        ]
+        embeddings = np.concatenate(
+            await asyncio.gather(*(self.embedding_func(b) for b in batches))
+        )
+        metas = [
+            {k: v for k, v in value.items() if k in self.meta_fields}
+            for value in data.values()
+        ]
+        self._index.upsert(ids, embeddings, metas)
+
+    async def query(
+        self, query: str, top_k: int, query_embedding=None, **kwargs
+    ) -> list[dict[str, Any]]:
+        if query_embedding is None:
+            query_embedding = (await self.embedding_func([query]))[0]
+        hits = self._index.search(
+            np.asarray(query_embedding, dtype="float32"),
+            top_k,
+            threshold=self.cosine_better_than_threshold,
+        )
+        records = {r["id"]: r for r in self._index.get([i for i, _ in hits])}
+        return [
+            {**records[i], "distance": score}
+            for i, score in hits
+            if i in records
+        ]
+
+    async def delete(self, ids: list[str]):
+        self._index.delete(list(ids))
+
+    async def delete_entity(self, entity_name: str) -> None:
+        self._index.delete([compute_mdhash_id(entity_name, prefix="ent-")])
+
+    async def delete_entity_relation(self, entity_name: str) -> None:
+        ids = self._index.find("src_id", entity_name) + self._index.find("tgt_id", entity_name)
+        self._index.delete(list(dict.fromkeys(ids)))
+
+    async def get_by_id(self, id: str) -> dict[str, Any] | None:
+        found = self._index.get([id])
+        return found[0] if found else None
+
+    async def get_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
+        return self._index.get(list(ids))
+
+    async def get_vectors_by_ids(self, ids: list[str]) -> dict[str, list[float]]:
+        return {i: v.tolist() for i, v in self._index.get_vectors(list(ids)).items()}
+
+    async def index_done_callback(self) -> bool:
+        self._index.flush()
+        return True
+
+    async def drop(self) -> dict[str, str]:
+        try:
+            self._index.clear()
+            return {"status": "success", "message": "data dropped"}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def stats(self) -> dict:
+        return self._index.stats()
@@ -0,0 +1,299 @@
+"""
+LunarTech AI — BM25 Index
+Lexical inverted index over the chunks LightRAG stores, for exact codes,
+names and numbers that the 384-d embeddings blur together. Postings are
+varint delta-encoded (doc gap, term frequency) blobs in SQLite, appended
+incrementally as chunks are ingested.
+"""
+
+import json
+import math
+import os
+import re
+import sys
+import sqlite3
+import threading
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+from utils import logger
+
+INDEX_DB = os.path.join(config.LIGHTRAG_WORK_DIR, "bm25.db")
+K1 = 1.2
+B = 0.75
+COMPACT_RATIO = 0.2  # rewrite postings once this share of docs is deleted
+
+# Keeps codes like "ISO-27001", "v2.1.3", "A4/B" together; parts are indexed too
+_TOKEN = re.compile(r"\w+(?:[-./:]\w+)*")
+_PARTS = re.compile(r"[-./:]")
+
+_lock = threading.Lock()
+_db = None
+_docs = None  # doc_no -> (chunk id, length)
+_doc_of = None  # chunk id -> doc_no
+_total_len = 0
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for match in _TOKEN.findall(text.lower()):
+        tokens.append(match)
+        if _PARTS.search(match):
+            tokens.extend(p for p in _PARTS.split(match) if p)
+    return tokens
+
+
+# ── Postings encoding ─────────────────────────────────────
+
+
+def _encode(pairs, last_doc: int) -> bytes:
+    """Varint-encodes (doc_no, tf) pairs as (gap from previous doc, tf)."""
+    out = bytearray()
+    for doc_no, tf in pairs:
+        for value in (doc_no - last_doc, tf):
+            while value >= 0x80:
+                out.append((value & 0x7F) | 0x80)
+                value >>= 7
+            out.append(value)
+        last_doc = doc_no
+    return bytes(out)
+
+
+def _decode(blob: bytes):
+    doc_no, value, shift, first = 0, 0, 0, True
+    gap = 0
+    for byte in blob:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        if first:
+            gap = value
+        else:
+            doc_no += gap
+            yield doc_no, value
+        first = not first
+        value, shift = 0, 0
+
+
+# ── Storage ───────────────────────────────────────────────
+
+
+def _get_db() -> sqlite3.Connection:
+    """Opens the index (caller holds _lock) and loads the small doc table."""
+    global _db, _docs, _doc_of, _total_len
+    if _db is None:
+        os.makedirs(os.path.dirname(INDEX_DB), exist_ok=True)
+        conn = sqlite3.connect(INDEX_DB, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS docs (
+                doc_no INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT UNIQUE NOT NULL,
+                len INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS terms (
+                term TEXT PRIMARY KEY,
+                last_doc INTEGER NOT NULL,
+                postings BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            """
+        )
+        rows = conn.execute("SELECT doc_no, id, len FROM docs").fetchall()
+        _docs = {r[0]: (r[1], r[2]) for r in rows}
+        _doc_of = {r[1]: r[0] for r in rows}
+        _total_len = sum(r[2] for r in rows)
+        _db = conn
+    return _db
+
+
+def _dead_count(db) -> int:
+    row = db.execute("SELECT value FROM meta WHERE key = 'dead'").fetchone()
+    return row[0] if row else 0
+
+
+def add(chunks: dict[str, str]):
+    """Indexes {chunk id: text}; re-adding an id replaces its previous text."""
+    global _total_len
+    if not chunks:
+        return
+    with _lock:
+        db = _get_db()
+        db.execute("BEGIN")
+        try:
+            _delete_locked(db, [i for i in chunks if i in _doc_of])
+            postings = {}  # term -> [(doc_no, tf)]
+            for chunk_id, text in chunks.items():
+                tokens = tokenize(text or "")
+                doc_no = db.execute(
+                    "INSERT INTO docs (id, len) VALUES (?, ?)", (chunk_id, len(tokens))
+                ).lastrowid
+                _docs[doc_no] = (chunk_id, len(tokens))
+                _doc_of[chunk_id] = doc_no
+                _total_len += len(tokens)
+                for term, tf in Counter(tokens).items():
+                    postings.setdefault(term, []).append((doc_no, tf))
+
+            for term, pairs in postings.items():
+                row = db.execute(
+                    "SELECT last_doc, postings FROM terms WHERE term = ?", (term,)
+                ).fetchone()
+                last_doc, blob = row if row else (0, b"")
+                db.execute(
+                    "INSERT OR REPLACE INTO terms (term, last_doc, postings) VALUES (?, ?, ?)",
+                    (term, pairs[-1][0], blob + _encode(pairs, last_doc)),
+                )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            _reset_memory()
+            raise
+
+
+def delete(ids: list[str]):
+    with _lock:
+        db = _get_db()
+        db.execute("BEGIN")
+        _delete_locked(db, [i for i in ids if i in _doc_of])
+        db.execute("COMMIT")
+        if _docs and _dead_count(db) > COMPACT_RATIO * len(_docs):
+            _compact_locked(db)
+
+
+def _delete_locked(db, ids: list[str]):
+    """Drops docs from the doc table; their postings become tombstones until compaction."""
+    global _total_len
+    if not ids:
+        return
+    for chunk_id in ids:
+        doc_no = _doc_of.pop(chunk_id)
+        _total_len -= _docs.pop(doc_no)[1]
+    db.executemany("DELETE FROM docs WHERE id = ?", [(i,) for i in ids])
+    db.execute(
+        "INSERT INTO meta (key, value) VALUES ('dead', ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+        (len(ids),),
+    )
+
+
+def _compact_locked(db):
+    """Rewrites every postings list without deleted docs."""
+    db.execute("BEGIN")
+    rewritten = []
+    for term, blob in db.execute("SELECT term, postings FROM terms").fetchall():
+        pairs = [(d, tf) for d, tf in _decode(blob) if d in _docs]
+        if pairs:
+            rewritten.append((term, pairs[-1][0], _encode(pairs, 0)))
+    db.execute("DELETE FROM terms")
+    db.executemany("INSERT INTO terms (term, last_doc, postings) VALUES (?, ?, ?)", rewritten)
+    db.execute("UPDATE meta SET value = 0 WHERE key = 'dead'")
+    db.execute("COMMIT")
+    logger.info("BM25 index compacted", terms=len(rewritten), docs=len(_docs))
+
+
+def _reset_memory():
+    global _db, _docs, _doc_of, _total_len
+    _db, _docs, _doc_of, _total_len = None, None, None, 0
+
+
+def clear():
+    with _lock:
+        db = _get_db()
+        db.execute("DELETE FROM docs")
+        db.execute("DELETE FROM terms")
+        db.execute("DELETE FROM meta")
+        _reset_memory()
+
+
+# ── Search ────────────────────────────────────────────────
+
+
+def search(query: str, top_k: int = 20) -> list[tuple[str, float]]:
+    """Returns [(chunk id, BM25 score)] best first."""
+    terms = set(tokenize(query))
+    if not terms:
+        return []
+    with _lock:
+        db = _get_db()
+        n = len(_docs)
+        if not n:
+            return []
+        avg_len = _total_len / n
+        scores = {}
+        marks = ",".join("?" * len(terms))
+        for term, blob in db.execute(
+            f"SELECT term, postings FROM terms WHERE term IN ({marks})", list(terms)
+        ):
+            live = [(d, tf) for d, tf in _decode(blob) if d in _docs]
+            if not live:
+                continue
+            idf = math.log(1 + (n - len(live) + 0.5) / (len(live) + 0.5))
+            for doc_no, tf in live:
+                length = _docs[doc_no][1]
+                norm = tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_len))
+                scores[doc_no] = scores.get(doc_no, 0.0) + idf * norm
+        best = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
+        return [(_docs[d][0], s) for d, s in best]
+
+
+def stats() -> dict:
+    with _lock:
+        db = _get_db()
+        terms = db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(postings)), 0) FROM terms").fetchone()
+        return {
+            "docs": len(_docs),
+            "terms": terms[0],
+            "postings_bytes": terms[1],
+            "deleted_pending": _dead_count(db),
+        }
+
+
+# ── LightRAG hook ─────────────────────────────────────────
+
+
+def attach(chunks_vdb):
+    """
+    Mirrors LightRAG's chunk vector storage into the index: every chunk
+    upserted/deleted there is indexed/removed here too.
+    """
+    upsert, remove, drop = chunks_vdb.upsert, chunks_vdb.delete, chunks_vdb.drop
+
+    async def _upsert(data, *args, **kwargs):
+        await upsert(data, *args, **kwargs)
+        try:
+            add({k: v.get("content", "") for k, v in data.items()})
+        except Exception as e:
+            logger.warning("BM25 indexing failed", error=str(e))
+
+    async def _delete(ids, *args, **kwargs):
+        await remove(ids, *args, **kwargs)
+        delete(list(ids))
+
+    async def _drop(*args, **kwargs):
+        result = await drop(*args, **kwargs)
+        clear()
+        return result
+
+    chunks_vdb.upsert, chunks_vdb.delete, chunks_vdb.drop = _upsert, _delete, _drop
+    _backfill()
+
+
+def _backfill():
+    """First run on an existing store: index chunks from LightRAG's JSON chunk store."""
+    path = os.path.join(config.LIGHTRAG_WORK_DIR, "kv_store_text_chunks.json")
+    with _lock:
+        _get_db()
+        empty = not _docs
+    if not empty or not os.path.exists(path):
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+        add({k: v.get("content", "") for k, v in chunks.items() if isinstance(v, dict)})
+        logger.info("BM25 index backfilled", chunks=len(chunks))
+    except Exception as e:
+        logger.warning("BM25 backfill skipped", error=str(e))
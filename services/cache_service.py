@@ -1,23 +1,118 @@
 """
 LunarTech AI — Cache Service
-LRU memory + disk cache for LLM responses.
+LRU memory + SQLite (WAL) disk cache for LLM responses.
 """
 
 import hashlib
 import json
 import os
+import sys
 import time
-from functools import lru_cache
+import sqlite3
+import threading
 from collections import OrderedDict
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+
 CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "cache")
 os.makedirs(CACHE_DIR, exist_ok=True)
+CACHE_DB = os.path.join(CACHE_DIR, "llm_cache.db")
 
 # ── In-memory LRU cache ──
 _memory_cache = OrderedDict()
 MAX_MEMORY = 100  # son 100 sorgu hafızada
 CACHE_TTL = 3600  # 1 saat
 
+# ── Disk cache (single SQLite file) ──
+MAX_DISK_BYTES = config.CACHE_MAX_BYTES
+SWEEP_INTERVAL = config.CACHE_SWEEP_INTERVAL
+EVICT_TARGET = 0.9  # LRU eviction trims down to 90% of the quota
+
+_db = None
+_db_lock = threading.Lock()
+_sweeper = None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    model TEXT,
+    ts REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_expires ON entries(expires_at);
+CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access);
+
+-- Running totals kept by triggers so stats() never scans the table
+CREATE TABLE IF NOT EXISTS meta (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    items INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (id, items, bytes) VALUES (1, 0, 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE meta SET items = items + 1, bytes = bytes + NEW.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE meta SET items = items - 1, bytes = bytes - OLD.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_entries_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE meta SET bytes = bytes - OLD.size + NEW.size WHERE id = 1;
+END;
+"""
+
+
+def _get_db() -> sqlite3.Connection:
+    """Opens the cache database once (WAL mode) and starts the TTL sweeper."""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                conn = sqlite3.connect(
+                    CACHE_DB, check_same_thread=False, isolation_level=None
+                )
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(_SCHEMA)
+                _migrate_json_files(conn)
+                _db = conn
+        _start_sweeper()
+    return _db
+
+
+def _migrate_json_files(conn: sqlite3.Connection):
+    """Imports entries from the legacy one-JSON-file-per-key layout, then removes them."""
+    now = time.time()
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if now - entry["ts"] < CACHE_TTL:
+                _db_put(conn, name[:-5], entry["value"], entry.get("model"), entry["ts"])
+            os.remove(path)
+        except Exception:
+            pass
+
+
+def _db_put(conn, key: str, value: str, model: str, ts: float):
+    # An upsert, not INSERT OR REPLACE: REPLACE's implicit delete does not fire
+    # trg_entries_delete, so meta would count a rewritten key twice
+    conn.execute(
+        "INSERT INTO entries (key, value, model, ts, expires_at, last_access, size) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value, model = excluded.model, "
+        "ts = excluded.ts, expires_at = excluded.expires_at, "
+        "last_access = excluded.last_access, size = excluded.size",
+        (key, value, model, ts, ts + CACHE_TTL, time.time(), len(value.encode())),
+    )
+
 
 def _make_key(messages: list, model: str, max_tokens: int, temperature: float) -> str:
     """Cache key oluşturur (SHA256 hash)."""
@@ -50,19 +145,25 @@ def get(
             del _memory_cache[key]
 
     # 2. Disk cache
-    path = os.path.join(CACHE_DIR, f"{key}.json")
-    if os.path.exists(path):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                entry = json.load(f)
-            if time.time() - entry["ts"] < CACHE_TTL:
-                _memory_cache[key] = entry
-                _trim_memory()
-                return entry["value"]
-            else:
-                os.remove(path)
-        except Exception:
-            pass
+    try:
+        db = _get_db()
+        now = time.time()
+        with _db_lock:
+            row = db.execute(
+                "SELECT value, model, ts FROM entries WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row is not None:
+                db.execute(
+                    "UPDATE entries SET last_access = ? WHERE key = ?", (now, key)
+                )
+        if row is not None:
+            entry = {"value": row[0], "model": row[1], "ts": row[2]}
+            _memory_cache[key] = entry
+            _trim_memory()
+            return entry["value"]
+    except Exception:
+        pass
 
     return None
 
@@ -78,9 +179,10 @@ def put(messages: list, model: str, max_tokens: int, temperature: float, value:
 
     # Disk
     try:
-        path = os.path.join(CACHE_DIR, f"{key}.json")
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(entry, f, ensure_ascii=False)
+        db = _get_db()
+        with _db_lock:
+            _db_put(db, key, value, model, entry["ts"])
+            _evict_if_needed(db)
     except Exception:
         pass
 
@@ -91,23 +193,77 @@ def _trim_memory():
         _memory_cache.popitem(last=False)
 
 
+def _evict_if_needed(db: sqlite3.Connection):
+    """Deletes least-recently-used rows while the disk cache exceeds its byte quota."""
+    if MAX_DISK_BYTES <= 0:
+        return
+    used = db.execute("SELECT bytes FROM meta WHERE id = 1").fetchone()[0]
+    if used <= MAX_DISK_BYTES:
+        return
+    target = int(MAX_DISK_BYTES * EVICT_TARGET)
+    while used > target:
+        rows = db.execute(
+            "SELECT key, size FROM entries ORDER BY last_access LIMIT 100"
+        ).fetchall()
+        if not rows:
+            break
+        db.executemany("DELETE FROM entries WHERE key = ?", [(r[0],) for r in rows])
+        used -= sum(r[1] for r in rows)
+
+
+def sweep_expired() -> int:
+    """Deletes expired disk entries (uses the expiry index). Returns the count."""
+    db = _get_db()
+    with _db_lock:
+        cur = db.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+        return cur.rowcount
+
+
+def _sweep_loop():
+    while True:
+        time.sleep(SWEEP_INTERVAL)
+        try:
+            sweep_expired()
+        except Exception:
+            pass
+
+
+def _start_sweeper():
+    global _sweeper
+    if _sweeper is None and SWEEP_INTERVAL > 0:
+        _sweeper = threading.Thread(target=_sweep_loop, daemon=True)
+        _sweeper.start()
+
+
 def clear():
     """Tüm cache'i temizle."""
     global _memory_cache
     _memory_cache = OrderedDict()
-    for f in os.listdir(CACHE_DIR):
-        try:
-            os.remove(os.path.join(CACHE_DIR, f))
-        except Exception:
-            pass
+    try:
+        db = _get_db()
+        with _db_lock:
+            db.execute("DELETE FROM entries")
+            db.execute("VACUUM")
+    except Exception:
+        pass
 
 
 def stats() -> dict:
     """Cache istatistikleri."""
-    disk_count = len([f for f in os.listdir(CACHE_DIR) if f.endswith(".json")])
+    disk_items, disk_bytes = 0, 0
+    try:
+        db = _get_db()
+        with _db_lock:
+            disk_items, disk_bytes = db.execute(
+                "SELECT items, bytes FROM meta WHERE id = 1"
+            ).fetchone()
+    except Exception:
+        pass
     return {
         "memory_items": len(_memory_cache),
-        "disk_items": disk_count,
+        "disk_items": disk_items,
+        "disk_bytes": disk_bytes,
+        "max_disk_bytes": MAX_DISK_BYTES,
         "max_memory": MAX_MEMORY,
         "ttl_seconds": CACHE_TTL,
     }
@@ -3,11 +3,22 @@ LunarTech AI - Chat Servisi v3
 RAG + citation + smart mode + custom prompt + conversation memory.
 """
 
-import os, sys
+import os, sys, json, time, threading
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 import config
-from services import llm_service, lightrag_service
+from services import (
+    llm_service,
+    lightrag_service,
+    rate_limiter,
+    semantic_cache,
+    context_packer,
+    critic_gate,
+    web_context,
+    conversation_memory,
+)
+from utils import logger, tokens
 from core.smart_features import (
     extract_citations,
     format_answer_with_citations,
@@ -48,29 +59,44 @@ def build_messages(
     custom_prompt=None,
     memory_summary=None,
     use_persona=False,
+    model=None,
+    max_tokens=4096,
+    persona_history=None,
 ):
     messages = []
-    if context:
-        sys_content = SYSTEM_PROMPT.format(context=context)
-    else:
-        sys_content = NO_CONTEXT_PROMPT
-
+    sys_content = ""
     if custom_prompt:
         sys_content += f"\n\nEk talimatlar:\n{custom_prompt}"
     if memory_summary:
         sys_content += f"\n\nÖnceki sohbet özeti:\n{memory_summary}"
 
-    if use_persona and chat_history:
-        user_texts = [m["content"] for m in chat_history if m["role"] == "user"]
+    persona_history = persona_history or chat_history
+    if use_persona and persona_history:
+        user_texts = [m["content"] for m in persona_history if m["role"] == "user"]
         if user_texts:
             recent_texts = " ".join(user_texts[-5:])
             sys_content += f"\n\n[CRITICAL INSTRUCTION: CORPORATE PERSONA AND TONE CLONING]\nYou are currently asked to mimic the tone of the User and their Company. EXACTLY CLONE the style, jargon, word choices, sentence lengths, and formality level from the past user messages below:\nExample Company Tone: \"'{recent_texts}'\"\nFORMAT your responses to be completely aligned with this tone."
 
-    messages.append({"role": "system", "content": sys_content})
     if chat_history:
         for msg in chat_history[-20:]:
             messages.append({"role": msg["role"], "content": msg["content"]})
     messages.append({"role": "user", "content": question})
+
+    if context:
+        # The context gets whatever the rest of the prompt and the answer leave of the window
+        reserved = max_tokens + tokens.count(SYSTEM_PROMPT + sys_content, model)
+        reserved += sum(tokens.count_many([m["content"] for m in messages], model))
+        context = context_packer.pack(
+            str(context),
+            question,
+            context_packer.budget(model, reserved),
+            label="chat",
+            model=model,
+        )
+        sys_content = SYSTEM_PROMPT.format(context=context) + sys_content
+    else:
+        sys_content = NO_CONTEXT_PROMPT + sys_content
+    messages.insert(0, {"role": "system", "content": sys_content})
     return messages
 
 
@@ -85,30 +111,91 @@ def generate_answer(
     custom_prompt=None,
     memory_summary=None,
     auto_rag=False,
+    doc_scope=None,
+    conversation_id=None,
 ):
     context = None
     if auto_rag and rag_mode == "hybrid":
         rag_mode = smart_rag_mode(question)
 
+    cache_scope = _semantic_scope(
+        model, has_documents, doc_scope, rag_mode, custom_prompt, chat_history
+    )
+    if cache_scope:
+        hit = semantic_cache.lookup(question, cache_scope)
+        if hit:
+            return hit["answer"]
+
     if has_documents:
         try:
-            context = lightrag_service.query(question, mode=rag_mode)
+            context = lightrag_service.get_rag_context(question, mode=rag_mode)
         except Exception as e:
             context = f"Error retrieving context: {str(e)}"
 
+    history, memory_summary = _recall(conversation_id, chat_history, memory_summary, model)
     messages = build_messages(
-        question, context, chat_history, custom_prompt, memory_summary
+        question,
+        context,
+        history,
+        custom_prompt,
+        memory_summary,
+        model=model,
+        max_tokens=max_tokens,
     )
     answer = llm_service.chat_completion(
         messages=messages, model=model, max_tokens=max_tokens, temperature=temperature
     )
+    _remember(conversation_id, chat_history, question, answer, model)
 
     citations = extract_citations(context) if context else []
     answer = format_answer_with_citations(answer, citations)
 
+    if cache_scope:
+        semantic_cache.store(question, cache_scope, answer)
+
     return answer
 
 
+def _recall(conversation_id, chat_history, memory_summary, model):
+    """(history, summary) for the prompt: rolling memory when the conversation is known, else as given."""
+    if not (conversation_id and conversation_memory.enabled()):
+        return chat_history, memory_summary
+    summary, window = conversation_memory.recall(conversation_id, chat_history, model)
+    if memory_summary and summary:
+        summary = f"{memory_summary}\n\n{summary}"
+    return window, summary or memory_summary
+
+
+def _remember(conversation_id, chat_history, question, answer, model):
+    """Folds what this turn pushed out of the verbatim window into the conversation summary."""
+    if conversation_id and conversation_memory.enabled():
+        conversation_memory.remember(
+            conversation_id,
+            list(chat_history or [])
+            + [{"role": "user", "content": question}, {"role": "assistant", "content": answer}],
+            model,
+        )
+
+
+def _semantic_scope(model, has_documents, doc_scope, rag_mode, custom_prompt, chat_history=None):
+    """
+    Scope key for the semantic answer cache, or None when the tier is off.
+    Follow-ups ("tell me more") depend on the conversation, so only turns
+    without history use it. Document answers are scoped to the knowledge
+    graph version, which every insert bumps.
+    """
+    if not semantic_cache.enabled() or chat_history:
+        return None
+    if has_documents:
+        doc_scope = f"{doc_scope or ''}@graph-v{lightrag_service.get_graph_version()}"
+    return semantic_cache.make_scope(
+        model or config.DEFAULT_MODEL,
+        doc_scope if has_documents else "",
+        rag_mode if has_documents else "",
+        custom_prompt or "",
+    )
+
+
 def stream_answer(
     question,
     chat_history=None,
@@ -121,12 +208,36 @@ def stream_answer(
     memory_summary=None,
     auto_rag=False,
     use_persona=False,
+    doc_scope=None,
+    conversation_id=None,
 ):
+    started = time.monotonic()
     context = None
     actual_mode = rag_mode
     if auto_rag and rag_mode == "hybrid":
         actual_mode = smart_rag_mode(question)
 
+    # Persona answers depend on the chat history, so they never use the semantic tier
+    cache_scope = (
+        None
+        if use_persona
+        else _semantic_scope(
+            model, has_documents, doc_scope, actual_mode, custom_prompt, chat_history
+        )
+    )
+    if cache_scope:
+        hit = semantic_cache.lookup(question, cache_scope)
+        if hit:
+            yield {
+                "type": "status",
+                "state": "running",
+                "text": f"Answer served from semantic cache (similarity {hit['similarity']:.2f}).",
+            }
+            yield {"type": "status", "state": "complete", "text": "Cached answer."}
+            yield {"type": "chunk", "text": hit["answer"]}
+            yield {"type": "cache_hit", "entry_id": hit["id"], "question": hit["question"]}
+            return
+
     yield {"type": "status", "state": "running", "text": "Scanning documents..."}
 
     if has_documents:
@@ -136,7 +247,7 @@ def stream_answer(
                 "state": "update",
                 "text": f"Searching for context via LightRAG ({actual_mode} mode)...",
             }
-            context = lightrag_service.query(question, mode=actual_mode)
+            context = lightrag_service.get_rag_context(question, mode=actual_mode)
 
             if not context or len(str(context)) < 50:
                 yield {
@@ -145,42 +256,14 @@ def stream_answer(
                     "text": "Insufficient information found in document. Searching the web...",
                 }
                 try:
-                    from duckduckgo_search import DDGS
-                    import requests
-                    from bs4 import BeautifulSoup
-
-                    with DDGS() as ddgs:
-                        res = list(ddgs.text(question, max_results=2))
-                        if res:
-                            scraped_texts = []
-                            for r in res:
-                                try:
-                                    page = requests.get(r["href"], timeout=5)
-                                    soup = BeautifulSoup(page.content, "html.parser")
-                                    text_content = " ".join(
-                                        [p.text for p in soup.find_all("p")]
-                                    )
-                                    truncated = (
-                                        text_content[:1500]
-                                        if len(text_content) > 100
-                                        else r.get("body", "")
-                                    )
-                                    scraped_texts.append(
-                                        f"- Source: {r['title']} ({r['href']})\n  Content: {truncated}"
-                                    )
-                                except Exception:
-                                    scraped_texts.append(
-                                        f"- Source: {r['title']}\n  Info: {r.get('body', '')}"
-                                    )
-
-                            context = "DYNAMIC WEB SCAN RESULTS:\n" + "\n\n".join(
-                                scraped_texts
-                            )
-                            yield {
-                                "type": "status",
-                                "state": "update",
-                                "text": "Live Web scan completed. Synthesizing page contents...",
-                            }
+                    web = web_context.gather(question)
+                    if web:
+                        context = web
+                        yield {
+                            "type": "status",
+                            "state": "update",
+                            "text": "Live Web scan completed. Synthesizing page contents...",
+                        }
                 except Exception as web_e:
                     yield {
                         "type": "status",
@@ -208,12 +291,82 @@ def stream_answer(
         "text": "Context process completed. Autonomous agents engaged.",
     }
 
+    history, memory_summary = _recall(conversation_id, chat_history, memory_summary, model)
     messages = build_messages(
-        question, context, chat_history, custom_prompt, memory_summary, use_persona
+        question,
+        context,
+        history,
+        custom_prompt,
+        memory_summary,
+        use_persona,
+        model=model,
+        max_tokens=max_tokens,
+        persona_history=chat_history,
     )
 
     # --- SWARM LOGIC ---
-    from core.swarm import generate_draft, critique_draft, stream_refinement
+    swarm_mode = _swarm_mode(model)
+    swarm = _pipelined_swarm if swarm_mode == "pipelined" else _serial_swarm
+    full_answer = ""
+    first_token = None
+    for event in swarm(
+        question, str(context) if context else "", messages, model, max_tokens, temperature
+    ):
+        if event["type"] == "chunk":
+            if first_token is None:
+                first_token = time.monotonic() - started
+            full_answer += event["text"]
+        elif event["type"] == "replace":
+            full_answer = event["text"]
+        yield event
+    _record_latency(swarm_mode, first_token, time.monotonic() - started)
+    _remember(conversation_id, chat_history, question, full_answer, model)
+
+    from_web = bool(context) and context.startswith(web_context.HEADER)
+    if context and not from_web:
+        citations = extract_citations(context)
+        if citations:
+            citation_text = "\n\n---\n📚 **Sources:** " + ", ".join(
+                [
+                    f"Page {c['page']}"
+                    for c in sorted(
+                        set(tuple(ci.items()) for ci in citations),
+                        key=lambda x: dict(x)["page"],
+                    )
+                ][:5]
+            )
+            full_answer += citation_text
+            yield {"type": "chunk", "text": citation_text}
+
+    # Live web results go stale, so only document/no-context answers are cached
+    if cache_scope and not from_web:
+        semantic_cache.store(question, cache_scope, full_answer)
+
+
+# ── Swarm Pipelines ───────────────────────────────────────
+
+_critic_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="critic")
+_latency = {}  # swarm mode -> {"turns", "ttft_s", "total_s"}
+_latency_lock = threading.Lock()
+_critic_failures = 0  # drafts published unreviewed because the critic call failed
+
+
+def _swarm_mode(model) -> str:
+    """
+    SWARM_MODE for this model. Pipelining needs the draft stream and the
+    critic call in flight together; with a provider limited to one request
+    at a time (Ollama's default OLLAMA_NUM_PARALLEL=1) the critic would wait
+    for the whole draft and then re-check it, so such models run serial.
+    """
+    if config.SWARM_MODE != "pipelined":
+        return "serial"
+    slots = rate_limiter.concurrency(llm_service.provider_of(model))
+    return "pipelined" if slots == 0 or slots >= 2 else "serial"
+
+
+def _serial_swarm(question, context, messages, model, max_tokens, temperature):
+    """Draft, then critique, then publish: no answer tokens until both finished."""
+    from core.swarm import generate_draft, stream_refinement, is_approved
 
     yield {
         "type": "status",
@@ -227,7 +380,7 @@ def stream_answer(
         "state": "update",
         "text": f"✍️ **Drafter Agent Draft:**\n```text\n{draft[:300]}...\n```\n\nCritic agent is performing hallucination checks...",
     }
-    critique = critique_draft(question, str(context) if context else "", draft, model)
+    critique = critic_gate.review(question, context, draft, model)
 
     yield {
         "type": "status",
@@ -235,19 +388,14 @@ def stream_answer(
         "text": f"🧐 **Critic Agent Report:**\n```text\n{critique}\n```",
     }
 
-    full_answer = ""
-    if "APPROVED" in critique.upper():
+    if is_approved(critique):
         yield {
             "type": "status",
             "state": "complete",
             "text": "Draft found flawless. Publishing.",
         }
-        # Metni küçük chunk'lar halinde stream et ki animasyon bozulmasın
-        chunk_size = 8
-        for i in range(0, len(draft), chunk_size):
-            chunk = draft[i : i + chunk_size]
-            full_answer += chunk
-            yield {"type": "chunk", "text": chunk}
+        # Serial mode holds the draft back until the critic approves it; it is published whole
+        yield {"type": "chunk", "text": draft}
     else:
         yield {
             "type": "status",
@@ -257,22 +405,202 @@ def stream_answer(
         for chunk in stream_refinement(
             messages, critique, draft, model, max_tokens, temperature
         ):
-            full_answer += chunk
             yield {"type": "chunk", "text": chunk}
 
-    if context and "DYNAMIC WEB SCAN RESULTS" not in context:
-        citations = extract_citations(context)
-        if citations:
-            citation_text = "\n\n---\n📚 **Sources:** " + ", ".join(
-                [
-                    f"Page {c['page']}"
-                    for c in sorted(
-                        set(tuple(ci.items()) for ci in citations),
-                        key=lambda x: dict(x)["page"],
-                    )
-                ][:5]
+
+def _pipelined_swarm(question, context, messages, model, max_tokens, temperature):
+    """
+    The draft streams to the user as it is generated. Once it reaches
+    SWARM_CRITIC_START_CHARS the critic reviews that prefix in parallel; a
+    rejection stops the draft early. An approval stands if it covered
+    SWARM_CRITIC_COVERAGE of the final draft, otherwise the full draft is
+    checked once more. A rejected draft is replaced by the streamed refinement.
+    """
+    from core.swarm import stream_draft, stream_refinement, is_approved
+
+    yield {
+        "type": "status",
+        "state": "update",
+        "text": "Drafter agent is writing; the critic reviews the draft as it streams...",
+    }
+    draft = ""
+    critic, seen = None, 0
+    critique = None
+    stream = stream_draft(messages, model, max_tokens, temperature)
+    try:
+        for piece in stream:
+            draft += piece
+            yield {"type": "chunk", "text": piece}
+            if critic is None and len(draft) >= config.SWARM_CRITIC_START_CHARS:
+                seen = len(draft)
+                critic = _critic_pool.submit(critic_gate.review, question, context, draft, model, True)
+            elif critic is not None and critique is None and critic.done():
+                critique = _critic_result(critic)
+                if not is_approved(critique):
+                    break  # early rejection: stop paying for a draft that gets replaced
+    finally:
+        stream.close()
+
+    if critique is None and critic is not None:
+        critique = _critic_result(critic)
+    if critique is None or (is_approved(critique) and seen < config.SWARM_CRITIC_COVERAGE * len(draft)):
+        yield {
+            "type": "status",
+            "state": "update",
+            "text": "Critic agent is checking the complete draft...",
+        }
+        seen = len(draft)
+        critique = _critic_result(_critic_pool.submit(critic_gate.review, question, context, draft, model))
+
+    yield {
+        "type": "status",
+        "state": "update",
+        "text": f"🧐 **Critic Agent Report** ({seen:,}/{len(draft):,} chars reviewed):\n```text\n{critique}\n```",
+    }
+    if is_approved(critique):
+        yield {
+            "type": "status",
+            "state": "complete",
+            "text": "Draft approved as written.",
+        }
+        return
+
+    yield {
+        "type": "status",
+        "state": "complete",
+        "text": "Critique received. Replacing the draft with a corrected answer...",
+    }
+    yield {"type": "replace", "text": ""}
+    for chunk in stream_refinement(messages, critique, draft, model, max_tokens, temperature):
+        yield {"type": "chunk", "text": chunk}
+
+
+def _critic_result(future) -> str:
+    """The critic's verdict; a failed critic leaves the draft standing, as if approved."""
+    global _critic_failures
+    try:
+        return future.result()
+    except Exception as e:
+        with _latency_lock:
+            _critic_failures += 1
+        logger.warning("Critic agent failed", error=str(e))
+        return "APPROVED (critic unavailable)"
+
+
+def _record_latency(mode: str, ttft_s, total_s: float):
+    with _latency_lock:
+        entry = _latency.setdefault(mode, {"turns": 0, "ttft_s": 0.0, "total_s": 0.0})
+        entry["turns"] += 1
+        entry["ttft_s"] += ttft_s if ttft_s is not None else total_s
+        entry["total_s"] += total_s
+    logger.info(
+        "Swarm answer",
+        mode=mode,
+        ttft_s=round(ttft_s, 2) if ttft_s is not None else None,
+        total_s=round(total_s, 2),
+    )
+
+
+def latency_stats() -> dict:
+    """Average time-to-first-token and total latency of streamed answers, per swarm mode."""
+    with _latency_lock:
+        return {
+            mode: {
+                "turns": e["turns"],
+                "avg_ttft_s": e["ttft_s"] / e["turns"],
+                "avg_total_s": e["total_s"] / e["turns"],
+            }
+            for mode, e in _latency.items()
+        }
+
+
+def critic_failures() -> int:
+    """Swarm drafts published without review because the critic failed."""
+    with _latency_lock:
+        return _critic_failures
+
+
+# ── Tool Calling ──────────────────────────────────────────
+
+
+def stream_tool_loop(
+    messages,
+    tools,
+    run_tool,
+    model=None,
+    max_iterations=8,
+    max_tokens=4096,
+    temperature=0.2,
+):
+    """
+    Streams a tool-calling conversation. Every model turn is streamed: text as
+    "chunk" events, tool-call fragments as "tool_call_delta" events. Completed
+    calls are run with run_tool(name, args) -> str, announced as "tool_call"
+    and "tool_result" events, and fed back until the model answers without
+    tools or max_iterations rounds have run. `messages` is extended in place.
+    """
+    started = time.monotonic()
+    first_token = None
+    iterations = 0
+    answered = False  # some answer text has been streamed
+    while True:
+        turn = None
+        new_paragraph = answered
+        for event in llm_service.stream_events(
+            messages, model, max_tokens, temperature, tools=tools
+        ):
+            if event["type"] == "done":
+                turn = event
+                continue
+            if first_token is None:
+                first_token = time.monotonic() - started
+            if event["type"] == "chunk":
+                if new_paragraph:
+                    # Text after a tool round starts a new paragraph
+                    event = {"type": "chunk", "text": "\n\n" + event["text"]}
+                    new_paragraph = False
+                answered = True
+            yield event
+
+        if not turn["tool_calls"]:
+            break
+        if iterations >= max_iterations:
+            if not answered:
+                yield {"type": "chunk", "text": "All tools executed."}
+            break
+        iterations += 1
+        messages.append(
+            {
+                "role": "assistant",
+                "content": turn["content"],
+                "tool_calls": turn["tool_calls"],
+            }
+        )
+        for call in turn["tool_calls"]:
+            name = call["function"]["name"]
+            raw_args = call["function"]["arguments"] or "{}"
+            try:
+                args, result = json.loads(raw_args), None
+            except ValueError as e:
+                # Still announced, so every tool_result follows its tool_call
+                args, result = raw_args, f"Error: invalid JSON arguments: {e}"
+            yield {"type": "tool_call", "id": call["id"], "name": name, "arguments": args}
+            if result is None:
+                try:
+                    result = str(run_tool(name, args))
+                except Exception as e:
+                    result = f"Error: {e}"
+            yield {"type": "tool_result", "id": call["id"], "name": name, "text": result}
+            messages.append(
+                {
+                    "role": "tool",
+                    "tool_call_id": call["id"],
+                    "name": name,
+                    "content": result,
+                }
             )
-            yield {"type": "chunk", "text": citation_text}
+
+    _record_latency("tools", first_token, time.monotonic() - started)
 
 
 def get_followup_questions(question, answer, model=None):
@@ -0,0 +1,155 @@
+"""
+LunarTech AI — Client Pool
+Long-lived OpenAI-compatible clients with one pooled HTTP transport per base URL.
+"""
+
+import os
+import sys
+import asyncio
+import threading
+
+import httpx
+from openai import OpenAI, AsyncOpenAI
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+
+try:
+    import h2  # noqa: F401  (httpx HTTP/2 support)
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+# ── Registry ──
+_lock = threading.Lock()
+_http_clients = {}  # base_url -> httpx.Client
+_async_http_clients = {}  # (base_url, loop id) -> httpx.AsyncClient
+_clients = {}  # (base_url, api_key, timeout) -> OpenAI
+_async_clients = {}  # (base_url, api_key, timeout, loop id) -> AsyncOpenAI
+_stats = {}  # base_url -> {"hits", "misses"}
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=config.LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=config.LLM_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=config.LLM_POOL_KEEPALIVE_EXPIRY,
+    )
+
+
+def _use_http2() -> bool:
+    return config.LLM_HTTP2 and HTTP2_AVAILABLE
+
+
+def _record(base_url: str, hit: bool):
+    entry = _stats.setdefault(base_url, {"hits": 0, "misses": 0})
+    entry["hits" if hit else "misses"] += 1
+
+
+def get_client(base_url: str, api_key: str, timeout: float) -> OpenAI:
+    """Returns the shared sync client for the base URL (creates it once)."""
+    key = (base_url, api_key, timeout)
+    with _lock:
+        client = _clients.get(key)
+        if client is not None:
+            _record(base_url, hit=True)
+            return client
+
+        http_client = _http_clients.get(base_url)
+        if http_client is None:
+            http_client = httpx.Client(limits=_limits(), http2=_use_http2())
+            _http_clients[base_url] = http_client
+
+        client = OpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            timeout=timeout,
+            http_client=http_client,
+        )
+        _clients[key] = client
+        _record(base_url, hit=False)
+        return client
+
+
+def get_async_client(base_url: str, api_key: str, timeout: float) -> AsyncOpenAI:
+    """
+    Returns the shared async client for the base URL.
+    httpx.AsyncClient is bound to the event loop it was first used on,
+    so async clients are pooled per running loop.
+    """
+    try:
+        loop_id = id(asyncio.get_running_loop())
+    except RuntimeError:
+        loop_id = 0
+
+    key = (base_url, api_key, timeout, loop_id)
+    with _lock:
+        client = _async_clients.get(key)
+        if client is not None:
+            _record(base_url, hit=True)
+            return client
+
+        http_key = (base_url, loop_id)
+        http_client = _async_http_clients.get(http_key)
+        if http_client is None:
+            http_client = httpx.AsyncClient(limits=_limits(), http2=_use_http2())
+            _async_http_clients[http_key] = http_client
+
+        client = AsyncOpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            timeout=timeout,
+            http_client=http_client,
+        )
+        _async_clients[key] = client
+        _record(base_url, hit=False)
+        return client
+
+
+def _open_connections(http_client) -> int | None:
+    """
+    Counts the live connections held by an httpx client's pool, or None.
+    httpx has no public API for this; the private transport pool is read
+    defensively so an httpx upgrade degrades the metric, not the dashboard.
+    """
+    try:
+        connections = http_client._transport._pool.connections
+        return len(connections)
+    except Exception:
+        return None
+
+
+def stats() -> dict:
+    """Pool hit/miss and open-connection statistics per base URL (open_connections may be None)."""
+    with _lock:
+        result = {}
+        for base_url, entry in _stats.items():
+            clients = [c for (url, _), c in _async_http_clients.items() if url == base_url]
+            if base_url in _http_clients:
+                clients.append(_http_clients[base_url])
+            counts = [_open_connections(c) for c in clients]
+            known = [c for c in counts if c is not None]
+            open_conns = sum(known) if known or not counts else None
+            result[base_url] = {
+                "hits": entry["hits"],
+                "misses": entry["misses"],
+                "open_connections": open_conns,
+                "http2": _use_http2(),
+            }
+        return result
+
+
+def close_all():
+    """Closes every pooled sync transport (async ones close with their loop)."""
+    with _lock:
+        for client in _http_clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _http_clients.clear()
+        _clients.clear()
+        _async_http_clients.clear()
+        _async_clients.clear()
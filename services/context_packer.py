@@ -0,0 +1,228 @@
+"""
+LunarTech AI — Context Packer
+Fits retrieved context into a model's prompt window instead of slicing it by
+characters. Drops repeated sentences (overlapping chunks), and when the rest
+still does not fit, keeps the sentences most relevant to the query, in
+original order, with their [Page X] markers.
+"""
+
+import math
+import os
+import re
+import sys
+import time
+import threading
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+from utils import logger
+
+MAX_REPORTS = 100
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+_PAGE = re.compile(r"\[Page \d+\]")
+_UNITS = {"K": 1024, "M": 1024 * 1024}
+
+_lock = threading.Lock()
+_reports = deque(maxlen=MAX_REPORTS)
+_totals = {"calls": 0, "tokens_in": 0, "tokens_out": 0, "compressed": 0}
+
+
+# ── Budget ────────────────────────────────────────────────
+
+
+def context_window(model: str = None) -> int:
+    """Prompt window in tokens from config.MODEL_INFO ("32K", "1M"); default if unknown."""
+    ctx = config.get_model_info(model or config.DEFAULT_MODEL)["ctx"]
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KM]?)\s*", str(ctx).upper())
+    if not match:
+        return config.CONTEXT_DEFAULT_WINDOW
+    return int(float(match.group(1)) * _UNITS.get(match.group(2), 1))
+
+
+def budget(model: str = None, reserved: int = 0, cap: int = None) -> int:
+    """
+    Tokens left for context in `model`'s window after `reserved` tokens
+    (rest of the prompt + max output), optionally capped.
+    """
+    available = int(context_window(model) * config.CONTEXT_FILL_RATIO) - reserved
+    if cap:
+        available = min(available, cap)
+    return max(available, config.CONTEXT_MIN_TOKENS)
+
+
+# ── Packing ───────────────────────────────────────────────
+
+
+def _split(context: str) -> list[dict]:
+    """Paragraphs -> sentences, each tagged with its section header and current page."""
+    sentences = []
+    header = None
+    for p_no, paragraph in enumerate(re.split(r"\n\s*\n", context)):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if paragraph.startswith("#"):
+            header, _, paragraph = paragraph.partition("\n")
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+        page = None
+        for l_no, line in enumerate(paragraph.split("\n")):
+            for text in _SENTENCE.split(line):
+                text = text.strip()
+                if not text:
+                    continue
+                markers = _PAGE.findall(text)
+                if markers:
+                    page = markers[-1]
+                sentences.append(
+                    {
+                        "text": text,
+                        "para": p_no,
+                        "line": l_no,
+                        "header": header,
+                        "page": page,
+                        "needs_page": page is not None and not markers,
+                    }
+                )
+    return sentences
+
+
+def _dedupe(sentences: list[dict]) -> tuple[list[dict], int]:
+    seen = set()
+    kept = []
+    for s in sentences:
+        key = re.sub(r"\W+", " ", _PAGE.sub("", s["text"]).lower()).strip()
+        if key and key in seen:
+            continue
+        seen.add(key)
+        kept.append(s)
+    return kept, len(sentences) - len(kept)
+
+
+def _relevance(sentences: list[dict], query: str) -> list[float]:
+    """Sum of IDF (over this context's sentences) of the query terms each sentence contains."""
+    from services.bm25_index import tokenize
+
+    terms = set(tokenize(query))
+    token_sets = [set(tokenize(s["text"])) for s in sentences]
+    n = len(sentences)
+    idf = {
+        t: math.log(1 + n / (1 + sum(t in ts for ts in token_sets)))
+        for t in terms
+    }
+    return [sum(idf[t] for t in terms & ts) for ts in token_sets]
+
+
+def _render(sentences: list[dict]) -> str:
+    """Kept sentences in original order; lines, paragraphs and headers restored."""
+    paragraphs = []  # [header or None, [[sentence, ...] per line]]
+    header = page = None
+    position = None
+    for s in sentences:
+        if (s["para"], s["line"]) != position:
+            if not paragraphs or s["para"] != position[0]:
+                opens = s["header"] if s["header"] != header else None
+                paragraphs.append([opens, []])
+                header, page = s["header"], None
+            paragraphs[-1][1].append([])
+            position = (s["para"], s["line"])
+        text = s["text"]
+        if s["needs_page"] and s["page"] != page:
+            text = f"{s['page']} {text}"
+        page = s["page"]
+        paragraphs[-1][1][-1].append(text)
+    return "\n\n".join(
+        (f"{opens}\n" if opens else "") + "\n".join(" ".join(line) for line in lines)
+        for opens, lines in paragraphs
+    )
+
+
+def pack(context: str, query: str, token_budget: int, label: str = "", model: str = None) -> str:
+    """
+    Returns `context` within `token_budget` tokens:
+      1. repeated sentences are dropped (overlapping chunks, duplicate web snippets)
+      2. if it still does not fit, sentences are kept by query relevance, then
+         retrieval order, until the budget is full
+    """
+    from utils import tokens
+
+    if not context:
+        return context
+    started = time.monotonic()
+    tokens_in = tokens.count(context, model)
+
+    sentences, duplicates = _dedupe(_split(context))
+    packed = _render(sentences) if duplicates else context
+    tokens_out = tokens.count(packed, model) if duplicates else tokens_in
+    compressed = tokens_out > token_budget
+
+    if compressed:
+        scores = _relevance(sentences, query)
+        # Header and page-marker overhead is charged to the sentence that brings it in
+        costs = [
+            n + (4 if s["needs_page"] else 0) + 1
+            for s, n in zip(sentences, tokens.count_many([s["text"] for s in sentences], model))
+        ]
+        headers = {s["header"] for s in sentences if s["header"]}
+        header_cost = {h: tokens.count(h, model) + 1 for h in headers}
+
+        order = sorted(range(len(sentences)), key=lambda i: (-scores[i], i))
+        keep, remaining, opened = set(), token_budget, set()
+        for i in order:
+            header = sentences[i]["header"]
+            cost = costs[i] + (header_cost[header] if header and header not in opened else 0)
+            if cost > remaining:
+                continue
+            keep.add(i)
+            remaining -= cost
+            if header:
+                opened.add(header)
+        packed = _render([s for i, s in enumerate(sentences) if i in keep])
+        tokens_out = tokens.count(packed, model)
+
+    _record(
+        {
+            "label": label,
+            "model": model,
+            "budget": token_budget,
+            "tokens_in": tokens_in,
+            "tokens_out": tokens_out,
+            "duplicates": duplicates,
+            "compressed": compressed,
+            "ms": round((time.monotonic() - started) * 1000, 1),
+        }
+    )
+    return packed
+
+
+def _record(report: dict):
+    with _lock:
+        _reports.append(report)
+        _totals["calls"] += 1
+        _totals["tokens_in"] += report["tokens_in"]
+        _totals["tokens_out"] += report["tokens_out"]
+        _totals["compressed"] += report["compressed"]
+    if report["tokens_out"] < report["tokens_in"]:
+        logger.info("Context packed", **report)
+
+
+def stats() -> dict:
+    with _lock:
+        totals = dict(_totals)
+        last = _reports[-1] if _reports else None
+    saved = totals["tokens_in"] - totals["tokens_out"]
+    return {
+        **totals,
+        "saved_tokens": saved,
+        "saved_pct": saved / totals["tokens_in"] if totals["tokens_in"] else 0.0,
+        "last": last,
+    }
+
+
+def reports() -> list[dict]:
+    """Per-call tokens in/out for the last MAX_REPORTS calls."""
+    with _lock:
+        return list(_reports)
@@ -0,0 +1,278 @@
+"""
+LunarTech AI — Conversation Memory
+Rolling per-conversation memory for chat prompts: a running summary plus a
+verbatim window of the latest messages within MEMORY_WINDOW_TOKENS. Messages
+that slide out of the window are folded into the summary after the turn, in
+the background, with one LLM call over only those messages. State lives in
+SQLite, so a conversation keeps its memory across restarts.
+"""
+
+import hashlib
+import os
+import sys
+import time
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+from utils import logger, tokens
+
+MEMORY_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "memory")
+MEMORY_DB = os.path.join(MEMORY_DIR, "conversations.db")
+BASELINE_MESSAGES = 20  # raw history turns were sent with before; the savings baseline
+MESSAGE_OVERHEAD = 4  # chat-format tokens per message
+MAX_TURNS = 100
+
+FOLD_PROMPT = """Update the running summary of a conversation with the new messages below.
+Keep facts, decisions, the user's preferences, named documents and open questions; drop greetings and filler.
+Stay under {max_words} words. Reply with the updated summary only.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memory (
+    conversation TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    folded INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_db = None
+_db_lock = threading.Lock()
+_fold_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory")
+_key_locks = {}  # conversation -> Lock, so folds of one conversation run in order
+_key_locks_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_turns = deque(maxlen=MAX_TURNS)
+_counters = {"turns": 0, "folds": 0, "folded_messages": 0, "fold_errors": 0, "fold_s": 0.0, "resets": 0}
+
+
+def enabled() -> bool:
+    return config.MEMORY_ENABLED
+
+
+# ── State ─────────────────────────────────────────────────
+
+
+def _get_db() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                os.makedirs(MEMORY_DIR, exist_ok=True)
+                conn = sqlite3.connect(MEMORY_DB, check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                _db = conn
+    return _db
+
+
+def _text(message: dict) -> str:
+    """Plain text of a chat message (image parts of multimodal messages are skipped)."""
+    content = message.get("content", "")
+    if isinstance(content, list):
+        return " ".join(p.get("text", "") for p in content if isinstance(p, dict))
+    return str(content or "")
+
+
+def _fingerprint(messages: list[dict]) -> str:
+    digest = hashlib.sha1()
+    for m in messages:
+        digest.update(f"{m.get('role')}\x00{_text(m)}\x01".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _empty() -> dict:
+    return {"summary": "", "folded": 0, "fingerprint": _fingerprint([])}
+
+
+def _load(conversation: str) -> dict:
+    try:
+        db = _get_db()
+        with _db_lock:
+            row = db.execute(
+                "SELECT summary, folded, fingerprint FROM memory WHERE conversation = ?",
+                (conversation,),
+            ).fetchone()
+    except Exception as e:
+        logger.warning("Conversation memory read failed", error=str(e))
+        row = None
+    if row is None:
+        return _empty()
+    return {"summary": row[0], "folded": row[1], "fingerprint": row[2]}
+
+
+def _save(conversation: str, state: dict):
+    db = _get_db()
+    with _db_lock:
+        db.execute(
+            "INSERT OR REPLACE INTO memory (conversation, summary, folded, fingerprint, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (conversation, state["summary"], state["folded"], state["fingerprint"], time.time()),
+        )
+
+
+def _matches(state: dict, history: list[dict]) -> bool:
+    """False when the conversation was cleared or edited since the summary was written."""
+    return state["folded"] <= len(history) and state["fingerprint"] == _fingerprint(
+        history[: state["folded"]]
+    )
+
+
+# ── Window ────────────────────────────────────────────────
+
+
+def _window_start(history: list[dict], model: str = None) -> int:
+    """Index of the oldest message of the verbatim window (newest messages within MEMORY_WINDOW_TOKENS)."""
+    costs = tokens.count_many([_text(m) for m in history], model)
+    start, used = len(history), 0
+    while start > 0:
+        cost = costs[start - 1] + MESSAGE_OVERHEAD
+        if used + cost > config.MEMORY_WINDOW_TOKENS and len(history) - start >= config.MEMORY_WINDOW_MIN_MESSAGES:
+            break
+        used += cost
+        start -= 1
+    return start
+
+
+def recall(conversation: str, history: list[dict], model: str = None) -> tuple[str, list[dict]]:
+    """
+    (summary, verbatim messages) to prompt with instead of the raw history.
+    Messages not folded yet stay verbatim (up to BASELINE_MESSAGES), so
+    nothing is lost while a fold is still running. No LLM call.
+    """
+    history = [m for m in history or [] if m and isinstance(m, dict)]
+    state = _load(conversation)
+    if not _matches(state, history):
+        state = _empty()
+    start = max(state["folded"], len(history) - BASELINE_MESSAGES)
+    window = [{"role": m["role"], "content": m["content"]} for m in history[start:]]
+
+    baseline = history[-BASELINE_MESSAGES:]
+    baseline_tokens = sum(tokens.count_many([_text(m) for m in baseline], model))
+    baseline_tokens += MESSAGE_OVERHEAD * len(baseline)
+    sent_tokens = sum(tokens.count_many([_text(m) for m in window], model))
+    sent_tokens += MESSAGE_OVERHEAD * len(window) + tokens.count(state["summary"], model)
+    with _stats_lock:
+        _counters["turns"] += 1
+        _turns.append(
+            {
+                "messages": len(history),
+                "verbatim": len(window),
+                "summarised": start,
+                "baseline_tokens": baseline_tokens,
+                "sent_tokens": sent_tokens,
+            }
+        )
+    return state["summary"], window
+
+
+# ── Folding ───────────────────────────────────────────────
+
+
+def fold(summary: str, messages: list[dict], model: str = None) -> str:
+    """`summary` updated with `messages` (each cut to MEMORY_FOLD_MESSAGE_TOKENS) in one LLM call."""
+    from services import llm_service
+
+    model = config.MEMORY_MODEL or model
+    lines = "\n".join(
+        f"{'User' if m.get('role') == 'user' else 'AI'}: "
+        + tokens.truncate_to_tokens(_text(m), config.MEMORY_FOLD_MESSAGE_TOKENS, model, suffix="...")
+        for m in messages
+    )
+    result = llm_service.chat_completion(
+        messages=[
+            {
+                "role": "user",
+                "content": FOLD_PROMPT.format(
+                    summary=summary or "(empty)",
+                    messages=lines,
+                    max_words=config.MEMORY_SUMMARY_TOKENS * 3 // 4,
+                ),
+            }
+        ],
+        model=model,
+        max_tokens=config.MEMORY_SUMMARY_TOKENS,
+        temperature=0.3,
+    )
+    return (result or "").strip()
+
+
+def _key_lock(conversation: str) -> threading.Lock:
+    with _key_locks_lock:
+        return _key_locks.setdefault(conversation, threading.Lock())
+
+
+def _fold_conversation(conversation: str, history: list[dict], model: str = None):
+    with _key_lock(conversation):
+        state = _load(conversation)
+        if not _matches(state, history):
+            with _stats_lock:
+                _counters["resets"] += state["folded"] > 0
+            state = _empty()
+        end = _window_start(history, model)
+        if end - state["folded"] < max(1, config.MEMORY_FOLD_BATCH):
+            return  # until then the few messages waiting stay verbatim in recall()
+        started = time.monotonic()
+        try:
+            summary = fold(state["summary"], history[state["folded"] : end], model)
+        except Exception as e:
+            with _stats_lock:
+                _counters["fold_errors"] += 1
+            logger.warning("Conversation memory fold failed", conversation=conversation, error=str(e))
+            return
+        with _stats_lock:
+            _counters["folds"] += 1
+            _counters["folded_messages"] += end - state["folded"]
+            _counters["fold_s"] += time.monotonic() - started
+        _save(
+            conversation,
+            {"summary": summary, "folded": end, "fingerprint": _fingerprint(history[:end])},
+        )
+
+
+def remember(conversation: str, history: list[dict], model: str = None):
+    """
+    After a turn: folds the messages that have left the verbatim window into
+    the conversation's summary, in the background. Returns the Future.
+    """
+    history = [m for m in history or [] if m and isinstance(m, dict)]
+    return _fold_pool.submit(_fold_conversation, conversation, history, model)
+
+
+# ── Metrics ───────────────────────────────────────────────
+
+
+def stats() -> dict:
+    with _stats_lock:
+        counters = dict(_counters)
+        turns = list(_turns)
+    baseline = sum(t["baseline_tokens"] for t in turns)
+    sent = sum(t["sent_tokens"] for t in turns)
+    n = len(turns)
+    return {
+        "turns": counters["turns"],
+        "folds": counters["folds"],
+        "folded_messages": counters["folded_messages"],
+        "fold_errors": counters["fold_errors"],
+        "resets": counters["resets"],
+        "avg_fold_s": counters["fold_s"] / counters["folds"] if counters["folds"] else 0.0,
+        # Over the last MAX_TURNS turns, against resending the last BASELINE_MESSAGES messages
+        "avg_baseline_tokens": baseline / n if n else 0.0,
+        "avg_sent_tokens": sent / n if n else 0.0,
+        "saved_tokens": baseline - sent,
+        "saved_pct": (baseline - sent) / baseline if baseline else 0.0,
+        "last": turns[-1] if turns else None,
+    }
@@ -0,0 +1,137 @@
+"""
+LunarTech AI — Critic Gate
+Decides per draft whether the swarm critic is worth an LLM call. Scores how
+well the draft is grounded in the retrieved context with the local embedding
+model (share of draft sentences that closely match a context sentence, and
+no [Page X] citations the context does not contain). Confident drafts skip
+the critic, except for a random audit sample that keeps the threshold honest.
+"""
+
+import os
+import random
+import re
+import sys
+import time
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+from utils import logger
+
+MIN_SENTENCE_WORDS = 4  # headings, greetings and fragments are not scored
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+_PAGE = re.compile(r"\[Page (\d+)\]")
+
+_lock = threading.Lock()
+_stats = {
+    "reviews": 0,
+    "skipped": 0,
+    "audited": 0,
+    "audit_approved": 0,
+    "critic_runs": 0,
+    "approved": 0,
+    "critic_s": 0.0,
+    "gate_s": 0.0,
+}
+
+
+def enabled() -> bool:
+    return config.CRITIC_GATE_ENABLED
+
+
+def _sentences(text: str) -> list[str]:
+    return [
+        s.strip()
+        for s in _SENTENCE.split(_PAGE.sub("", text))
+        if len(s.split()) >= MIN_SENTENCE_WORDS
+    ]
+
+
+def groundedness(draft: str, context: str) -> float | None:
+    """
+    Share of the draft (by characters) made of sentences whose best cosine
+    match in the context is at least CRITIC_GATE_SIMILARITY. 0.0 if the
+    draft cites pages the context lacks; None if there is nothing to compare.
+    """
+    from services import lightrag_service
+
+    cited = set(_PAGE.findall(draft))
+    if cited - set(_PAGE.findall(context)):
+        return 0.0
+    claims = _sentences(draft)
+    evidence = _sentences(context)[: config.CRITIC_GATE_MAX_SENTENCES]
+    if not claims or not evidence:
+        return None
+
+    vectors = lightrag_service.embed_texts(claims + evidence)
+    best = (vectors[: len(claims)] @ vectors[len(claims) :].T).max(axis=1)
+    weights = np.array([len(c) for c in claims], dtype="float32")
+    supported = best >= config.CRITIC_GATE_SIMILARITY
+    return float(weights[supported].sum() / weights.sum())
+
+
+def review(question: str, context: str, draft: str, model: str, partial: bool = False) -> str:
+    """
+    core.swarm.critique_draft behind the gate. Returns the critic's verdict,
+    or an "APPROVED (critic skipped ...)" verdict when the draft is confidently grounded.
+    """
+    from core.swarm import critique_draft, is_approved
+
+    score, audit = None, False
+    if enabled() and context:
+        started = time.monotonic()
+        try:
+            score = groundedness(draft, context)
+        except Exception as e:
+            logger.warning("Critic gate scoring failed", error=str(e))
+        with _lock:
+            _stats["gate_s"] += time.monotonic() - started
+
+        if score is not None and score >= config.CRITIC_GATE_THRESHOLD:
+            audit = random.random() < config.CRITIC_GATE_AUDIT_RATE
+            if not audit:
+                with _lock:
+                    _stats["reviews"] += 1
+                    _stats["skipped"] += 1
+                return f"APPROVED (critic skipped: groundedness {score:.2f})"
+
+    started = time.monotonic()
+    critique = critique_draft(question, context, draft, model, partial)
+    approved = is_approved(critique)
+    with _lock:
+        _stats["reviews"] += 1
+        _stats["critic_runs"] += 1
+        _stats["approved"] += approved
+        _stats["critic_s"] += time.monotonic() - started
+        if audit:
+            _stats["audited"] += 1
+            _stats["audit_approved"] += approved
+    if audit and not approved:
+        logger.warning(
+            "Critic rejected a draft the gate would have skipped",
+            groundedness=f"{score:.2f}",
+            threshold=config.CRITIC_GATE_THRESHOLD,
+        )
+    return critique
+
+
+def stats() -> dict:
+    with _lock:
+        s = dict(_stats)
+    avg_critic_s = s["critic_s"] / s["critic_runs"] if s["critic_runs"] else 0.0
+    return {
+        "reviews": s["reviews"],
+        "skipped": s["skipped"],
+        "skip_rate": s["skipped"] / s["reviews"] if s["reviews"] else 0.0,
+        "critic_runs": s["critic_runs"],
+        "approval_rate": s["approved"] / s["critic_runs"] if s["critic_runs"] else 0.0,
+        # Critic verdicts on drafts the gate found confident: should stay near 100%
+        "audited": s["audited"],
+        "audit_approval_rate": s["audit_approved"] / s["audited"] if s["audited"] else None,
+        "avg_critic_s": avg_critic_s,
+        "avg_gate_ms": 1000 * s["gate_s"] / s["reviews"] if s["reviews"] else 0.0,
+        "saved_s": max(0.0, s["skipped"] * avg_critic_s - s["gate_s"]),
+    }
@@ -0,0 +1,155 @@
+"""
+LunarTech AI — Document Registry
+Content fingerprints of ingested documents (whole file + content-defined chunks),
+so re-uploads only send new or changed text to LightRAG.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+
+REGISTRY_PATH = os.path.join(config.LIGHTRAG_WORK_DIR, "doc_registry.json")
+_PAGE_MARKER = re.compile(r"\[Page\s+\d+\]")
+
+_lock = threading.Lock()
+_registry = None  # {"files": {file_hash: {...}}, "chunks": {chunk_hash: file_hash}}
+
+
+def _load() -> dict:
+    global _registry
+    if _registry is None:
+        try:
+            with open(REGISTRY_PATH, "r", encoding="utf-8") as f:
+                _registry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            _registry = {"files": {}, "chunks": {}}
+    return _registry
+
+
+def _save():
+    os.makedirs(os.path.dirname(REGISTRY_PATH), exist_ok=True)
+    tmp = REGISTRY_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_registry, f)
+    os.replace(tmp, REGISTRY_PATH)
+
+
+def file_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _chunk_hash(text: str) -> str:
+    # Whitespace-insensitive so re-extraction noise doesn't look like an edit, and
+    # without [Page X] markers so renumbered pages don't either
+    return hashlib.sha256(" ".join(_body(text).split()).encode()).hexdigest()
+
+
+def _body(text: str) -> str:
+    return _PAGE_MARKER.sub("", text)
+
+
+def chunk_document(text: str, chunk_size: int = None) -> list[str]:
+    """
+    Content-defined chunking on paragraph boundaries: a chunk closes when it
+    reaches chunk_size or when a paragraph's hash hits the boundary condition.
+    An edit therefore only changes the chunks around it instead of shifting
+    every later boundary. Each chunk is prefixed with its [Page X] marker;
+    sizes and boundaries ignore the markers, so inserting a page does not
+    move the chunks after it.
+    """
+    chunk_size = chunk_size or config.CHUNK_SIZE
+    min_size = chunk_size // 4
+    chunks, current, size = [], [], 0
+    page = None
+    chunk_page = None
+
+    for para in re.split(r"\n\s*\n|(?=\[Page\s+\d+\])", text):
+        para = para.strip()
+        if not para:
+            continue
+        marker = _PAGE_MARKER.match(para)
+        if marker:
+            page = marker.group(0)
+        if not current:
+            chunk_page = page
+        current.append(para)
+        size += len(_body(para))
+        boundary = int(_chunk_hash(para)[:8], 16) % 4 == 0
+        if size >= chunk_size or (size >= min_size and boundary):
+            chunks.append(_with_page("\n\n".join(current), chunk_page))
+            current, size = [], 0
+
+    if current:
+        chunks.append(_with_page("\n\n".join(current), chunk_page))
+    return chunks
+
+
+def _with_page(chunk: str, page: str | None) -> str:
+    if page and not chunk.startswith("[Page"):
+        return f"{page}\n{chunk}"
+    return chunk
+
+
+def plan(data: bytes, full_text: str) -> dict:
+    """
+    Compares an upload against the registry.
+
+    Returns:
+        {
+            "file_hash": str,
+            "duplicate_file": bool,     # identical bytes already ingested
+            "total_chunks": int,
+            "new_chunks": list[str],    # text still to send to LightRAG
+            "chunk_hashes": list[str],
+            "skipped_chunks": int,
+            "skipped_chars": int,
+        }
+    """
+    fhash = file_hash(data)
+    chunks = chunk_document(full_text)
+    hashes = [_chunk_hash(c) for c in chunks]
+
+    with _lock:
+        registry = _load()
+        duplicate = fhash in registry["files"]
+        known = registry["chunks"]
+        new_chunks = (
+            [] if duplicate else [c for c, h in zip(chunks, hashes) if h not in known]
+        )
+
+    skipped = len(chunks) - len(new_chunks)
+    return {
+        "file_hash": fhash,
+        "duplicate_file": duplicate,
+        "total_chunks": len(chunks),
+        "new_chunks": new_chunks,
+        "chunk_hashes": hashes,
+        "skipped_chunks": skipped,
+        "skipped_chars": sum(len(c) for c in chunks) - sum(len(c) for c in new_chunks),
+    }
+
+
+def commit(report: dict, filename: str):
+    """Records a successfully ingested upload."""
+    with _lock:
+        registry = _load()
+        registry["files"][report["file_hash"]] = {
+            "filename": filename,
+            "chunks": len(report["chunk_hashes"]),
+            "ingested_at": datetime.now().isoformat(),
+        }
+        for h in report["chunk_hashes"]:
+            registry["chunks"].setdefault(h, report["file_hash"])
+        _save()
+
+
+def lookup_file(fhash: str) -> dict | None:
+    with _lock:
+        return _load()["files"].get(fhash)
@@ -0,0 +1,245 @@
+"""
+LunarTech AI — Embedding Backends
+Loads config.EMBEDDING_MODEL on the backend picked by config.EMBEDDING_BACKEND:
+  - "torch":     SentenceTransformer on PyTorch (reference)
+  - "onnx":      ONNX Runtime export, fp32
+  - "onnx-int8": ONNX Runtime export with dynamic int8 quantization
+
+Quantized exports are parity-checked against the PyTorch backend once and
+fall back to PyTorch if they drift. Benchmark every backend with:
+
+    python -m services.embedding_backends
+"""
+
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+from utils import logger
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+EXPORT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)),
+    "data",
+    "models",
+    re.sub(r"[^A-Za-z0-9]+", "_", config.EMBEDDING_MODEL).strip("_"),
+)
+PARITY_SAMPLES = [
+    "LightRAG builds a knowledge graph of entities and relations.",
+    "The quarterly revenue grew by 12% compared to last year.",
+    "Machine learning models need careful evaluation on held-out data.",
+    "Photosynthesis converts light energy into chemical energy.",
+    "Bu belge, şirketin 2024 yılı faaliyet raporunu özetler.",
+    "Handbook",
+    "Transformers use self-attention to weigh the importance of each token "
+    "in a sequence relative to every other token, which allows long-range "
+    "dependencies to be modelled without recurrence.",
+]
+
+
+def _quantization_config() -> str:
+    if config.EMBEDDING_ONNX_QCONFIG:
+        return config.EMBEDDING_ONNX_QCONFIG
+    return "arm64" if platform.machine().lower() in ("arm64", "aarch64") else "avx2"
+
+
+def _onnx_model_kwargs(file_name: str = None) -> dict:
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    if config.EMBEDDING_THREADS > 0:
+        options.intra_op_num_threads = config.EMBEDDING_THREADS
+    kwargs = {"provider": "CPUExecutionProvider", "session_options": options}
+    if file_name:
+        kwargs["file_name"] = file_name
+    return kwargs
+
+
+def _load_torch():
+    from sentence_transformers import SentenceTransformer
+
+    if config.EMBEDDING_THREADS > 0:
+        import torch
+
+        torch.set_num_threads(config.EMBEDDING_THREADS)
+    return SentenceTransformer(config.EMBEDDING_MODEL, device="cpu")
+
+
+def _load_onnx():
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(
+        config.EMBEDDING_MODEL, backend="onnx", model_kwargs=_onnx_model_kwargs()
+    )
+
+
+def _load_onnx_int8():
+    """Exports (once) and loads a dynamically int8-quantized ONNX model."""
+    from sentence_transformers import (
+        SentenceTransformer,
+        export_dynamic_quantized_onnx_model,
+    )
+
+    qconfig = _quantization_config()
+    file_name = f"onnx/model_qint8_{qconfig}.onnx"
+    if not os.path.exists(os.path.join(EXPORT_DIR, file_name)):
+        logger.info("Exporting int8 ONNX embedding model", model=config.EMBEDDING_MODEL, qconfig=qconfig)
+        fp32 = SentenceTransformer(config.EMBEDDING_MODEL, backend="onnx")
+        fp32.save(EXPORT_DIR)
+        export_dynamic_quantized_onnx_model(fp32, qconfig, EXPORT_DIR)
+    return SentenceTransformer(
+        EXPORT_DIR, backend="onnx", model_kwargs=_onnx_model_kwargs(file_name)
+    )
+
+
+_LOADERS = {"torch": _load_torch, "onnx": _load_onnx, "onnx-int8": _load_onnx_int8}
+
+
+def parity(model, reference=None) -> float:
+    """Minimum cosine similarity between `model` and the PyTorch backend on PARITY_SAMPLES."""
+    reference = reference or _load_torch()
+    a = model.encode(PARITY_SAMPLES, normalize_embeddings=True)
+    b = reference.encode(PARITY_SAMPLES, normalize_embeddings=True)
+    return float(np.min(np.sum(a * b, axis=1)))
+
+
+def _parity_ok(backend: str, model) -> tuple[bool, object]:
+    """
+    Checks a non-torch backend once per export; the verdict is stored next to
+    it. Returns (ok, the PyTorch reference model if one was loaded, else None).
+    """
+    record_path = os.path.join(EXPORT_DIR, "parity.json")
+    try:
+        with open(record_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+    except (FileNotFoundError, ValueError):
+        records = {}
+    key = f"{backend}:{_quantization_config()}"
+    reference = None
+    if key not in records:
+        reference = _load_torch()
+        records[key] = parity(model, reference)
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        with open(record_path, "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=2)
+    min_cos = records[key]
+    if min_cos < config.EMBEDDING_PARITY_MIN:
+        logger.warning(
+            "Embedding backend failed parity check, using torch",
+            backend=backend,
+            min_cosine=f"{min_cos:.4f}",
+        )
+        return False, reference
+    logger.info("Embedding backend parity", backend=backend, min_cosine=f"{min_cos:.4f}")
+    return True, reference
+
+
+def load_model(backend: str = None):
+    """
+    Returns a SentenceTransformer on the requested backend, warmed up.
+    Falls back to PyTorch if ONNX Runtime is missing, the export fails or parity fails.
+    """
+    backend = backend or config.EMBEDDING_BACKEND
+    if backend not in _LOADERS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}' (expected one of {BACKENDS})")
+
+    model = reference = None
+    if backend != "torch":
+        try:
+            model = _LOADERS[backend]()
+            ok, reference = _parity_ok(backend, model)
+            if not ok:
+                model = None
+        except Exception as e:
+            logger.warning(
+                "ONNX backend unavailable, using torch "
+                "(pip install 'sentence-transformers[onnx]')",
+                error=str(e),
+            )
+    if model is None:
+        backend = "torch"
+        # The parity check's reference is the fallback; don't load a second copy
+        model = reference if reference is not None else _load_torch()
+
+    # First inference pays for graph/kernel initialisation; do it here, not in a query
+    model.encode(["warm up"], show_progress_bar=False)
+    model.lunartech_backend = backend
+    return model
+
+
+def active_backend(model) -> str:
+    return getattr(model, "lunartech_backend", "torch")
+
+
+# ── Benchmark ─────────────────────────────────────────────
+
+
+def _rss_mb() -> float:
+    import psutil
+
+    return psutil.Process().memory_info().rss / 1e6
+
+
+def _bench_one(backend: str, n: int) -> dict:
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    model = _LOADERS[backend]()
+    model.encode(["warm up"], show_progress_bar=False)
+    load_s = time.perf_counter() - started
+
+    texts = [PARITY_SAMPLES[i % len(PARITY_SAMPLES)] + f" #{i}" for i in range(n)]
+    started = time.perf_counter()
+    model.encode(texts, batch_size=config.EMBED_BATCH_SIZE, show_progress_bar=False)
+    encode_s = time.perf_counter() - started
+
+    return {
+        "backend": backend,
+        "load_s": round(load_s, 2),
+        "sentences_per_sec": round(n / encode_s, 1),
+        "rss_mb": round(_rss_mb(), 1),
+        "rss_model_mb": round(_rss_mb() - rss_before, 1),
+        "min_cosine_vs_torch": round(parity(model), 4) if backend != "torch" else 1.0,
+    }
+
+
+def benchmark(n: int = 2000) -> list[dict]:
+    """Runs each backend in a fresh process so RSS numbers don't overlap."""
+    results = []
+    for backend in BACKENDS:
+        proc = subprocess.run(
+            [sys.executable, "-m", "services.embedding_backends", "--one", backend, str(n)],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            results.append({"backend": backend, "error": proc.stderr.strip().splitlines()[-1:]})
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "--one":
+        n = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+        print(json.dumps(_bench_one(sys.argv[2], n)))
+    else:
+        n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+        print(f"Embedding benchmark: {config.EMBEDDING_MODEL}, {n} sentences, CPU")
+        print(f"{'backend':<11} {'sent/s':>9} {'load s':>7} {'RSS MB':>8} {'model MB':>9} {'min cos':>8}")
+        for r in benchmark(n):
+            if "error" in r:
+                print(f"{r['backend']:<11} failed: {r['error']}")
+                continue
+            print(
+                f"{r['backend']:<11} {r['sentences_per_sec']:>9} {r['load_s']:>7} "
+                f"{r['rss_mb']:>8} {r['rss_model_mb']:>9} {r['min_cosine_vs_torch']:>8}"
+            )
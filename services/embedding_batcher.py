@@ -0,0 +1,146 @@
+"""
+LunarTech AI — Embedding Batcher
+In-process micro-batching for the local embedding model. Requests from all
+callers (queries, ingestion jobs, caches) are gathered for a few milliseconds,
+sorted by length to cut padding, encoded as one batch and scattered back.
+"""
+
+import asyncio
+import os
+import sys
+import time
+import queue
+import threading
+import concurrent.futures
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+from utils import logger
+
+MAX_BATCH_TEXTS = config.EMBED_BATCH_MAX_TEXTS
+MAX_WAIT = config.EMBED_BATCH_MAX_WAIT_MS / 1000
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {
+    "requests": 0,
+    "texts": 0,
+    "batches": 0,
+    "max_batch": 0,
+    "wait_ms_total": 0.0,
+    "encode_s_total": 0.0,
+}
+
+
+class _Request:
+    __slots__ = ("texts", "future", "queued_at")
+
+    def __init__(self, texts: list[str]):
+        self.texts = texts
+        self.future = concurrent.futures.Future()
+        self.queued_at = time.monotonic()
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = threading.Thread(
+                    target=_worker_loop, name="embedding-batcher", daemon=True
+                )
+                _worker.start()
+
+
+def submit(texts: list[str]) -> concurrent.futures.Future:
+    """Queues texts for the next batch. The future resolves to a (len(texts), dim) array."""
+    request = _Request(list(texts))
+    if not request.texts:
+        request.future.set_result(np.empty((0, config.EMBEDDING_DIM), dtype="float32"))
+        return request.future
+    _ensure_worker()
+    _queue.put(request)
+    return request.future
+
+
+def encode(texts: list[str]) -> np.ndarray:
+    """Blocking encode through the shared batcher."""
+    return submit(texts).result()
+
+
+async def aencode(texts: list[str]) -> np.ndarray:
+    """Awaitable encode through the shared batcher (does not occupy a thread)."""
+    return await asyncio.wrap_future(submit(texts))
+
+
+def _worker_loop():
+    while True:
+        batch = [_queue.get()]
+        count = len(batch[0].texts)
+        deadline = time.monotonic() + MAX_WAIT
+        while count < MAX_BATCH_TEXTS:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = _queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            count += len(request.texts)
+        _run_batch(batch)
+
+
+def _run_batch(batch: list[_Request]):
+    from services import lightrag_service
+
+    batch = [r for r in batch if r.future.set_running_or_notify_cancel()]
+    if not batch:
+        return
+    texts = [t for r in batch for t in r.texts]
+    # Similar lengths in one forward pass means less padding
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+
+    started = time.monotonic()
+    try:
+        encoded = np.asarray(
+            lightrag_service._model_encode([texts[i] for i in order]), dtype="float32"
+        )
+    except Exception as e:
+        logger.error("Embedding batch failed", texts=len(texts), error=str(e))
+        for r in batch:
+            r.future.set_exception(e)
+        return
+    elapsed = time.monotonic() - started
+
+    vectors = np.empty_like(encoded)
+    vectors[order] = encoded
+    offset = 0
+    for r in batch:
+        r.future.set_result(vectors[offset : offset + len(r.texts)])
+        offset += len(r.texts)
+
+    with _stats_lock:
+        _stats["requests"] += len(batch)
+        _stats["texts"] += len(texts)
+        _stats["batches"] += 1
+        _stats["max_batch"] = max(_stats["max_batch"], len(texts))
+        _stats["wait_ms_total"] += sum((started - r.queued_at) * 1000 for r in batch)
+        _stats["encode_s_total"] += elapsed
+
+
+def stats() -> dict:
+    """Throughput metrics: batch sizes, queueing delay and texts/second while encoding."""
+    with _stats_lock:
+        s = dict(_stats)
+    s["queued"] = _queue.qsize()
+    s["avg_batch"] = s["texts"] / s["batches"] if s["batches"] else 0.0
+    s["avg_wait_ms"] = s["wait_ms_total"] / s["requests"] if s["requests"] else 0.0
+    s["texts_per_sec"] = (
+        s["texts"] / s["encode_s_total"] if s["encode_s_total"] else 0.0
+    )
+    return s
@@ -0,0 +1,217 @@
+"""
+LunarTech AI — Embedding Cache
+Disk-backed text → vector cache for the local SentenceTransformer.
+Vectors live in one memory-mapped float32 file; a SQLite index maps
+content hashes to rows, so hits never touch the model.
+"""
+
+import hashlib
+import os
+import re
+import sys
+import sqlite3
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+from services.cache_service import CACHE_DIR
+
+# Set on first use from the backend that actually loaded (see _paths)
+VECTORS_PATH = None
+INDEX_DB = None
+INITIAL_ROWS = 4096
+
+_lock = threading.Lock()
+_db = None
+_index = None  # hash -> row
+_vectors = None  # np.memmap (capacity, dim)
+_dim = None
+_stats = {"hits": 0, "misses": 0}
+
+
+def enabled() -> bool:
+    return config.EMBEDDING_CACHE_ENABLED
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _paths(backend: str) -> tuple[str, str]:
+    """(vector file, index db) for the model on `backend`."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", config.EMBEDDING_MODEL).strip("_")
+    if backend != "torch":
+        # Quantized backends produce slightly different vectors; keep them apart
+        slug += "_" + backend.replace("-", "_")
+    return (
+        os.path.join(CACHE_DIR, f"embeddings_{slug}.f32"),
+        os.path.join(CACHE_DIR, f"embeddings_{slug}.db"),
+    )
+
+
+def _open():
+    """Loads the index and maps the vector file (caller holds _lock)."""
+    global _db, _index, _vectors, _dim, VECTORS_PATH, INDEX_DB
+    if _db is not None:
+        return
+    if VECTORS_PATH is None:
+        # EMBEDDING_BACKEND may have fallen back to torch; file vectors under the one in use
+        from services import embedding_backends, lightrag_service
+
+        backend = embedding_backends.active_backend(lightrag_service.get_embedding_model())
+        VECTORS_PATH, INDEX_DB = _paths(backend)
+    conn = sqlite3.connect(INDEX_DB, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS vectors (hash TEXT PRIMARY KEY, row INTEGER NOT NULL);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """
+    )
+    row = conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+    _index = dict(conn.execute("SELECT hash, row FROM vectors").fetchall())
+    if row is not None and os.path.exists(VECTORS_PATH):
+        _dim = int(row[0])
+        capacity = os.path.getsize(VECTORS_PATH) // (4 * _dim)
+        _vectors = np.memmap(VECTORS_PATH, dtype="float32", mode="r+", shape=(capacity, _dim))
+    else:
+        # Index without a matching vector file is useless
+        conn.execute("DELETE FROM vectors")
+        _index = {}
+    _db = conn
+
+
+def _ensure_capacity(rows: int, dim: int):
+    """Creates or grows (doubling) the vector file to hold `rows` rows."""
+    global _vectors, _dim
+    if _vectors is None:
+        _dim = dim
+        _db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (str(dim),))
+        capacity = max(INITIAL_ROWS, rows)
+    elif rows <= _vectors.shape[0]:
+        return
+    else:
+        _vectors.flush()
+        capacity = max(rows, _vectors.shape[0] * 2)
+        _vectors = None
+    with open(VECTORS_PATH, "ab") as f:
+        f.truncate(capacity * dim * 4)
+    _vectors = np.memmap(VECTORS_PATH, dtype="float32", mode="r+", shape=(capacity, dim))
+
+
+def get_many(texts: list[str]) -> tuple[list, list[int]]:
+    """
+    Looks up cached vectors.
+
+    Returns:
+        (vectors, missing): vectors[i] is an np.ndarray or None;
+        missing lists the indices of texts that still need encoding.
+    """
+    hashes = [_hash(t) for t in texts]
+    with _lock:
+        _open()
+        vectors, missing = [], []
+        for i, h in enumerate(hashes):
+            row = _index.get(h)
+            if row is None:
+                vectors.append(None)
+                missing.append(i)
+            else:
+                vectors.append(np.array(_vectors[row]))
+        _stats["hits"] += len(texts) - len(missing)
+        _stats["misses"] += len(missing)
+    return vectors, missing
+
+
+def put_many(texts: list[str], vectors: np.ndarray):
+    """Stores freshly encoded vectors (one row per text)."""
+    vectors = np.asarray(vectors, dtype="float32")
+    if not len(texts):
+        return
+    with _lock:
+        _open()
+        if _dim is not None and vectors.shape[1] != _dim:
+            return  # model changed under the same name; don't mix dimensions
+        new = {}
+        for text, vec in zip(texts, vectors):
+            h = _hash(text)
+            if h not in _index and h not in new:
+                new[h] = vec
+        if not new:
+            return
+        start = len(_index)
+        _ensure_capacity(start + len(new), vectors.shape[1])
+        rows = []
+        for offset, (h, vec) in enumerate(new.items()):
+            _vectors[start + offset] = vec
+            rows.append((h, start + offset))
+        _vectors.flush()
+        # Index rows only after their vectors are on disk
+        _db.executemany("INSERT OR REPLACE INTO vectors (hash, row) VALUES (?, ?)", rows)
+        _index.update(rows)
+
+
+def encode(texts: list[str], encode_fn) -> np.ndarray:
+    """
+    Returns vectors for all texts, calling encode_fn(list[str]) -> array
+    only for the cache misses (deduplicated, one batch).
+    """
+    if not enabled() or not texts:
+        return np.asarray(encode_fn(texts), dtype="float32")
+
+    vectors, missing = get_many(texts)
+    if missing:
+        unique = list(dict.fromkeys(texts[i] for i in missing))
+        _fill(texts, vectors, missing, unique, encode_fn(unique))
+    return np.vstack(vectors)
+
+
+async def aencode(texts: list[str], aencode_fn) -> np.ndarray:
+    """Async variant of encode() for an awaitable aencode_fn."""
+    if not enabled() or not texts:
+        return np.asarray(await aencode_fn(texts), dtype="float32")
+
+    vectors, missing = get_many(texts)
+    if missing:
+        unique = list(dict.fromkeys(texts[i] for i in missing))
+        _fill(texts, vectors, missing, unique, await aencode_fn(unique))
+    return np.vstack(vectors)
+
+
+def _fill(texts, vectors, missing, unique, encoded):
+    encoded = np.asarray(encoded, dtype="float32")
+    put_many(unique, encoded)
+    by_text = dict(zip(unique, encoded))
+    for i in missing:
+        vectors[i] = by_text[texts[i]]
+
+
+def clear():
+    global _vectors, _dim
+    with _lock:
+        _open()
+        _db.execute("DELETE FROM vectors")
+        _db.execute("DELETE FROM meta")
+        _index.clear()
+        _vectors = None
+        _dim = None
+        if os.path.exists(VECTORS_PATH):
+            os.remove(VECTORS_PATH)
+
+
+def stats() -> dict:
+    with _lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+        items = len(_index) if _index is not None else 0
+        capacity = _vectors.shape[0] if _vectors is not None else 0
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "items": items,
+            "bytes_used": items * (_dim or 0) * 4,
+            "bytes_allocated": capacity * (_dim or 0) * 4,
+        }
@@ -25,19 +25,12 @@ def start_generation(
 
     context = _gather_context(topic)
 
-    # RAG query function — can make separate queries for each section
-    def rag_query_func(query: str) -> str:
-        try:
-            return lightrag_service.query(query, mode="hybrid")
-        except Exception:
-            return ""
-
     result = generate_handbook(
         topic=topic,
         context=context,
         model=model,
         progress_callback=progress_callback,
-        rag_query_func=rag_query_func,
+        rag_query_func=make_rag_query_func(),
     )
 
     try:
@@ -64,9 +57,41 @@ def start_interactive_generation(topic: str, model: str = None) -> dict:
     return init_interactive_handbook(topic, context, model=model)
 
 
+def make_rag_query_func(mode: str = "hybrid") -> Callable:
+    """
+    RAG query function — can make separate queries for each section.
+    `prefetch(queries)` runs all section queries concurrently up front;
+    later calls are served from the prefetched results.
+    """
+    prefetched = {}
+
+    def rag_query_func(query: str) -> str:
+        if prefetched.get(query):
+            return prefetched[query]
+        try:
+            return lightrag_service.get_rag_context(query, mode=mode)
+        except Exception:
+            return ""
+
+    def prefetch(queries: list[str]):
+        queries = [q for q in dict.fromkeys(queries) if q and q not in prefetched]
+        if not queries:
+            return
+        try:
+            results = lightrag_service.query_many(queries, mode=mode)
+        except Exception:
+            return
+        for q, r in zip(queries, results):
+            if r:
+                prefetched[q] = r
+
+    rag_query_func.prefetch = prefetch
+    return rag_query_func
+
+
 def rag_query_func_wrapper(query: str) -> str:
     try:
-        return lightrag_service.query(query, mode="hybrid")
+        return lightrag_service.get_rag_context(query, mode="hybrid")
     except Exception:
         return ""
 
@@ -98,13 +123,14 @@ def _gather_context(topic: str) -> str:
         f"Recent developments and trends in {topic}",
     ]
 
-    for q in queries:
-        try:
-            result = lightrag_service.query(q, mode="hybrid")
-            if result and len(result) > 50:
-                context_parts.append(result)
-        except Exception:
-            continue
+    try:
+        results = lightrag_service.query_many(queries, mode="hybrid")
+    except Exception:
+        results = []
+
+    for result in results:
+        if result and len(result) > 50:
+            context_parts.append(result)
 
     if not context_parts:
         return "Failed to retrieve context from documents. The handbook will be generated based on general knowledge."
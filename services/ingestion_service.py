@@ -0,0 +1,250 @@
+"""
+LunarTech AI — Ingestion Service
+Background document ingestion: bounded job queue, parallel workers,
+per-stage progress and cancellation. Extraction runs on INGEST_WORKERS
+threads; the LightRAG inserts themselves go through one at a time (see
+lightrag_service.submit_insert), and a job only completes once LightRAG has
+processed its document.
+"""
+
+import io
+import os
+import sys
+import math
+import queue
+import uuid
+import threading
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+from services import doc_registry, document_processor, lightrag_service
+from utils import logger
+from utils.helpers import chunk_text
+
+STAGES = ["extract", "chunk", "embed", "extract_entities", "merge_graph"]
+# Share of the overall progress bar each stage accounts for
+_STAGE_WEIGHTS = {
+    "extract": 0.10,
+    "chunk": 0.05,
+    "embed": 0.10,
+    "extract_entities": 0.65,
+    "merge_graph": 0.10,
+}
+STAGE_LABELS = {
+    "extract": "📄 Extracting text",
+    "chunk": "✂️ Chunking",
+    "embed": "🔢 Embedding chunks",
+    "extract_entities": "🧠 Extracting entities",
+    "merge_graph": "🕸️ Merging into graph",
+}
+
+_queue = queue.Queue(maxsize=config.INGEST_QUEUE_SIZE)
+_jobs = {}
+_lock = threading.Lock()
+_workers = []
+
+
+def _new_job(filename: str) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "filename": filename,
+        "status": "queued",  # queued | running | completed | failed | cancelled
+        "cancellable": True,  # False once its LightRAG insert has started
+        "stage": None,
+        "stage_progress": 0.0,
+        "progress": 0.0,
+        "created_at": datetime.now(),
+        "started_at": None,
+        "completed_at": None,
+        "result": None,
+        "error": None,
+    }
+
+
+def _set_stage(job: dict, stage: str, stage_progress: float = 0.0):
+    with _lock:
+        job["stage"] = stage
+        job["stage_progress"] = min(1.0, stage_progress)
+        done = sum(_STAGE_WEIGHTS[s] for s in STAGES[: STAGES.index(stage)])
+        job["progress"] = done + _STAGE_WEIGHTS[stage] * job["stage_progress"]
+
+
+def _make_observer(job: dict, text: str):
+    """Maps LightRAG's LLM/embedding calls onto the embed → extract → merge stages."""
+    est_chunks = max(
+        1, math.ceil(len(text) / 4 / lightrag_service.RAG_CHUNK_TOKEN_SIZE)
+    )
+    counters = {"llm": 0}
+
+    def observer(event: str, count: int):
+        stage = job["stage"]
+        if event == "llm":
+            counters["llm"] += 1
+            # Gleaning adds extra calls per chunk, so never report 100% here
+            _set_stage(job, "extract_entities", min(0.95, counters["llm"] / est_chunks))
+        elif event == "embed":
+            if stage == "extract_entities":
+                _set_stage(job, "merge_graph", 0.5)
+            elif stage != "merge_graph":
+                _set_stage(job, "embed", 0.5)
+
+    return observer
+
+
+def _begin_insert(job: dict) -> bool:
+    """Called when the job's insert reaches the front of the pipeline; False if cancelled meanwhile."""
+    with _lock:
+        if job["_cancel"].is_set():
+            return False
+        job["cancellable"] = False
+        return True
+
+
+def _run_job(job: dict, data: bytes) -> bool:
+    """Runs one job; returns False when it stopped for a cancel."""
+    cancel = job["_cancel"]
+
+    _set_stage(job, "extract")
+    file_obj = io.BytesIO(data)
+    file_obj.name = job["filename"]
+    extracted = document_processor.extract_text(file_obj, job["filename"])
+    if not extracted["full_text"].strip():
+        raise ValueError("No text could be extracted from the document")
+    if cancel.is_set():
+        return False
+
+    _set_stage(job, "chunk")
+    chunks = chunk_text(
+        extracted["full_text"], chunk_size=config.CHUNK_SIZE, overlap=config.CHUNK_OVERLAP
+    )
+    result = {**extracted, "chunks": chunks, "chunk_count": len(chunks)}
+    result["quality"] = document_processor.document_quality_score(result)
+    if cancel.is_set():
+        return False
+
+    # Only new or changed content goes to LightRAG (see doc_registry)
+    report = doc_registry.plan(data, result["full_text"])
+    result["file_hash"] = report["file_hash"]
+    result["ingest_report"] = {
+        k: v for k, v in report.items() if k not in ("new_chunks", "chunk_hashes")
+    }
+    if not report["new_chunks"]:
+        logger.info("Ingestion skipped (unchanged)", job=job["id"], file=job["filename"])
+        _set_stage(job, "merge_graph", 1.0)
+        with _lock:
+            job["result"] = result
+        return True
+
+    if report["skipped_chunks"]:
+        text = "\n\n".join(report["new_chunks"])
+    else:
+        text = result["full_text"]
+
+    _set_stage(job, "embed")
+    # A cancel is honoured until the insert's turn comes; after that LightRAG
+    # has to finish, or a half-indexed document would be left behind.
+    inserted = lightrag_service.submit_insert(
+        text, observer=_make_observer(job, text), should_start=lambda: _begin_insert(job)
+    ).result()
+    if not inserted:
+        return False
+
+    doc_registry.commit(report, job["filename"])
+    _set_stage(job, "merge_graph", 1.0)
+    with _lock:
+        job["result"] = result
+    return True
+
+
+def _worker_loop():
+    while True:
+        job, data = _queue.get()
+        try:
+            if job["_cancel"].is_set():
+                continue
+            with _lock:
+                job["status"] = "running"
+                job["started_at"] = datetime.now()
+            logger.info("Ingestion started", job=job["id"], file=job["filename"])
+            try:
+                completed = _run_job(job, data)
+                with _lock:
+                    job["status"] = "completed" if completed else "cancelled"
+            except Exception as e:
+                logger.error("Ingestion failed", exc=e, job=job["id"])
+                with _lock:
+                    job["status"] = "failed"
+                    job["error"] = str(e)
+            with _lock:
+                job["completed_at"] = datetime.now()
+            logger.info("Ingestion finished", job=job["id"], status=job["status"])
+        finally:
+            _queue.task_done()
+
+
+def start_workers_if_needed():
+    """Starts config.INGEST_WORKERS daemon workers (once)."""
+    with _lock:
+        alive = [w for w in _workers if w.is_alive()]
+        for _ in range(config.INGEST_WORKERS - len(alive)):
+            worker = threading.Thread(target=_worker_loop, daemon=True)
+            worker.start()
+            alive.append(worker)
+        _workers[:] = alive
+
+
+def submit(filename: str, data: bytes) -> str:
+    """
+    Queues a document for ingestion and returns its job id.
+    Raises RuntimeError when the queue is full (backpressure).
+    """
+    start_workers_if_needed()
+    job = _new_job(filename)
+    job["_cancel"] = threading.Event()
+    try:
+        _queue.put_nowait((job, data))
+    except queue.Full:
+        raise RuntimeError(
+            f"Ingestion queue is full ({config.INGEST_QUEUE_SIZE} documents waiting). Try again shortly."
+        )
+    with _lock:
+        _jobs[job["id"]] = job
+    return job["id"]
+
+
+def cancel(job_id: str) -> bool:
+    """
+    Cancels a queued or running job. Returns False if it already finished or
+    its LightRAG insert has started (it then runs to completion).
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job["status"] in ("completed", "failed", "cancelled"):
+            return False
+        if not job["cancellable"]:
+            return False
+        job["_cancel"].set()
+        if job["status"] == "queued":
+            job["status"] = "cancelled"
+            job["completed_at"] = datetime.now()
+    return True
+
+
+def get_job(job_id: str) -> dict | None:
+    """Snapshot of a job's state (without internal fields)."""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        return {k: v for k, v in job.items() if not k.startswith("_")}
+
+
+def forget(job_id: str):
+    """Drops a finished job from the registry once the UI has consumed it."""
+    with _lock:
+        _jobs.pop(job_id, None)
+
+
+def queue_depth() -> int:
+    return _queue.qsize()
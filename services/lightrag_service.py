@@ -5,8 +5,12 @@ Knowledge Graph based RAG engine management.
 
 import os
 import sys
+import json
+import time
 import asyncio
 import threading
+import contextvars
+from dataclasses import dataclass, field, asdict
 from typing import Optional, Dict
 
 # Add project root to path
@@ -16,8 +20,6 @@ import config
 try:
     from lightrag import LightRAG, QueryParam
     from lightrag.utils import EmbeddingFunc
-    from lightrag.llm.openai import openai_complete_if_cache
-    from openai import AsyncOpenAI
     import numpy as np
 
     LIGHTRAG_AVAILABLE = True
@@ -25,10 +27,26 @@ except ImportError:
     LIGHTRAG_AVAILABLE = False
 
 
+# ── Ingestion Progress Hooks ──────────────────────────────
+
+# Set by insert_document(observer=...); LightRAG's internal tasks inherit it,
+# so LLM/embedding calls made for one document report to that document's job.
+_ingest_observer = contextvars.ContextVar("ingest_observer", default=None)
+
+
+def _notify_ingest(event: str, count: int = 1):
+    observer = _ingest_observer.get()
+    if observer is not None:
+        try:
+            observer(event, count)
+        except Exception:
+            pass
+
+
 # ── Singleton RAG Instance ────────────────────────────────
 
 _rag_instance: "LightRAG" = None
-_llm_lock = None
+RAG_CHUNK_TOKEN_SIZE = 9000
 
 
 async def _custom_llm_func(
@@ -38,12 +56,10 @@ async def _custom_llm_func(
     keyword_extraction: bool = False,
     **kwargs,
 ) -> str:
-    """Asynchronous LLM Engine featuring Google Gemini 5RPM Rate Limiter for LightRAG."""
-    global _llm_lock
-    import asyncio
+    """Asynchronous LLM Engine for LightRAG (provider-aware rate limiting)."""
+    from services import llm_service
 
-    if _llm_lock is None:
-        _llm_lock = asyncio.Lock()
+    _notify_ingest("llm")
 
     messages = []
     if system_prompt:
@@ -52,71 +68,30 @@ async def _custom_llm_func(
         messages.extend(history_messages)
     messages.append({"role": "user", "content": prompt})
 
-    try:
+    model = config.DEFAULT_MODEL
+    if "gemini" in model.lower() and getattr(config, "GEMINI_API_KEY", ""):
         # If Gemini Model is used (Connect directly to Google API / Completely Free)
-        if "gemini" in config.DEFAULT_MODEL.lower() and getattr(
-            config, "GEMINI_API_KEY", ""
-        ):
-            client = AsyncOpenAI(
-                api_key=config.GEMINI_API_KEY,
-                base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-            )
-            # Remove 'google/' prefix in OpenRouter format (for native OpenAI compatibility)
-            actual_model = config.DEFAULT_MODEL.replace("google/", "")
-        elif "ollama" in config.DEFAULT_MODEL.lower():
-            # Connect to Fully Local Ollama Engine (Zero Network Traffic, Unlimited Limit)
-            client = AsyncOpenAI(
-                api_key="ollama",  # Ollama doesn't require an API key, sent as a dummy
-                base_url=getattr(
-                    config, "OLLAMA_BASE_URL", "http://localhost:11434/v1"
-                ),
-            )
-            actual_model = config.DEFAULT_MODEL.replace("ollama/", "")
-        else:
-            # Standard OpenRouter connection for other models (Grok, Claude, etc.)
-            client = AsyncOpenAI(
-                api_key=config.OPENROUTER_API_KEY, base_url=config.OPENROUTER_BASE_URL
-            )
-            actual_model = config.DEFAULT_MODEL
+        provider = "gemini"
+    elif "ollama" in model.lower():
+        # Connect to Fully Local Ollama Engine (Zero Network Traffic, Unlimited Limit)
+        provider = "ollama"
+    else:
+        # Standard OpenRouter connection for other models (Grok, Claude, etc.)
+        provider = "openrouter"
 
-        # ── GEMINI 5RPM Free Tier Throttling (Global Lock) ──
-        if "gemini" in config.DEFAULT_MODEL.lower() and getattr(
-            config, "GEMINI_API_KEY", ""
-        ):
-            async with _llm_lock:
-                print(
-                    "⏳ Gemini Rate Limiter (Lock Acquired): Waiting 13 seconds to bypass 5RPM quota..."
-                )
-                await asyncio.sleep(13)
-                response = await client.chat.completions.create(
-                    model=actual_model,
-                    messages=messages,
-                    temperature=kwargs.get("temperature", 0.0),
-                    top_p=kwargs.get("top_p", 1.0),
-                    max_tokens=kwargs.get("max_tokens", 4096),
-                )
-        elif "ollama" in config.DEFAULT_MODEL.lower():
-            # Ollama (Local GPU/CPU):
-            # To prevent the model from processing 4-5 giant texts at once and crashing the computer or getting a Timeout,
-            # we queue the processes with a Lock. It never has a quota, but it has a hardware limit.
-            async with _llm_lock:
-                print(f"🧠 Local Ollama Task: Generating with {actual_model}...")
-                response = await client.chat.completions.create(
-                    model=actual_model,
-                    messages=messages,
-                    temperature=kwargs.get("temperature", 0.0),
-                    top_p=kwargs.get("top_p", 1.0),
-                    max_tokens=kwargs.get("max_tokens", 4096),
-                )
-        else:
-            response = await client.chat.completions.create(
-                model=actual_model,
-                messages=messages,
-                temperature=kwargs.get("temperature", 0.0),
-                top_p=kwargs.get("top_p", 1.0),
-                max_tokens=kwargs.get("max_tokens", 4096),
-            )
-        return response.choices[0].message.content
+    try:
+        # Gemini RPM/TPM quotas and the Ollama parallelism cap are enforced
+        # per provider by services.rate_limiter inside achat_completion.
+        # LightRAG keeps its own LLM cache, so the service cache is skipped here.
+        return await llm_service.achat_completion(
+            messages=messages,
+            model=model,
+            max_tokens=kwargs.get("max_tokens", 4096),
+            temperature=kwargs.get("temperature", 0.0),
+            use_cache=False,
+            provider=provider,
+            timeout=config.LIGHTRAG_LLM_TIMEOUT,
+        )
     except Exception as e:
         print(f"LLM API Error (Gemini/OpenRouter Bypass): {str(e)}")
         raise e
@@ -124,37 +99,61 @@ async def _custom_llm_func(
 
 # To load the Local Embedding model only when necessary
 _embedding_model = None
-_embedding_executor = None
+_embedding_model_lock = threading.Lock()
 
 
-async def _custom_embedding_func(texts: list[str], **kwargs):
-    """Local CPU-based embedding function for LightRAG."""
-    global _embedding_model, _embedding_executor
-    import asyncio
-    import concurrent.futures
-
+def get_embedding_model():
+    """Loads (once) and returns the local SentenceTransformer shared by RAG and caches."""
+    global _embedding_model
     if _embedding_model is None:
-        from sentence_transformers import SentenceTransformer
+        with _embedding_model_lock:
+            if _embedding_model is None:
+                from services import embedding_backends
+
+                print(
+                    f"Loading local embedding model: {config.EMBEDDING_MODEL} "
+                    f"(384d, {config.EMBEDDING_BACKEND})..."
+                )
+                _embedding_model = embedding_backends.load_model()
+    return _embedding_model
+
+
+def _model_encode(texts: list[str]) -> "np.ndarray":
+    """One direct model call; only services.embedding_batcher should use this."""
+    return get_embedding_model().encode(
+        texts, batch_size=config.EMBED_BATCH_SIZE, show_progress_bar=False
+    )
 
-        print(f"Loading local embedding model: {config.EMBEDDING_MODEL} (384d)...")
-        _embedding_model = SentenceTransformer(config.EMBEDDING_MODEL)
 
-    if _embedding_executor is None:
-        _embedding_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+def _encode(texts: list[str]) -> "np.ndarray":
+    """Raw model output: persistent cache first, misses via the shared batcher."""
+    from services import embedding_batcher, embedding_cache
 
+    return embedding_cache.encode(texts, embedding_batcher.encode)
+
+
+def embed_texts(texts: list[str]) -> "np.ndarray":
+    """Synchronous local embedding (L2-normalised float32) for non-LightRAG callers."""
+    vecs = _encode(texts)
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    return (vecs / np.maximum(norms, 1e-12)).astype("float32")
+
+
+async def _custom_embedding_func(texts: list[str], **kwargs):
+    """Local CPU-based embedding function for LightRAG."""
+    from services import embedding_batcher, embedding_cache
+
+    _notify_ingest("embed", len(texts))
     try:
-        loop = asyncio.get_event_loop()
-        embeddings = await loop.run_in_executor(
-            _embedding_executor,
-            lambda: _embedding_model.encode(texts, show_progress_bar=False),
-        )
-        return np.array(embeddings)
+        # Concurrent LightRAG calls are merged into shared batches by the batcher
+        return await embedding_cache.aencode(texts, embedding_batcher.aencode)
     except Exception as e:
         print(f"Local Embedding Error: {str(e)}")
         raise e
 
 
 _rag_instance = None
+_rag_instance_lock = threading.Lock()
 
 
 def get_rag() -> "LightRAG":
@@ -165,7 +164,14 @@ def get_rag() -> "LightRAG":
     global _rag_instance
     if _rag_instance is not None:
         return _rag_instance
+    # The warm-up thread and the first request may race to build it
+    with _rag_instance_lock:
+        if _rag_instance is None:
+            _rag_instance = _build_rag()
+    return _rag_instance
 
+
+def _build_rag() -> "LightRAG":
     if not LIGHTRAG_AVAILABLE:
         raise ImportError(
             "lightrag-hku library is not installed. pip install lightrag-hku"
@@ -188,6 +194,10 @@ def get_rag() -> "LightRAG":
         kwargs["kv_storage"] = "PGKVStorage"
         kwargs["vector_storage"] = "PGVectorStorage"
         kwargs["doc_status_storage"] = "PGDocStatusStorage"
+    elif config.LOCAL_VECTOR_STORAGE == "ann":
+        from services import ann_vector_storage
+
+        kwargs["vector_storage"] = ann_vector_storage.register()
 
     emb_func = EmbeddingFunc(
         func=_custom_embedding_func,
@@ -196,19 +206,25 @@ def get_rag() -> "LightRAG":
     )
     setattr(emb_func, "model_name", "lunar_vectordb")
 
-    _rag_instance = LightRAG(
+    rag = LightRAG(
         working_dir=config.LIGHTRAG_WORK_DIR,
         llm_model_func=_custom_llm_func,
         embedding_func=emb_func,
-        chunk_token_size=9000,
+        chunk_token_size=RAG_CHUNK_TOKEN_SIZE,
         **kwargs,
     )
-    return _rag_instance
+    if config.BM25_ENABLED:
+        from services import bm25_index
+
+        # Indexes every chunk LightRAG writes to (or deletes from) its chunk store
+        bm25_index.attach(rag.chunks_vdb)
+    return rag
 
 
 # Background loop for all DB/async operations to prevent Streamlit threading conflicts
 _loop = None
 _thread = None
+_loop_lock = threading.Lock()
 
 
 def _start_background_loop(loop):
@@ -219,11 +235,14 @@ def _start_background_loop(loop):
 def _get_background_loop():
     global _loop, _thread
     if _loop is None:
-        _loop = asyncio.new_event_loop()
-        _thread = threading.Thread(
-            target=_start_background_loop, args=(_loop,), daemon=True
-        )
-        _thread.start()
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                _thread = threading.Thread(
+                    target=_start_background_loop, args=(loop,), daemon=True
+                )
+                _thread.start()
+                _loop = loop
     return _loop
 
 
@@ -236,6 +255,7 @@ def _run_async(coro):
 
 # Storage initialization flag
 _rag_initialized = False
+_rag_init_lock = None
 
 
 def reset_rag():
@@ -248,40 +268,141 @@ def reset_rag():
 
 
 async def _ensure_initialized_async(rag):
-    global _rag_initialized
-    if not _rag_initialized:
-        try:
-            if hasattr(rag, "initialize_storages"):
-                await rag.initialize_storages()
-        except Exception as e:
-            print(f"Bypass Storage Init Error (non-critical): {e}")
-        _rag_initialized = True
+    global _rag_initialized, _rag_init_lock
+    if _rag_initialized:
+        return
+    # Always created on the background loop, the only loop that awaits it
+    if _rag_init_lock is None:
+        _rag_init_lock = asyncio.Lock()
+    async with _rag_init_lock:
+        if not _rag_initialized:
+            try:
+                if hasattr(rag, "initialize_storages"):
+                    await rag.initialize_storages()
+            except Exception as e:
+                print(f"Bypass Storage Init Error (non-critical): {e}")
+            _rag_initialized = True
 
 
 def _ensure_initialized(rag):
     _run_async(_ensure_initialized_async(rag))
 
 
-async def _insert_async(text: str):
-    """Inserts the document text into LightRAG asynchronously."""
+# ── Graph Version (query cache invalidation) ──────────────
+
+_GRAPH_VERSION_FILE = os.path.join(config.LIGHTRAG_WORK_DIR, "graph_version")
+_graph_version = None
+_graph_version_lock = threading.Lock()
+
+
+def get_graph_version() -> int:
+    """Monotonic counter of knowledge-graph changes (persisted in the work dir)."""
+    global _graph_version
+    if _graph_version is None:
+        try:
+            with open(_GRAPH_VERSION_FILE, "r", encoding="utf-8") as f:
+                _graph_version = int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            _graph_version = 0
+    return _graph_version
+
+
+def _bump_graph_version() -> int:
+    global _graph_version
+    from services import query_cache
+
+    with _graph_version_lock:
+        version = get_graph_version() + 1
+        os.makedirs(config.LIGHTRAG_WORK_DIR, exist_ok=True)
+        with open(_GRAPH_VERSION_FILE, "w", encoding="utf-8") as f:
+            f.write(str(version))
+        _graph_version = version
+    query_cache.invalidate_before(version)
+    return version
+
+
+# LightRAG drains its document queue in whichever call gets there first and
+# returns at once from any other ("Another process is already processing the
+# document queue"), so inserts from this process go through one at a time.
+_insert_lock = None
+
+
+def _doc_status(doc) -> str:
+    status = doc.get("status") if isinstance(doc, dict) else getattr(doc, "status", None)
+    return str(getattr(status, "value", status)).lower()
+
+
+async def _check_processed(rag, track_id):
+    """Raises unless LightRAG reports every document of this insert as processed."""
+    if not track_id or not hasattr(rag, "aget_docs_by_track_id"):
+        return
+    docs = await rag.aget_docs_by_track_id(track_id)
+    unfinished = sorted({_doc_status(d) for d in (docs or {}).values()} - {"processed"})
+    if unfinished:
+        raise RuntimeError(
+            f"LightRAG has not processed the document yet (status: {', '.join(unfinished)})"
+        )
+
+
+async def _insert_async(text: str, observer=None, should_start=None) -> bool:
+    """
+    Inserts the document text into LightRAG asynchronously, after any insert
+    already running. Returns False without inserting when should_start()
+    (checked once this insert's turn comes) returns False.
+    """
+    global _insert_lock
+    if observer is not None:
+        _ingest_observer.set(observer)
     rag = get_rag()
     await _ensure_initialized_async(rag)
-    await rag.ainsert(text)
+    # Always created on the background loop, the only loop that awaits it
+    if _insert_lock is None:
+        _insert_lock = asyncio.Lock()
+    async with _insert_lock:
+        if should_start is not None and not should_start():
+            return False
+        try:
+            track_id = await rag.ainsert(text)
+            await _check_processed(rag, track_id)
+        finally:
+            # Even a partial insert may have changed the graph
+            _bump_graph_version()
+    return True
 
 
-def insert_document(text: str):
+def submit_insert(text: str, observer=None, should_start=None):
+    """
+    Schedules a document insert on the background loop without waiting.
+    Inserts run one at a time; the returned concurrent.futures.Future
+    resolves once LightRAG has processed the document.
+
+    Args:
+        text: The full text of the document
+        observer: Optional callback(event, count) receiving "llm"/"embed"
+            events for this document's LightRAG calls
+        should_start: Optional callable checked when the insert's turn
+            comes; returning False skips it (the Future resolves to False)
+    """
+    loop = _get_background_loop()
+    return asyncio.run_coroutine_threadsafe(_insert_async(text, observer, should_start), loop)
+
+
+def insert_document(text: str, observer=None):
     """
     Inserts the document text into LightRAG.
     Entities and relations are automatically extracted.
 
     Args:
         text: The full text of the document
+        observer: Optional progress callback (see submit_insert)
     """
-    _run_async(_insert_async(text))
+    submit_insert(text, observer).result()
 
 
 async def _query_async(question: str, mode: str = "hybrid") -> str:
     """Async query."""
+    if mode == FUSION_MODE:
+        return await _fusion_answer_async(question)
     rag = get_rag()
     await _ensure_initialized_async(rag)
     return await rag.aquery(
@@ -290,7 +411,23 @@ async def _query_async(question: str, mode: str = "hybrid") -> str:
     )
 
 
-def query(question: str, mode: str = "hybrid") -> str:
+async def _timed_first_query(coro):
+    """
+    Awaits a query that reaches LightRAG. The process's first one is recorded
+    as the warm-up latency metric; query-cache hits never get here, so they
+    cannot pass for a warm start.
+    """
+    from services import warmup
+
+    if warmup.first_query_recorded():
+        return await coro
+    started = time.monotonic()
+    result = await coro
+    warmup.record_first_query(time.monotonic() - started)
+    return result
+
+
+def query(question: str, mode: str = "hybrid", use_cache: bool = True) -> str:
     """
     Performs a query over the LightRAG Knowledge Graph.
 
@@ -301,11 +438,344 @@ def query(question: str, mode: str = "hybrid") -> str:
             - global: Overview, broad topics
             - hybrid: Combination of both (recommended)
             - naive: Simple vector search (fallback)
+            - fusion: BM25 + vector chunk hits merged by reciprocal rank
+        use_cache: Reuse results for the same question/mode/graph version
 
     Returns:
         The response generated by the LLM
     """
-    return _run_async(_query_async(question, mode))
+    from services import query_cache
+
+    version = get_graph_version()
+    if use_cache:
+        cached = query_cache.get(question, mode, version)
+        if cached is not None:
+            return cached
+
+    result = _run_async(_timed_first_query(_query_async(question, mode)))
+
+    # Skip caching if a document was inserted while the query ran
+    if use_cache and result and get_graph_version() == version:
+        query_cache.put(question, mode, version, str(result))
+    return result
+
+
+# ── Context-only Retrieval ────────────────────────────────
+
+
+@dataclass
+class RetrievalResult:
+    """Raw ranked retrieval output (no LightRAG answer generation)."""
+
+    question: str
+    mode: str
+    entities: list = field(default_factory=list)
+    relations: list = field(default_factory=list)
+    chunks: list = field(default_factory=list)
+    raw_context: str = ""  # used when the installed LightRAG has no aquery_data
+    tokens: int = 0
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.entities or self.relations or self.chunks or self.raw_context)
+
+    def to_context(self) -> str:
+        """Renders the result as prompt context; chunk text keeps its [Page X] markers."""
+        if self.raw_context:
+            return self.raw_context
+        parts = []
+        if self.entities:
+            parts.append(
+                "## Entities\n"
+                + "\n".join(
+                    f"- {e.get('entity_name', '')} ({e.get('entity_type', '')}): {e.get('description', '')}"
+                    for e in self.entities
+                )
+            )
+        if self.relations:
+            parts.append(
+                "## Relations\n"
+                + "\n".join(
+                    f"- {r.get('src_id', '')} → {r.get('tgt_id', '')}: {r.get('description', '')}"
+                    for r in self.relations
+                )
+            )
+        if self.chunks:
+            parts.append(
+                "## Source Passages\n"
+                + "\n\n".join(c.get("content", "") for c in self.chunks)
+            )
+        return "\n\n".join(parts)
+
+
+# Text that stands for each retrieved item when budgeting (and reranking)
+ITEM_TEXT = {
+    "chunks": lambda c: c.get("content", ""),
+    "entities": lambda e: f"{e.get('entity_name', '')} {e.get('description', '')}",
+    "relations": lambda r: f"{r.get('src_id', '')} {r.get('tgt_id', '')} {r.get('description', '')}",
+}
+
+
+def _pack_budget(result: RetrievalResult, token_budget: int) -> RetrievalResult:
+    """
+    Keeps the highest-ranked items within the token budget.
+    Priority: chunks (they carry page markers), then entities, then relations.
+    """
+    from utils import tokens
+
+    remaining = token_budget
+    for attr, render in ITEM_TEXT.items():
+        items = getattr(result, attr)
+        kept = []
+        for item, cost in zip(items, tokens.count_many([render(i) for i in items])):
+            if cost > remaining:
+                break
+            kept.append(item)
+            remaining -= cost
+        setattr(result, attr, kept)
+    if result.raw_context:
+        result.raw_context = tokens.truncate_to_tokens(result.raw_context, remaining)
+        remaining -= tokens.count(result.raw_context)
+    result.tokens = token_budget - remaining
+    return result
+
+
+async def _retrieve_async(question: str, mode: str) -> RetrievalResult:
+    if mode == FUSION_MODE:
+        return await _fusion_retrieve_async(question)
+    rag = get_rag()
+    await _ensure_initialized_async(rag)
+
+    result = RetrievalResult(question=question, mode=mode)
+    if hasattr(rag, "aquery_data"):
+        response = await rag.aquery_data(question, param=QueryParam(mode=mode))
+        data = (response or {}).get("data") or {}
+        result.entities = list(data.get("entities") or [])
+        result.relations = list(data.get("relationships") or [])
+        result.chunks = list(data.get("chunks") or [])
+    else:
+        # Older LightRAG: same retrieval, but the context comes back pre-rendered
+        result.raw_context = str(
+            await rag.aquery(
+                question, param=QueryParam(mode=mode, only_need_context=True)
+            )
+            or ""
+        )
+    return result
+
+
+def retrieve(
+    question: str,
+    mode: str = "hybrid",
+    token_budget: int = None,
+    use_cache: bool = True,
+) -> RetrievalResult:
+    """
+    Retrieves ranked entities, relations and chunks for a question WITHOUT
+    running LightRAG's answer-generation LLM call.
+
+    Args:
+        question: User query
+        mode: Query mode - "local", "global", "hybrid", "naive", "fusion"
+        token_budget: Maximum context tokens kept (default config.RAG_CONTEXT_TOKENS)
+        use_cache: Reuse results for the same question/mode/graph version
+
+    Returns:
+        RetrievalResult; use .to_context() for prompt text
+    """
+    from services import query_cache
+
+    token_budget = token_budget or config.RAG_CONTEXT_TOKENS
+    cache_mode = f"context:{mode}"
+    version = get_graph_version()
+
+    if use_cache:
+        cached = query_cache.get(question, cache_mode, version)
+        if cached is not None:
+            return _pack_budget(RetrievalResult(**json.loads(cached)), token_budget)
+
+    result = _run_async(_timed_first_query(_retrieve_async(question, mode)))
+
+    if use_cache and not result.is_empty and get_graph_version() == version:
+        query_cache.put(
+            question, cache_mode, version, json.dumps(asdict(result), default=str)
+        )
+    return _pack_budget(result, token_budget)
+
+
+# ── Lexical + Vector Fusion ───────────────────────────────
+
+FUSION_MODE = "fusion"
+
+_FUSION_SYSTEM_PROMPT = (
+    "Answer the user's question using ONLY the source passages below. "
+    "Keep [Page X] markers when citing. If the passages do not contain the "
+    "answer, say so.\n\n{context}"
+)
+
+
+def _rrf(rankings: list[list[str]], k: int) -> dict[str, float]:
+    """Reciprocal-rank fusion: score(id) = sum over rankings of 1 / (k + rank)."""
+    scores = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return scores
+
+
+async def _fusion_retrieve_async(question: str) -> RetrievalResult:
+    """Chunk retrieval from the vector store and the BM25 index, fused by RRF."""
+    from services import bm25_index
+
+    rag = get_rag()
+    await _ensure_initialized_async(rag)
+
+    top_k = config.FUSION_TOP_K
+    vector_hits = await rag.chunks_vdb.query(question, top_k=top_k)
+    rankings = [[h["id"] for h in vector_hits]]
+    if config.BM25_ENABLED:
+        rankings.append([chunk_id for chunk_id, _ in bm25_index.search(question, top_k)])
+
+    scores = _rrf(rankings, config.RRF_K)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    stored = await rag.text_chunks.get_by_ids(ranked)
+
+    result = RetrievalResult(question=question, mode=FUSION_MODE)
+    for chunk_id, chunk in zip(ranked, stored):
+        if chunk:
+            result.chunks.append(
+                {
+                    "chunk_id": chunk_id,
+                    "content": chunk.get("content", ""),
+                    "file_path": chunk.get("file_path", ""),
+                    "rrf_score": round(scores[chunk_id], 6),
+                }
+            )
+    return result
+
+
+async def _fusion_answer_async(question: str) -> str:
+    """query() for the fusion mode: LightRAG has no hook for external chunks, so answer here."""
+    result = _pack_budget(await _fusion_retrieve_async(question), config.RAG_CONTEXT_TOKENS)
+    if result.is_empty:
+        return ""
+    return await _custom_llm_func(
+        question,
+        system_prompt=_FUSION_SYSTEM_PROMPT.format(context=result.to_context()),
+    )
+
+
+def get_rag_context(question: str, mode: str = "hybrid") -> str:
+    """
+    Context text for prompting: context-only retrieval when RAG_CONTEXT_ONLY
+    is enabled, otherwise LightRAG's generated answer (legacy behaviour).
+    """
+    if config.RAG_CONTEXT_ONLY:
+        return _context_text(question, retrieve(question, mode=mode))
+    return query(question, mode=mode)
+
+
+def _context_text(question: str, result: RetrievalResult) -> str:
+    """Prompt text of a packed RetrievalResult, reranked when enabled (every context-only entry point)."""
+    from services import reranker
+
+    if reranker.enabled():
+        result = reranker.rerank(question, result)
+    return result.to_context()
+
+
+# ── Batched Queries ───────────────────────────────────────
+
+
+async def _query_many_async(
+    questions: list[str], fetch, concurrency: int, timeout: float
+) -> list:
+    """Runs fetch(question) for every question on the loop with a concurrency cap."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _one(question):
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(fetch(question), timeout=timeout)
+            except Exception as e:
+                print(f"Batched RAG query failed ({question[:60]}): {e}")
+                return None
+
+    return await asyncio.gather(*(_one(q) for q in questions))
+
+
+def query_many(
+    questions: list[str],
+    mode: str = "hybrid",
+    context_only: bool = None,
+    concurrency: int = None,
+    timeout: float = None,
+) -> list:
+    """
+    Runs several RAG queries concurrently on the background loop.
+
+    Args:
+        questions: Queries to run
+        mode: Query mode shared by all queries
+        context_only: Use retrieve() instead of query() (default config.RAG_CONTEXT_ONLY)
+        concurrency: Max queries in flight (default config.RAG_QUERY_CONCURRENCY)
+        timeout: Per-query timeout in seconds (default config.RAG_QUERY_TIMEOUT)
+
+    Returns:
+        Context strings in input order; None for queries that failed or timed out
+    """
+    from services import query_cache
+
+    if context_only is None:
+        context_only = config.RAG_CONTEXT_ONLY
+    concurrency = concurrency or config.RAG_QUERY_CONCURRENCY
+    timeout = timeout or config.RAG_QUERY_TIMEOUT
+    cache_mode = f"context:{mode}" if context_only else mode
+    version = get_graph_version()
+
+    results = [None] * len(questions)
+    pending = {}  # question -> indexes still needing a fetch
+    for i, q in enumerate(questions):
+        cached = query_cache.get(q, cache_mode, version)
+        if cached is None:
+            pending.setdefault(q, []).append(i)
+        elif context_only:
+            results[i] = _context_text(
+                q,
+                _pack_budget(RetrievalResult(**json.loads(cached)), config.RAG_CONTEXT_TOKENS),
+            )
+        else:
+            results[i] = cached
+
+    if not pending:
+        return results
+
+    async def _fetch(question):
+        if context_only:
+            return await _timed_first_query(_retrieve_async(question, mode))
+        return await _timed_first_query(_query_async(question, mode))
+
+    fetched = _run_async(
+        _query_many_async(list(pending), _fetch, concurrency, timeout)
+    )
+
+    unchanged = get_graph_version() == version
+    for question, value in zip(pending, fetched):
+        if value is None:
+            continue
+        if context_only:
+            if unchanged and not value.is_empty:
+                query_cache.put(
+                    question, cache_mode, version, json.dumps(asdict(value), default=str)
+                )
+            text = _context_text(question, _pack_budget(value, config.RAG_CONTEXT_TOKENS))
+        else:
+            text = str(value)
+            if unchanged and text:
+                query_cache.put(question, cache_mode, version, text)
+        for i in pending[question]:
+            results[i] = text
+    return results
 
 
 def get_context(question: str) -> str:
@@ -314,7 +784,7 @@ def get_context(question: str) -> str:
     Gathers both local and global information using hybrid mode.
     """
     try:
-        return query(question, mode="hybrid")
+        return get_rag_context(question, mode="hybrid")
     except Exception as e:
         return f"Failed to retrieve context: {str(e)}"
 
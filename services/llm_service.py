@@ -6,46 +6,98 @@ OpenRouter API with retry, cache, timeout, and token tracking.
 import os
 import sys
 import time
+import asyncio
 import numpy as np
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 import config
-from services import cache_service
+from services import cache_service, client_pool, rate_limiter, request_coalescer
 from utils import logger
 
 # ── Config ──
 MAX_RETRIES = 3
 RETRY_DELAYS = [1, 3, 8]  # exponential backoff (seconds)
 DEFAULT_TIMEOUT = 60  # seconds
-
-
-def get_client(model: str = None) -> OpenAI:
-    """Returns OpenRouter or local Ollama client depending on the model."""
-    if model and model.startswith("ollama/"):
-        return OpenAI(
-            base_url=config.OLLAMA_BASE_URL,
-            api_key="ollama",  # Local doesn't need a real key but OpenAI client requires one
-            timeout=600,
+OLLAMA_TIMEOUT = 600  # seconds (local generation can be slow)
+
+
+def _resolve(model: str, provider: str = None) -> tuple:
+    """Returns (provider, base_url, api_key, timeout, api model id) for a model."""
+    if provider is None:
+        provider = "ollama" if model and model.startswith("ollama/") else "openrouter"
+    if provider == "ollama":
+        # Local doesn't need a real key but OpenAI client requires one
+        return (
+            provider,
+            config.OLLAMA_BASE_URL,
+            "ollama",
+            OLLAMA_TIMEOUT,
+            (model or "").replace("ollama/", ""),
         )
-    return OpenAI(
-        base_url=config.OPENROUTER_BASE_URL,
-        api_key=config.OPENROUTER_API_KEY,
-        timeout=DEFAULT_TIMEOUT,
+    if provider == "gemini":
+        # Native Google endpoint drops the OpenRouter 'google/' prefix
+        return (
+            provider,
+            config.GEMINI_BASE_URL,
+            config.GEMINI_API_KEY,
+            DEFAULT_TIMEOUT,
+            (model or "").replace("google/", ""),
+        )
+    return (
+        "openrouter",
+        config.OPENROUTER_BASE_URL,
+        config.OPENROUTER_API_KEY,
+        DEFAULT_TIMEOUT,
+        model,
     )
 
 
+def provider_of(model: str = None) -> str:
+    """Rate-limit provider ("ollama", "gemini" or "openrouter") a model's calls go to."""
+    return _resolve(model or config.DEFAULT_MODEL)[0]
+
+
+def get_client(model: str = None, provider: str = None) -> OpenAI:
+    """Returns the pooled OpenRouter, Gemini or local Ollama client depending on the model."""
+    _, base_url, api_key, timeout, _ = _resolve(model, provider)
+    return client_pool.get_client(base_url, api_key, timeout)
+
+
+def get_async_client(model: str = None, provider: str = None) -> AsyncOpenAI:
+    """Async counterpart of get_client (pooled per event loop)."""
+    _, base_url, api_key, timeout, _ = _resolve(model, provider)
+    return client_pool.get_async_client(base_url, api_key, timeout)
+
+
 # ── Token tracking ──
 _token_usage = {"prompt": 0, "completion": 0, "total": 0, "calls": 0, "cached": 0}
+_stream_ttft = {"streams": 0, "ttft_s": 0.0}  # provider time to first streamed delta
+
+
+def _record_ttft(seconds: float):
+    _stream_ttft["streams"] += 1
+    _stream_ttft["ttft_s"] += seconds
 
 
 def get_token_usage() -> dict:
-    return dict(_token_usage)
+    usage = dict(_token_usage)
+    streams = _stream_ttft["streams"]
+    usage["streams"] = streams
+    usage["avg_ttft_ms"] = 1000 * _stream_ttft["ttft_s"] / streams if streams else 0.0
+    pool = client_pool.stats()
+    usage["pool_hits"] = sum(p["hits"] for p in pool.values())
+    usage["pool_misses"] = sum(p["misses"] for p in pool.values())
+    usage["pool"] = pool
+    usage["rate_limits"] = rate_limiter.stats()
+    usage["coalesced"] = request_coalescer.stats()["coalesced"]
+    return usage
 
 
 def reset_token_usage():
     global _token_usage
     _token_usage = {"prompt": 0, "completion": 0, "total": 0, "calls": 0, "cached": 0}
+    _stream_ttft.update(streams=0, ttft_s=0.0)
 
 
 # ── Retry wrapper ──
@@ -88,9 +140,62 @@ def _retry_call(fn, *args, **kwargs):
         raise
 
 
+@retry(
+    wait=wait_exponential(multiplier=1, min=1, max=15),
+    stop=stop_after_attempt(MAX_RETRIES),
+    retry=retry_if_exception_type(Exception),
+    before_sleep=_before_sleep,
+    reraise=True,
+)
+async def _aretry_call(fn, *args, **kwargs):
+    """Async variant of _retry_call: backoff sleeps yield to the event loop."""
+    try:
+        return await fn(*args, **kwargs)
+    except Exception as e:
+        if not _is_retryable_error(e):
+            raise
+        raise
+
+
+def _track_usage(response):
+    """Adds a response's token usage to the global counters."""
+    if hasattr(response, "usage") and response.usage:
+        _token_usage["prompt"] += response.usage.prompt_tokens or 0
+        _token_usage["completion"] += response.usage.completion_tokens or 0
+        _token_usage["total"] += response.usage.total_tokens or 0
+    _token_usage["calls"] += 1
+
+
+def _usage_total(response) -> int:
+    usage = getattr(response, "usage", None)
+    return (usage.total_tokens or 0) if usage else 0
+
+
 # ── Core Functions ──
 
 
+def _completion_kwargs(
+    model: str,
+    messages: list[dict],
+    max_tokens: int,
+    temperature: float,
+    tools: list = None,
+    tool_choice: str = "auto",
+    provider: str = None,
+) -> dict:
+    """Builds chat.completions.create kwargs with the provider's model id."""
+    kwargs = {
+        "model": _resolve(model, provider)[4],
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+    }
+    if tools:
+        kwargs["tools"] = tools
+        kwargs["tool_choice"] = tool_choice
+    return kwargs
+
+
 def chat_completion(
     messages: list[dict],
     model: str = None,
@@ -104,91 +209,263 @@ def chat_completion(
     model = model or config.DEFAULT_MODEL
 
     # Cache check -> Disable cache if tools are provided (tool calls need active loops)
-    if use_cache and temperature <= 0.3 and not tools:
+    cacheable = use_cache and temperature <= 0.3 and not tools
+    if cacheable:
         cached = cache_service.get(messages, model, max_tokens, temperature)
         if cached is not None:
             _token_usage["cached"] += 1
             logger.llm_call(model, cached=True)
             return cached
 
-    # API call with retry
-    start = time.time()
-
-    def _call():
-        client = get_client(model)
+    provider = _resolve(model)[0]
+    reserve = rate_limiter.estimate_tokens(messages, max_tokens)
 
-        actual_model = model
-        if actual_model.startswith("ollama/"):
-            actual_model = actual_model.replace("ollama/", "")
+    def _fetch():
+        # API call with retry
+        start = time.time()
 
-        kwargs = {
-            "model": actual_model,
-            "messages": messages,
-            "max_tokens": max_tokens,
-            "temperature": temperature,
-        }
-        if tools:
-            kwargs["tools"] = tools
-            kwargs["tool_choice"] = tool_choice
+        def _call():
+            client = get_client(model)
+            kwargs = _completion_kwargs(
+                model, messages, max_tokens, temperature, tools, tool_choice
+            )
+            with rate_limiter.limit(provider, reserve) as lease:
+                response = client.chat.completions.create(**kwargs)
+                lease.settle(_usage_total(response))
+                return response
 
-        return client.chat.completions.create(**kwargs)
+        response = _retry_call(_call)
+        duration_ms = int((time.time() - start) * 1000)
 
-    response = _retry_call(_call)
-    duration_ms = int((time.time() - start) * 1000)
+        # If it's a tool call, return the message object directly
+        msg = response.choices[0].message
+        if hasattr(msg, "tool_calls") and msg.tool_calls:
+            return msg
 
-    # If it's a tool call, return the message object directly
-    msg = response.choices[0].message
-    if hasattr(msg, "tool_calls") and msg.tool_calls:
-        return msg
+        result = msg.content or ""
 
-    result = msg.content or ""
+        # Track tokens
+        _track_usage(response)
 
-    # Track tokens
-    if hasattr(response, "usage") and response.usage:
-        _token_usage["prompt"] += response.usage.prompt_tokens or 0
-        _token_usage["completion"] += response.usage.completion_tokens or 0
-        _token_usage["total"] += response.usage.total_tokens or 0
-    _token_usage["calls"] += 1
+        logger.llm_call(model, tokens=_token_usage["total"], duration_ms=duration_ms)
 
-    logger.llm_call(model, tokens=_token_usage["total"], duration_ms=duration_ms)
+        # Cache store (only low-temperature responses & no tools)
+        if cacheable:
+            cache_service.put(messages, model, max_tokens, temperature, result)
 
-    # Cache store (only low-temperature responses & no tools)
-    if use_cache and temperature <= 0.3 and not tools:
-        cache_service.put(messages, model, max_tokens, temperature, result)
+        return result
 
-    return result
+    # Identical concurrent requests wait on one upstream call (single-flight)
+    if cacheable:
+        key = cache_service._make_key(messages, model, max_tokens, temperature)
+        return request_coalescer.do(key, _fetch)
+    return _fetch()
 
 
-def stream_completion(
+def stream_events(
     messages: list[dict],
     model: str = None,
     max_tokens: int = 4096,
     temperature: float = 0.7,
+    tools: list = None,
+    tool_choice: str = "auto",
 ):
-    """Gets streaming response from LLM (generator)."""
+    """
+    Streams a completion as events, straight from the provider:
+      {"type": "chunk", "text"}                         answer text delta
+      {"type": "tool_call_delta", "index", "id", "name", "arguments"}
+                                                        tool call fragment (id/name on the first one)
+      {"type": "done", "content", "tool_calls", "finish_reason", "ttft_s"}
+                                                        assembled message, tool_calls in request format
+    """
     model = model or config.DEFAULT_MODEL
     _token_usage["calls"] += 1
 
+    provider = _resolve(model)[0]
+    reserve = rate_limiter.estimate_tokens(messages, max_tokens)
+
     def _call():
         client = get_client(model)
+        kwargs = _completion_kwargs(
+            model, messages, max_tokens, temperature, tools, tool_choice
+        )
+        # The slot stays held until the stream is drained (see finally below)
+        lease = rate_limiter.acquire(provider, reserve)
+        try:
+            return client.chat.completions.create(stream=True, **kwargs), lease
+        except Exception as e:
+            rate_limiter.release(lease, e)
+            raise
 
-        actual_model = model
-        if actual_model.startswith("ollama/"):
-            actual_model = actual_model.replace("ollama/", "")
+    start = time.monotonic()
+    stream, lease = _retry_call(_call)
 
-        return client.chat.completions.create(
-            model=actual_model,
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            stream=True,
+    content, calls = [], {}
+    finish_reason, ttft = None, None
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            finish_reason = choice.finish_reason or finish_reason
+            delta = choice.delta
+            if ttft is None and (delta.content or delta.tool_calls):
+                ttft = time.monotonic() - start
+                _record_ttft(ttft)
+            if delta.content:
+                content.append(delta.content)
+                yield {"type": "chunk", "text": delta.content}
+            for tc in delta.tool_calls or []:
+                call = calls.setdefault(
+                    tc.index, {"id": None, "type": "function", "function": {"name": "", "arguments": ""}}
+                )
+                name = tc.function.name if tc.function else None
+                arguments = (tc.function.arguments if tc.function else None) or ""
+                call["id"] = tc.id or call["id"]
+                call["function"]["name"] += name or ""
+                call["function"]["arguments"] += arguments
+                yield {
+                    "type": "tool_call_delta",
+                    "index": tc.index,
+                    "id": tc.id,
+                    "name": name,
+                    "arguments": arguments,
+                }
+    finally:
+        # A consumer that stops early (e.g. the pipelined swarm) must not leak the connection
+        stream.close()
+        rate_limiter.release(lease)
+
+    logger.llm_call(model, duration_ms=int((time.monotonic() - start) * 1000))
+    yield {
+        "type": "done",
+        "content": "".join(content),
+        "tool_calls": [calls[i] for i in sorted(calls)],
+        "finish_reason": finish_reason,
+        "ttft_s": ttft,
+    }
+
+
+def stream_completion(
+    messages: list[dict],
+    model: str = None,
+    max_tokens: int = 4096,
+    temperature: float = 0.7,
+):
+    """Gets streaming response from LLM (generator of text deltas)."""
+    events = stream_events(messages, model, max_tokens, temperature)
+    try:
+        for event in events:
+            if event["type"] == "chunk":
+                yield event["text"]
+    finally:
+        events.close()
+
+
+# ── Async Functions ──
+
+
+async def achat_completion(
+    messages: list[dict],
+    model: str = None,
+    max_tokens: int = 4096,
+    temperature: float = 0.7,
+    use_cache: bool = True,
+    tools: list = None,
+    tool_choice: str = "auto",
+    provider: str = None,
+    timeout: float = None,
+):
+    """
+    Native async version of chat_completion (same cache, retry and token tracking).
+    `provider` forces a backend ("openrouter", "ollama", "gemini"); by default
+    it is derived from the model id. `timeout` overrides the client's per-request
+    timeout (seconds).
+    """
+    model = model or config.DEFAULT_MODEL
+
+    cacheable = use_cache and temperature <= 0.3 and not tools
+    if cacheable:
+        cached = cache_service.get(messages, model, max_tokens, temperature)
+        if cached is not None:
+            _token_usage["cached"] += 1
+            logger.llm_call(model, cached=True)
+            return cached
+
+    provider_name = _resolve(model, provider)[0]
+    reserve = rate_limiter.estimate_tokens(messages, max_tokens)
+
+    async def _fetch():
+        start = time.time()
+
+        async def _call():
+            client = get_async_client(model, provider)
+            kwargs = _completion_kwargs(
+                model, messages, max_tokens, temperature, tools, tool_choice, provider
+            )
+            if timeout is not None:
+                kwargs["timeout"] = timeout
+            async with rate_limiter.alimit(provider_name, reserve) as lease:
+                response = await client.chat.completions.create(**kwargs)
+                lease.settle(_usage_total(response))
+                return response
+
+        response = await _aretry_call(_call)
+        duration_ms = int((time.time() - start) * 1000)
+
+        msg = response.choices[0].message
+        if hasattr(msg, "tool_calls") and msg.tool_calls:
+            return msg
+
+        result = msg.content or ""
+        _track_usage(response)
+        logger.llm_call(model, tokens=_token_usage["total"], duration_ms=duration_ms)
+
+        if cacheable:
+            cache_service.put(messages, model, max_tokens, temperature, result)
+
+        return result
+
+    if cacheable:
+        key = cache_service._make_key(messages, model, max_tokens, temperature)
+        return await request_coalescer.ado(key, _fetch)
+    return await _fetch()
+
+
+async def astream_completion(
+    messages: list[dict],
+    model: str = None,
+    max_tokens: int = 4096,
+    temperature: float = 0.7,
+    provider: str = None,
+):
+    """Gets streaming response from LLM (async generator)."""
+    model = model or config.DEFAULT_MODEL
+    _token_usage["calls"] += 1
+
+    provider_name = _resolve(model, provider)[0]
+    reserve = rate_limiter.estimate_tokens(messages, max_tokens)
+
+    async def _call():
+        client = get_async_client(model, provider)
+        kwargs = _completion_kwargs(
+            model, messages, max_tokens, temperature, provider=provider
         )
+        lease = await rate_limiter.aacquire(provider_name, reserve)
+        try:
+            return await client.chat.completions.create(stream=True, **kwargs), lease
+        except Exception as e:
+            rate_limiter.release(lease, e)
+            raise
 
-    stream = _retry_call(_call)
+    stream, lease = await _aretry_call(_call)
 
-    for chunk in stream:
-        if chunk.choices[0].delta.content:
-            yield chunk.choices[0].delta.content
+    try:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        rate_limiter.release(lease)
 
 
 # ── Embedding Functions ──
@@ -199,7 +476,8 @@ def get_embedding(text: str) -> list[float]:
 
     def _call():
         client = get_client()
-        return client.embeddings.create(model=config.EMBEDDING_MODEL, input=text)
+        with rate_limiter.limit("openrouter", len(text) // 4):
+            return client.embeddings.create(model=config.EMBEDDING_MODEL, input=text)
 
     response = _retry_call(_call)
     return response.data[0].embedding
@@ -225,28 +503,33 @@ async def lightrag_llm_func(
     model = kwargs.get("model", config.DEFAULT_MODEL)
     max_tokens = kwargs.get("max_tokens", 4096)
 
-    return chat_completion(
+    return await achat_completion(
         messages=messages,
         model=model,
         max_tokens=max_tokens,
         temperature=0.1,
         use_cache=True,
+        timeout=config.LIGHTRAG_LLM_TIMEOUT,
     )
 
 
 async def lightrag_embedding_func(texts: list[str], **kwargs) -> np.ndarray:
-    """Async embedding wrapper for LightRAG."""
+    """Async embedding wrapper for LightRAG (batches are sent concurrently)."""
+    client = get_async_client()
 
-    def _call():
-        client = get_client()
-        return client.embeddings.create(model=config.EMBEDDING_MODEL, input=batch)
+    async def _embed(batch):
+        async def _call():
+            reserve = sum(len(t) for t in batch) // 4
+            async with rate_limiter.alimit("openrouter", reserve):
+                return await client.embeddings.create(
+                    model=config.EMBEDDING_MODEL, input=batch
+                )
+
+        response = await _aretry_call(_call)
+        return [item.embedding for item in response.data]
 
-    embeddings = []
     batch_size = 20
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i : i + batch_size]
-        response = _retry_call(_call)
-        for item in response.data:
-            embeddings.append(item.embedding)
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+    results = await asyncio.gather(*(_embed(b) for b in batches))
 
-    return np.array(embeddings)
+    return np.array([emb for batch in results for emb in batch])
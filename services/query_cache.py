@@ -0,0 +1,158 @@
+"""
+LunarTech AI — RAG Query Cache
+Memory + SQLite cache of LightRAG query results keyed by (question, mode, graph version,
+LLM and embedding model). Every document insert bumps the graph version, so stale
+answers are never served. Empty results and LightRAG's no-context replies are not cached.
+"""
+
+import hashlib
+import os
+import sys
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+from services.cache_service import CACHE_DIR
+
+QUERY_CACHE_DB = os.path.join(CACHE_DIR, "rag_query_cache.db")
+MAX_MEMORY = 200
+QUERY_TTL = config.QUERY_CACHE_TTL
+
+# LightRAG's fail_response ends with this tag when no context was found
+_FAILURE_MARKERS = ("[no-context]",)
+
+_memory_cache = OrderedDict()
+_db = None
+_lock = threading.Lock()
+_stats = {}  # mode -> {"hits_memory", "hits_disk", "misses"}
+
+
+def _get_db() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        conn = sqlite3.connect(
+            QUERY_CACHE_DB, check_same_thread=False, isolation_level=None
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS queries (
+                key TEXT PRIMARY KEY,
+                mode TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                value TEXT NOT NULL,
+                ts REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_queries_version ON queries(version);
+            """
+        )
+        _db = conn
+    return _db
+
+
+def _make_key(question: str, mode: str, version: int) -> str:
+    # The answer LLM and keyword extraction use DEFAULT_MODEL; retrieval uses the embedder
+    payload = (
+        f"{version}\x1f{mode}\x1f{config.DEFAULT_MODEL}\x1f{config.EMBEDDING_MODEL}"
+        f"\x1f{question.strip()}"
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _cacheable(value: str) -> bool:
+    text = (value or "").strip()
+    return bool(text) and not any(marker in text for marker in _FAILURE_MARKERS)
+
+
+def _record(mode: str, field: str):
+    entry = _stats.setdefault(mode, {"hits_memory": 0, "hits_disk": 0, "misses": 0})
+    entry[field] += 1
+
+
+def get(question: str, mode: str, version: int) -> str | None:
+    """Returns the cached result for this graph version, or None."""
+    key = _make_key(question, mode, version)
+    now = time.time()
+    with _lock:
+        entry = _memory_cache.get(key)
+        if entry is not None and now - entry["ts"] < QUERY_TTL:
+            _memory_cache.move_to_end(key)
+            _record(mode, "hits_memory")
+            return entry["value"]
+
+        try:
+            row = (
+                _get_db()
+                .execute(
+                    "SELECT value, ts FROM queries WHERE key = ? AND ts > ?",
+                    (key, now - QUERY_TTL),
+                )
+                .fetchone()
+            )
+        except Exception:
+            row = None
+        if row is not None:
+            _memory_cache[key] = {"value": row[0], "ts": row[1]}
+            _trim_memory()
+            _record(mode, "hits_disk")
+            return row[0]
+
+        _record(mode, "misses")
+        return None
+
+
+def put(question: str, mode: str, version: int, value: str):
+    """Stores a result unless it is empty or a LightRAG no-context reply."""
+    if not _cacheable(value):
+        return
+    key = _make_key(question, mode, version)
+    ts = time.time()
+    with _lock:
+        _memory_cache[key] = {"value": value, "ts": ts}
+        _trim_memory()
+        try:
+            _get_db().execute(
+                "INSERT OR REPLACE INTO queries (key, mode, version, value, ts) VALUES (?, ?, ?, ?, ?)",
+                (key, mode, version, value, ts),
+            )
+        except Exception:
+            pass
+
+
+def _trim_memory():
+    while len(_memory_cache) > MAX_MEMORY:
+        _memory_cache.popitem(last=False)
+
+
+def invalidate_before(version: int):
+    """Drops results computed against older graph versions."""
+    with _lock:
+        _memory_cache.clear()
+        try:
+            _get_db().execute("DELETE FROM queries WHERE version < ?", (version,))
+        except Exception:
+            pass
+
+
+def clear():
+    with _lock:
+        _memory_cache.clear()
+        try:
+            _get_db().execute("DELETE FROM queries")
+        except Exception:
+            pass
+
+
+def stats() -> dict:
+    """Per-mode hit rates plus overall counts."""
+    with _lock:
+        per_mode = {}
+        for mode, entry in _stats.items():
+            hits = entry["hits_memory"] + entry["hits_disk"]
+            total = hits + entry["misses"]
+            per_mode[mode] = dict(entry, hit_rate=hits / total if total else 0.0)
+        return {"memory_items": len(_memory_cache), "modes": per_mode}
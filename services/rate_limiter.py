@@ -0,0 +1,244 @@
+"""
+LunarTech AI — Rate Limiter
+Per-provider token buckets (RPM + TPM), concurrency caps and 429 Retry-After handling.
+Shared by the sync and async paths of llm_service.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+from contextlib import contextmanager, asynccontextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+from utils import logger
+
+POLL_INTERVAL = 0.05  # seconds between slot checks while queued
+
+
+class _Bucket:
+    """Classic token bucket: `capacity` tokens, refilled at `rate` tokens/second."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+    def give(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class _Provider:
+    def __init__(self, name: str, rpm: int, tpm: int, concurrency: int):
+        self.name = name
+        self.rpm = _Bucket(rpm) if rpm > 0 else None
+        self.tpm = _Bucket(tpm) if tpm > 0 else None
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.stats = {
+            "requests": 0,
+            "queued": 0,
+            "wait_ms_total": 0,
+            "wait_ms_max": 0,
+            "rate_limited_429": 0,
+        }
+
+    def try_acquire(self, tokens: int) -> float:
+        """Takes a slot and returns 0, or returns how long to wait before retrying."""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.concurrency > 0 and self.in_flight >= self.concurrency:
+            return POLL_INTERVAL
+        wait = 0.0
+        if self.rpm:
+            wait = max(wait, self.rpm.delay(1, now))
+        if self.tpm:
+            wait = max(wait, self.tpm.delay(tokens, now))
+        if wait > 0:
+            return wait
+        if self.rpm:
+            self.rpm.take(1)
+        if self.tpm:
+            self.tpm.take(tokens)
+        self.in_flight += 1
+        return 0.0
+
+
+_lock = threading.Lock()
+_providers = {}
+
+
+def _get_provider(name: str) -> _Provider:
+    provider = _providers.get(name)
+    if provider is None:
+        limits = config.RATE_LIMITS.get(name, {})
+        provider = _Provider(
+            name,
+            rpm=limits.get("rpm", 0),
+            tpm=limits.get("tpm", 0),
+            concurrency=limits.get("concurrency", 0),
+        )
+        _providers[name] = provider
+    return provider
+
+
+def concurrency(provider: str) -> int:
+    """Configured parallel-request cap of a provider (0 = unlimited)."""
+    return config.RATE_LIMITS.get(provider, {}).get("concurrency", 0)
+
+
+def estimate_tokens(messages: list, max_tokens: int = 0) -> int:
+    """Rough token reservation for a request (≈4 chars/token + completion budget)."""
+    chars = sum(len(str(m.get("content") or "")) for m in messages or [])
+    return chars // 4 + (max_tokens or 0)
+
+
+class Lease:
+    """Handle for one admitted request; settle() refunds unused TPM reservation."""
+
+    def __init__(self, provider: _Provider, tokens: int, wait_ms: int):
+        self.provider = provider
+        self.tokens = tokens
+        self.wait_ms = wait_ms
+
+    def settle(self, actual_tokens: int):
+        if not actual_tokens or not self.provider.tpm:
+            return
+        with _lock:
+            diff = self.tokens - actual_tokens
+            if diff > 0:
+                self.provider.tpm.give(diff)
+            else:
+                self.provider.tpm.take(-diff)
+        self.tokens = actual_tokens
+
+
+def _try(name: str, tokens: int) -> float:
+    with _lock:
+        return _get_provider(name).try_acquire(tokens)
+
+
+def _admitted(name: str, tokens: int, started: float) -> Lease:
+    wait_ms = int((time.monotonic() - started) * 1000)
+    with _lock:
+        provider = _get_provider(name)
+        provider.stats["requests"] += 1
+        if wait_ms > 0:
+            provider.stats["queued"] += 1
+            provider.stats["wait_ms_total"] += wait_ms
+            provider.stats["wait_ms_max"] = max(provider.stats["wait_ms_max"], wait_ms)
+    if wait_ms >= 1000:
+        logger.info("LLM rate limiter wait", provider=name, wait_ms=wait_ms)
+    return Lease(provider, tokens, wait_ms)
+
+
+def _retry_after(e: Exception) -> float | None:
+    """Extracts the Retry-After delay (seconds) from a 429 error, if any."""
+    if getattr(e, "status_code", None) != 429:
+        return None
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else config.RATE_LIMIT_DEFAULT_BACKOFF
+    except (TypeError, ValueError):
+        return config.RATE_LIMIT_DEFAULT_BACKOFF
+
+
+def acquire(provider: str, tokens: int = 0) -> Lease:
+    """Blocks the calling thread until the provider admits the request."""
+    started = time.monotonic()
+    while True:
+        wait = _try(provider, tokens)
+        if wait <= 0:
+            return _admitted(provider, tokens, started)
+        time.sleep(min(wait, 1.0))
+
+
+async def aacquire(provider: str, tokens: int = 0) -> Lease:
+    """Async variant of acquire(): queued callers yield to the event loop."""
+    started = time.monotonic()
+    while True:
+        wait = _try(provider, tokens)
+        if wait <= 0:
+            return _admitted(provider, tokens, started)
+        await asyncio.sleep(min(wait, 1.0))
+
+
+def release(lease: Lease, error: Exception = None):
+    """Frees the concurrency slot; a 429 error pauses the provider for Retry-After."""
+    delay = _retry_after(error) if error is not None else None
+    with _lock:
+        provider = lease.provider
+        provider.in_flight = max(0, provider.in_flight - 1)
+        if delay is not None:
+            provider.stats["rate_limited_429"] += 1
+            provider.blocked_until = max(
+                provider.blocked_until, time.monotonic() + delay
+            )
+    if delay is not None:
+        logger.warning(
+            "LLM 429 received, pausing provider", provider=provider.name, seconds=delay
+        )
+
+
+@contextmanager
+def limit(provider: str, tokens: int = 0):
+    """`with limit("gemini", n) as lease:` — acquire/release around one request."""
+    lease = acquire(provider, tokens)
+    error = None
+    try:
+        yield lease
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        release(lease, error)
+
+
+@asynccontextmanager
+async def alimit(provider: str, tokens: int = 0):
+    """Async variant of limit()."""
+    lease = await aacquire(provider, tokens)
+    error = None
+    try:
+        yield lease
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        release(lease, error)
+
+
+def stats() -> dict:
+    """Per-provider queue/throttle statistics."""
+    with _lock:
+        result = {}
+        for name, provider in _providers.items():
+            entry = dict(provider.stats)
+            entry["in_flight"] = provider.in_flight
+            entry["wait_ms_avg"] = (
+                entry["wait_ms_total"] // entry["queued"] if entry["queued"] else 0
+            )
+            result[name] = entry
+        return result
@@ -0,0 +1,99 @@
+"""
+LunarTech AI — Request Coalescer
+Single-flight deduplication: concurrent identical LLM calls share one upstream request.
+"""
+
+import asyncio
+import threading
+
+# ── Sync (thread) in-flight calls ──
+_lock = threading.Lock()
+_inflight = {}  # key -> _Call
+
+# ── Async in-flight calls (per event loop) ──
+_async_inflight = {}  # (loop id, key) -> asyncio.Future
+
+_stats = {"leaders": 0, "coalesced": 0}
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def do(key: str, fn):
+    """
+    Runs fn() once per key among concurrent callers.
+    The first caller (leader) executes it; the others block and receive its result
+    (or its exception).
+    """
+    with _lock:
+        call = _inflight.get(key)
+        if call is not None:
+            _stats["coalesced"] += 1
+            leader = False
+        else:
+            call = _Call()
+            _inflight[key] = call
+            _stats["leaders"] += 1
+            leader = True
+
+    if not leader:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = fn()
+        return call.result
+    except BaseException as e:  # incl. Streamlit's StopException/RerunException
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+        call.done.set()
+
+
+async def ado(key: str, fn):
+    """Async variant of do(): fn is a coroutine function, awaited once per key."""
+    loop = asyncio.get_running_loop()
+    full_key = (id(loop), key)
+
+    with _lock:
+        future = _async_inflight.get(full_key)
+        if future is not None:
+            _stats["coalesced"] += 1
+            leader = False
+        else:
+            future = loop.create_future()
+            _async_inflight[full_key] = future
+            _stats["leaders"] += 1
+            leader = True
+
+    if not leader:
+        # shield: a cancelled follower must not cancel the shared call
+        return await asyncio.shield(future)
+
+    try:
+        result = await fn()
+        future.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved when nobody else was waiting
+        raise
+    finally:
+        with _lock:
+            _async_inflight.pop(full_key, None)
+
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats, in_flight=len(_inflight) + len(_async_inflight))
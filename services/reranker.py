@@ -0,0 +1,200 @@
+"""
+LunarTech AI — Reranker
+Optional cross-encoder rerank of retrieved context. A small CPU model scores
+(question, passage) pairs in batches; the best-scoring entities, relations and
+chunks are kept within config.RERANK_TOKENS before the chat prompt is built.
+Scoring stops at config.RERANK_MAX_MS; unscored items keep their retrieval order.
+"""
+
+import hashlib
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict, deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+from utils import logger
+
+MAX_TURNS = 50
+
+_model = None
+_model_thread = None
+_model_error = None
+_model_lock = threading.Lock()
+
+_cache = OrderedDict()  # sha1(question, passage) -> score
+_cache_lock = threading.Lock()
+
+_turns = deque(maxlen=MAX_TURNS)
+_counters = {"turns": 0, "skipped": 0, "capped": 0, "cache_hits": 0, "scored": 0}
+_counters_lock = threading.Lock()  # rerank() runs on concurrent chat and query_many threads
+
+
+def enabled() -> bool:
+    return config.RERANK_ENABLED
+
+
+# ── Model ─────────────────────────────────────────────────
+
+
+def _load():
+    global _model, _model_error
+    try:
+        from sentence_transformers import CrossEncoder
+
+        started = time.monotonic()
+        model = CrossEncoder(config.RERANK_MODEL, device="cpu")
+        model.predict([("warm up", "warm up")], show_progress_bar=False)
+        _model = model
+        logger.info(
+            "Reranker loaded",
+            model=config.RERANK_MODEL,
+            seconds=round(time.monotonic() - started, 2),
+        )
+    except Exception as e:
+        _model_error = str(e)
+        logger.warning("Reranker unavailable", model=config.RERANK_MODEL, error=str(e))
+
+
+def get_model():
+    """
+    Returns the cross-encoder, or None while it is still loading. The first
+    call starts a background load so no chat turn waits on the download.
+    """
+    global _model_thread
+    if _model is None and _model_thread is None:
+        with _model_lock:
+            if _model_thread is None:
+                _model_thread = threading.Thread(target=_load, name="reranker-load", daemon=True)
+                _model_thread.start()
+    return _model
+
+
+# ── Scoring ───────────────────────────────────────────────
+
+
+def _key(question: str, passage: str) -> str:
+    return hashlib.sha1(f"{question}\x00{passage}".encode("utf-8")).hexdigest()
+
+
+def _score(model, question: str, passages: list[str]) -> tuple[list, int, bool]:
+    """
+    Scores passages in retrieval order, cached pairs first, new pairs in
+    batches until the time cap. Returns (scores with None for unscored, cache hits, capped).
+    """
+    scores = [None] * len(passages)
+    keys = [_key(question, p) for p in passages]
+    with _cache_lock:
+        for i, key in enumerate(keys):
+            if key in _cache:
+                _cache.move_to_end(key)
+                scores[i] = _cache[key]
+    hits = sum(s is not None for s in scores)
+
+    todo = [i for i, s in enumerate(scores) if s is None]
+    deadline = time.monotonic() + config.RERANK_MAX_MS / 1000
+    capped = False
+    for start in range(0, len(todo), config.RERANK_BATCH_SIZE):
+        if time.monotonic() > deadline:
+            capped = True
+            break
+        batch = todo[start : start + config.RERANK_BATCH_SIZE]
+        predicted = model.predict(
+            [(question, passages[i]) for i in batch],
+            batch_size=config.RERANK_BATCH_SIZE,
+            show_progress_bar=False,
+        )
+        with _cache_lock:
+            for i, score in zip(batch, predicted):
+                scores[i] = float(score)
+                _cache[keys[i]] = scores[i]
+            while len(_cache) > config.RERANK_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return scores, hits, capped
+
+
+def rerank(question: str, result, token_budget: int = None):
+    """
+    Reorders a lightrag_service.RetrievalResult by cross-encoder score and
+    trims it to token_budget (default config.RERANK_TOKENS). Returns the
+    result unchanged while the model loads or if it failed to load.
+    """
+    from services.lightrag_service import ITEM_TEXT
+    from utils import tokens
+
+    token_budget = token_budget or config.RERANK_TOKENS
+    model = get_model()
+    if model is None or result.raw_context:
+        with _counters_lock:
+            _counters["skipped"] += 1
+        return result
+
+    started = time.monotonic()
+    items = [
+        (attr, item, render(item))
+        for attr, render in ITEM_TEXT.items()
+        for item in getattr(result, attr)
+    ]
+    if not items:
+        return result
+    scores, hits, capped = _score(model, question, [text for _, _, text in items])
+
+    # Scored items best-first, then the unscored tail in retrieval order
+    order = sorted(
+        range(len(items)),
+        key=lambda i: (scores[i] is None, -(scores[i] or 0.0), i),
+    )
+    costs = tokens.count_many([text for _, _, text in items])
+    kept = {attr: [] for attr in ITEM_TEXT}
+    remaining = token_budget
+    for i in order:
+        if costs[i] <= remaining:
+            kept[items[i][0]].append(items[i][1])
+            remaining -= costs[i]
+    for attr, values in kept.items():
+        setattr(result, attr, values)
+
+    tokens_in = sum(costs)
+    result.tokens = token_budget - remaining
+    turn = {
+        "candidates": len(items),
+        "kept": sum(len(v) for v in kept.values()),
+        "tokens_in": tokens_in,
+        "tokens_out": result.tokens,
+        "saved": tokens_in - result.tokens,
+        "ms": round((time.monotonic() - started) * 1000, 1),
+        "cache_hits": hits,
+        "capped": capped,
+    }
+    with _counters_lock:
+        _turns.append(turn)
+        _counters["turns"] += 1
+        _counters["capped"] += capped
+        _counters["cache_hits"] += hits
+        _counters["scored"] += len(items)
+    return result
+
+
+def stats() -> dict:
+    with _counters_lock:
+        turns = list(_turns)
+        counters = dict(_counters)
+    n = len(turns)
+    tokens_in = sum(t["tokens_in"] for t in turns)
+    saved = sum(t["saved"] for t in turns)
+    return {
+        "loaded": _model is not None,
+        "error": _model_error,
+        "turns": counters["turns"],
+        "skipped": counters["skipped"],
+        "capped": counters["capped"],
+        "cache_hit_rate": counters["cache_hits"] / counters["scored"] if counters["scored"] else 0.0,
+        "cache_items": len(_cache),
+        # Averages over the last MAX_TURNS turns
+        "avg_saved_tokens": saved / n if n else 0.0,
+        "saved_pct": saved / tokens_in if tokens_in else 0.0,
+        "avg_ms": sum(t["ms"] for t in turns) / n if n else 0.0,
+        "last": turns[-1] if turns else None,
+    }
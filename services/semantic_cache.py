@@ -0,0 +1,168 @@
+"""
+LunarTech AI — Semantic Cache
+Optional near-duplicate answer cache: questions are embedded with the local
+SentenceTransformer and matched by cosine similarity within a scope
+(model + document set + RAG mode).
+"""
+
+import os
+import sys
+import time
+import uuid
+import hashlib
+import threading
+from collections import deque
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+from utils import logger
+
+MAX_ENTRIES_PER_SCOPE = 500
+CACHE_TTL = 3600  # same lifetime as cache_service
+
+_lock = threading.Lock()
+_scopes = {}  # scope -> {"vecs": np.ndarray (n, d), "entries": list[dict]}
+_entry_scope = {}  # entry id -> scope
+_hit_similarities = deque(maxlen=200)
+_stats = {"lookups": 0, "hits": 0, "misses": 0, "false_hits": 0, "stores": 0}
+
+
+def enabled() -> bool:
+    return config.SEMANTIC_CACHE_ENABLED
+
+
+def make_scope(
+    model: str, doc_scope: str = "", rag_mode: str = "", custom_prompt: str = ""
+) -> str:
+    """Entries only match within the same model, document set, RAG mode and custom prompt."""
+    payload = "\x1f".join([model or "", doc_scope or "", rag_mode or "", custom_prompt or ""])
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+def _embed(text: str) -> np.ndarray:
+    from services import lightrag_service
+
+    return lightrag_service.embed_texts([text])[0]
+
+
+def lookup(question: str, scope: str) -> dict | None:
+    """
+    Returns {"id", "answer", "question", "similarity"} for the closest cached
+    question above the threshold, or None.
+    """
+    with _lock:
+        bucket = _scopes.get(scope)
+        _stats["lookups"] += 1
+        if not bucket or not bucket["entries"]:
+            _stats["misses"] += 1
+            return None
+
+    try:
+        query_vec = _embed(question)
+    except Exception as e:
+        logger.warning("Semantic cache embedding failed", error=str(e))
+        return None
+
+    now = time.time()
+    with _lock:
+        bucket = _scopes.get(scope)
+        if not bucket or not bucket["entries"]:
+            _stats["misses"] += 1
+            return None
+        # Vectors are L2-normalised, so one mat-vec product gives all cosines
+        sims = bucket["vecs"] @ query_vec
+        alive = np.array([now - e["ts"] < CACHE_TTL for e in bucket["entries"]])
+        sims = np.where(alive, sims, -1.0)
+        best = int(np.argmax(sims))
+        similarity = float(sims[best])
+
+        if similarity < config.SEMANTIC_CACHE_THRESHOLD:
+            _stats["misses"] += 1
+            return None
+
+        entry = bucket["entries"][best]
+        _stats["hits"] += 1
+        _hit_similarities.append(similarity)
+
+    logger.info("Semantic cache hit", similarity=f"{similarity:.3f}")
+    return {
+        "id": entry["id"],
+        "answer": entry["answer"],
+        "question": entry["question"],
+        "similarity": similarity,
+    }
+
+
+def store(question: str, scope: str, answer: str) -> str | None:
+    """Adds an answer under the question's embedding. Returns the entry id."""
+    if not answer:
+        return None
+    try:
+        vec = _embed(question)
+    except Exception as e:
+        logger.warning("Semantic cache embedding failed", error=str(e))
+        return None
+
+    entry = {
+        "id": uuid.uuid4().hex,
+        "question": question,
+        "answer": answer,
+        "ts": time.time(),
+    }
+    with _lock:
+        bucket = _scopes.setdefault(
+            scope, {"vecs": np.empty((0, vec.shape[0]), dtype="float32"), "entries": []}
+        )
+        bucket["vecs"] = np.vstack([bucket["vecs"], vec[None, :]])
+        bucket["entries"].append(entry)
+        _entry_scope[entry["id"]] = scope
+
+        overflow = len(bucket["entries"]) - MAX_ENTRIES_PER_SCOPE
+        if overflow > 0:
+            for old in bucket["entries"][:overflow]:
+                _entry_scope.pop(old["id"], None)
+            bucket["entries"] = bucket["entries"][overflow:]
+            bucket["vecs"] = bucket["vecs"][overflow:]
+        _stats["stores"] += 1
+    return entry["id"]
+
+
+def report_false_hit(entry_id: str):
+    """Marks a served answer as wrong for the question and drops it from the cache."""
+    with _lock:
+        _stats["false_hits"] += 1
+        scope = _entry_scope.pop(entry_id, None)
+        bucket = _scopes.get(scope)
+        if not bucket:
+            return
+        for i, entry in enumerate(bucket["entries"]):
+            if entry["id"] == entry_id:
+                del bucket["entries"][i]
+                bucket["vecs"] = np.delete(bucket["vecs"], i, axis=0)
+                break
+    logger.info("Semantic cache false hit reported", entry=entry_id)
+
+
+def clear():
+    with _lock:
+        _scopes.clear()
+        _entry_scope.clear()
+
+
+def stats() -> dict:
+    with _lock:
+        hits = _stats["hits"]
+        result = dict(_stats)
+        result["entries"] = sum(len(b["entries"]) for b in _scopes.values())
+        result["threshold"] = config.SEMANTIC_CACHE_THRESHOLD
+        result["hit_rate"] = hits / _stats["lookups"] if _stats["lookups"] else 0.0
+        result["false_hit_rate"] = _stats["false_hits"] / hits if hits else 0.0
+        result["avg_hit_similarity"] = (
+            float(np.mean(_hit_similarities)) if _hit_similarities else 0.0
+        )
+        result["min_hit_similarity"] = (
+            float(np.min(_hit_similarities)) if _hit_similarities else 0.0
+        )
+        return result
@@ -0,0 +1,153 @@
+"""
+LunarTech AI — Warm-up
+Opt-in background warm-up at process start: loads the embedding model and
+builds the LightRAG instance (storages, PG connection) before the first
+chat or upload needs them. Also records cold vs. warm first-query latency.
+"""
+
+import json
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+from utils import logger
+
+STAGES = ("embedding", "rag")
+STAGE_LABELS = {"embedding": "Embedding model", "rag": "Knowledge graph storage"}
+HISTORY_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "logs", "first_query.json"
+)
+MAX_HISTORY = 50
+
+_lock = threading.Lock()
+_thread = None
+_state = {
+    "status": "cold",  # cold | warming | ready | failed
+    "started_at": None,
+    "seconds": None,
+    "stages": {s: {"status": "pending", "seconds": None, "error": None} for s in STAGES},
+}
+_first_query = None  # {"latency_s", "warm"} for this process
+
+
+def enabled() -> bool:
+    return config.WARMUP_ON_START
+
+
+def start():
+    """Starts the warm-up thread once per process (safe to call on every rerun)."""
+    global _thread
+    with _lock:
+        if _thread is not None:
+            return
+        _state["status"] = "warming"
+        _state["started_at"] = time.time()
+        _thread = threading.Thread(target=_run, name="warmup", daemon=True)
+        _thread.start()
+
+
+def _run():
+    from services import lightrag_service, reranker
+
+    if reranker.enabled():
+        reranker.get_model()  # loads in its own thread alongside the stages
+
+    steps = {
+        # Model load + one batched encode through the shared batcher
+        "embedding": lambda: lightrag_service.embed_texts(["warm up"]),
+        "rag": lambda: lightrag_service._ensure_initialized(lightrag_service.get_rag()),
+    }
+    started = time.monotonic()
+    failed = False
+    for stage in STAGES:
+        entry = _state["stages"][stage]
+        entry["status"] = "running"
+        t0 = time.monotonic()
+        try:
+            steps[stage]()
+            entry["status"] = "ready"
+        except Exception as e:
+            entry["status"] = "failed"
+            entry["error"] = str(e)
+            failed = True
+            logger.warning("Warm-up stage failed", stage=stage, error=str(e))
+        entry["seconds"] = round(time.monotonic() - t0, 2)
+
+    _state["seconds"] = round(time.monotonic() - started, 2)
+    _state["status"] = "failed" if failed else "ready"
+    logger.info("Warm-up finished", status=_state["status"], seconds=_state["seconds"])
+
+
+def status() -> dict:
+    with _lock:
+        return {
+            "status": _state["status"],
+            "seconds": _state["seconds"],
+            "stages": {s: dict(e) for s, e in _state["stages"].items()},
+        }
+
+
+def is_ready() -> bool:
+    return _state["status"] == "ready"
+
+
+# ── First-query latency ───────────────────────────────────
+
+
+def record_first_query(latency_s: float):
+    """
+    Stores this process's first RAG query latency, tagged warm or cold.
+    Called by lightrag_service for the first query that reaches LightRAG
+    (cache hits are not timed), whatever the entry point.
+    """
+    global _first_query
+    with _lock:
+        if _first_query is not None:
+            return
+        _first_query = {
+            "latency_s": round(latency_s, 3),
+            "warm": _state["status"] == "ready",
+            "ts": time.time(),
+        }
+        history = _load_history()
+        history.append(_first_query)
+        try:
+            os.makedirs(os.path.dirname(HISTORY_PATH), exist_ok=True)
+            with open(HISTORY_PATH, "w", encoding="utf-8") as f:
+                json.dump(history[-MAX_HISTORY:], f)
+        except OSError:
+            pass
+    logger.info(
+        "First RAG query",
+        latency_s=_first_query["latency_s"],
+        warm=_first_query["warm"],
+    )
+
+
+def first_query_recorded() -> bool:
+    return _first_query is not None
+
+
+def _load_history() -> list:
+    try:
+        with open(HISTORY_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return []
+
+
+def latency_report() -> dict:
+    """Average first-query latency across restarts, split by cold vs. warm start."""
+    with _lock:
+        history = _load_history()
+    report = {"current": _first_query}
+    for label, warm in (("cold", False), ("warm", True)):
+        samples = [h["latency_s"] for h in history if h["warm"] == warm]
+        report[label] = {
+            "runs": len(samples),
+            "avg_s": round(sum(samples) / len(samples), 3) if samples else None,
+        }
+    return report
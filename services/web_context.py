@@ -0,0 +1,343 @@
+"""
+LunarTech AI — Web Context
+Live web fallback for chat turns whose document context is too thin. Search
+results are fetched concurrently over one pooled HTTP client under a single
+deadline, reduced to paragraph text by a streaming parser that stops reading
+once it has enough, and cached on disk (pages and searches, each with a TTL).
+Per-URL fetch latency is kept for the dashboard.
+"""
+
+import json
+import os
+import sys
+import time
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import config
+from utils import logger
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "cache")
+CACHE_DB = os.path.join(CACHE_DIR, "web_cache.db")
+HEADER = "DYNAMIC WEB SCAN RESULTS:\n"
+MIN_PAGE_CHARS = 100  # less paragraph text than this: use the search snippet instead
+MAX_RECENT = 200
+USER_AGENT = "Mozilla/5.0 (compatible; LunarTechAI/1.0; +https://lunartech.ai)"
+
+_TABLES = {"pages": ("url", "text"), "searches": ("query", "results")}  # table -> (key, value)
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS searches (
+    query TEXT PRIMARY KEY,
+    results TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+_db = None
+_db_lock = threading.Lock()
+_client = None
+_client_lock = threading.Lock()
+_pool = ThreadPoolExecutor(max_workers=config.WEB_FETCH_WORKERS, thread_name_prefix="web")
+_in_flight = {}  # url -> Future of a fetch still running (shared by concurrent turns)
+_in_flight_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_recent = deque(maxlen=MAX_RECENT)  # per-URL fetch records
+_counters = {"turns": 0, "fetches": 0, "cache_hits": 0, "errors": 0, "late": 0, "search_hits": 0}
+
+
+# ── Storage & HTTP ────────────────────────────────────────
+
+
+def _get_db() -> sqlite3.Connection:
+    """Opens the web cache once (WAL mode) and drops expired rows."""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                conn = sqlite3.connect(CACHE_DB, check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(_SCHEMA)
+                now = time.time()
+                conn.execute("DELETE FROM pages WHERE expires_at <= ?", (now,))
+                conn.execute("DELETE FROM searches WHERE expires_at <= ?", (now,))
+                _db = conn
+    return _db
+
+
+def _cache_get(table: str, key: str):
+    key_column, value_column = _TABLES[table]
+    try:
+        db = _get_db()
+        with _db_lock:
+            row = db.execute(
+                f"SELECT {value_column} FROM {table} WHERE {key_column} = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+    except Exception:
+        return None
+
+
+def _cache_put(table: str, key: str, value: str, ttl: int):
+    key_column, value_column = _TABLES[table]
+    try:
+        db = _get_db()
+        with _db_lock:
+            db.execute(
+                f"INSERT OR REPLACE INTO {table} ({key_column}, {value_column}, expires_at) "
+                "VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+    except Exception as e:
+        logger.warning("Web cache write failed", error=str(e))
+
+
+def get_client() -> httpx.Client:
+    """Shared keep-alive HTTP client for page fetches."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(
+                    follow_redirects=True,
+                    timeout=config.WEB_FETCH_TIMEOUT,
+                    headers={"User-Agent": USER_AGENT},
+                    limits=httpx.Limits(
+                        max_connections=config.WEB_FETCH_WORKERS * 2,
+                        max_keepalive_connections=config.WEB_FETCH_WORKERS,
+                    ),
+                )
+    return _client
+
+
+# ── Extraction ────────────────────────────────────────────
+
+
+class _ParagraphText(HTMLParser):
+    """Collects the text of <p> elements (scripts and styles skipped) as HTML is fed in."""
+
+    def __init__(self):
+        super().__init__()
+        self.paragraphs = []
+        self.chars = 0
+        self._current = None
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style", "noscript"):
+            self._skip += 1
+        elif tag == "p":
+            self._flush()  # <p> closes an open paragraph
+            self._current = []
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style", "noscript"):
+            self._skip = max(0, self._skip - 1)
+        elif tag == "p":
+            self._flush()
+
+    def handle_data(self, data):
+        if self._current is not None and not self._skip:
+            self._current.append(data)
+
+    def _flush(self):
+        if self._current:
+            text = " ".join("".join(self._current).split())
+            if text:
+                self.paragraphs.append(text)
+                self.chars += len(text) + 1
+        self._current = None
+
+    def text(self) -> str:
+        self._flush()
+        return " ".join(self.paragraphs)
+
+
+def extract_text(html: str, limit: int = None) -> str:
+    """Paragraph text of an HTML document, cut to `limit` characters."""
+    parser = _ParagraphText()
+    parser.feed(html)
+    return parser.text()[:limit] if limit else parser.text()
+
+
+# ── Fetching ──────────────────────────────────────────────
+
+
+def _download(url: str, limit: int) -> tuple[str, int, int]:
+    """Streams a page into the parser until `limit` chars of text or WEB_MAX_BYTES. Returns (text, status, bytes)."""
+    parser = _ParagraphText()
+    with get_client().stream("GET", url) as response:
+        response.raise_for_status()
+        if "html" not in response.headers.get("content-type", "text/html"):
+            return "", response.status_code, 0
+        for piece in response.iter_text():
+            parser.feed(piece)
+            if parser.chars >= limit or response.num_bytes_downloaded >= config.WEB_MAX_BYTES:
+                break  # closing the stream early skips the rest of the download
+    return parser.text()[:limit], response.status_code, response.num_bytes_downloaded
+
+
+def fetch(url: str) -> str:
+    """Paragraph text of a page (up to WEB_PAGE_CHARS), from the cache when fresh."""
+    started = time.monotonic()
+    record = {
+        "url": url,
+        "host": urlparse(url).netloc,
+        "cached": False,
+        "status": None,
+        "bytes": 0,
+        "error": None,
+    }
+    text = _cache_get("pages", url)
+    try:
+        if text is not None:
+            record["cached"] = True
+        else:
+            text, record["status"], record["bytes"] = _download(url, config.WEB_PAGE_CHARS)
+            _cache_put("pages", url, text, config.WEB_PAGE_TTL)
+        return text
+    except Exception as e:
+        record["error"] = str(e)[:200]
+        raise
+    finally:
+        record["ms"] = round((time.monotonic() - started) * 1000, 1)
+        with _stats_lock:
+            _recent.append(record)
+            _counters["fetches"] += 1
+            _counters["cache_hits"] += record["cached"]
+            _counters["errors"] += record["error"] is not None
+
+
+def _submit(url: str):
+    with _in_flight_lock:
+        future = _in_flight.get(url)
+        if future is None:
+            future = _in_flight[url] = _pool.submit(fetch, url)
+            future.add_done_callback(lambda _: _in_flight.pop(url, None))
+    return future
+
+
+def fetch_many(urls: list[str], timeout: float = None) -> dict:
+    """
+    Fetches pages concurrently. Returns {url: text, or None on error or when
+    not done within `timeout` seconds}. Late fetches keep running and still
+    fill the cache for the next turn.
+    """
+    timeout = config.WEB_DEADLINE if timeout is None else timeout
+    futures = {url: _submit(url) for url in dict.fromkeys(urls)}
+    done, pending = wait(futures.values(), timeout=max(0.0, timeout))
+    with _stats_lock:
+        _counters["late"] += len(pending)
+    pages = {}
+    for url, future in futures.items():
+        pages[url] = None
+        if future in done and future.exception() is None:
+            pages[url] = future.result()
+    return pages
+
+
+def search(query: str, max_results: int = None) -> list[dict]:
+    """DuckDuckGo text search ({"title", "href", "body"} per hit), cached for WEB_SEARCH_TTL."""
+    max_results = max_results or config.WEB_MAX_RESULTS
+    key = f"{max_results}\x00{query}"
+    cached = _cache_get("searches", key)
+    if cached is not None:
+        with _stats_lock:
+            _counters["search_hits"] += 1
+        return json.loads(cached)
+
+    from duckduckgo_search import DDGS
+
+    with DDGS() as ddgs:
+        results = [
+            {"title": r.get("title", ""), "href": r.get("href", ""), "body": r.get("body", "")}
+            for r in ddgs.text(query, max_results=max_results)
+        ]
+    if results:
+        _cache_put("searches", key, json.dumps(results, ensure_ascii=False), config.WEB_SEARCH_TTL)
+    return results
+
+
+def gather(question: str, results: list[dict] = None, deadline: float = None) -> str | None:
+    """
+    Web context block for the chat prompt, or None when the search finds
+    nothing. Search and page fetches share one deadline (WEB_DEADLINE);
+    pages that miss it fall back to their search snippet. `results` skips
+    the search (e.g. hits from another source or a test stand-in).
+    """
+    deadline = config.WEB_DEADLINE if deadline is None else deadline
+    started = time.monotonic()
+    if results is None:
+        try:
+            results = _pool.submit(search, question).result(timeout=deadline)
+        except FutureTimeout:
+            logger.warning("Web search missed the deadline", deadline_s=deadline)
+            return None
+    if not results:
+        return None
+
+    remaining = deadline - (time.monotonic() - started)
+    pages = fetch_many([r["href"] for r in results], timeout=remaining)
+    with _stats_lock:
+        _counters["turns"] += 1
+
+    blocks = []
+    for r in results:
+        text = pages.get(r["href"])
+        if text is None:
+            blocks.append(f"- Source: {r['title']}\n  Info: {r.get('body', '')}")
+            continue
+        content = text if len(text) > MIN_PAGE_CHARS else r.get("body", "")
+        blocks.append(f"- Source: {r['title']} ({r['href']})\n  Content: {content}")
+    logger.info(
+        "Web context gathered",
+        results=len(results),
+        fetched=sum(v is not None for v in pages.values()),
+        ms=round((time.monotonic() - started) * 1000, 1),
+    )
+    return HEADER + "\n\n".join(blocks)
+
+
+# ── Metrics ───────────────────────────────────────────────
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def stats() -> dict:
+    with _stats_lock:
+        counters = dict(_counters)
+        recent = list(_recent)
+    network = [r["ms"] for r in recent if not r["cached"]]
+    return {
+        **counters,
+        "cache_hit_rate": counters["cache_hits"] / counters["fetches"] if counters["fetches"] else 0.0,
+        # Over the last MAX_RECENT fetches that went to the network
+        "p50_ms": _percentile(network, 0.5),
+        "p95_ms": _percentile(network, 0.95),
+    }
+
+
+def recent_fetches() -> list[dict]:
+    """Per-URL records (url, host, ms, status, bytes, cached, error) of the last MAX_RECENT fetches."""
+    with _stats_lock:
+        return list(_recent)
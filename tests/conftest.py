@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+@pytest.fixture(autouse=True)
+def _isolated_warmup(tmp_path, monkeypatch):
+    """Keeps first-query latency records from tests out of data/logs."""
+    from services import warmup
+
+    monkeypatch.setattr(warmup, "HISTORY_PATH", str(tmp_path / "first_query.json"))
+    monkeypatch.setattr(warmup, "_first_query", None)
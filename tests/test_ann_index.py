@@ -0,0 +1,173 @@
+import threading
+
+import numpy as np
+import pytest
+
+import config
+from services.ann_index import IVFIndex, _clustered
+
+DIM = 32
+N = 3000
+K = 10
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(7)
+    vectors = _clustered(N + 50, DIM, rng)
+    return vectors[:N], vectors[N:]
+
+
+@pytest.fixture
+def make_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ANN_MIN_TRAIN", 1000)
+    monkeypatch.setattr(config, "ANN_NPROBE", 8)
+    opened = []
+
+    def make(**kwargs):
+        index = IVFIndex(str(tmp_path / "vdb"), DIM, **kwargs)
+        opened.append(index)
+        return index
+
+    yield make
+    for index in opened:
+        index._db.close()
+
+
+def _brute_force(vectors, ids, query, k):
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = vectors @ (query / np.linalg.norm(query))
+    return {ids[i] for i in np.argsort(-scores)[:k]}
+
+
+def _fill(index, vectors):
+    ids = [f"v{i}" for i in range(len(vectors))]
+    metas = [{"n": i} for i in range(len(vectors))]
+    for start in range(0, len(ids), 1000):
+        end = start + 1000
+        index.upsert(ids[start:end], vectors[start:end], metas[start:end])
+    index.flush()
+    return ids
+
+
+def _recall(index, vectors, ids, queries, exclude=()):
+    hits = 0
+    for q in queries:
+        expected = _brute_force(vectors, ids, q, K)
+        got = {i for i, _ in index.search(q, K)}
+        assert not got & set(exclude)
+        hits += len(got & expected)
+    return hits / (K * len(queries))
+
+
+def test_exact_below_min_train(make_index, data):
+    vectors, queries = data
+    index = make_index()
+    ids = [f"v{i}" for i in range(500)]
+    index.upsert(ids, vectors[:500], [{}] * 500)
+    index.flush()
+    assert index.stats()["lists"] == 0
+    assert _recall(index, vectors[:500], ids, queries) == 1.0
+
+
+def test_ivf_recall_against_brute_force(make_index, data):
+    vectors, queries = data
+    index = make_index()
+    ids = _fill(index, vectors)
+    stats = index.stats()
+    assert stats["vectors"] == N and stats["lists"] > 1
+    assert _recall(index, vectors, ids, queries) >= 0.9
+
+
+def test_search_scores_are_cosines_best_first(make_index, data):
+    vectors, queries = data
+    index = make_index()
+    _fill(index, vectors)
+    hits = index.search(queries[0], K, exact=True)
+    scores = [s for _, s in hits]
+    assert scores == sorted(scores, reverse=True)
+    assert all(-1.0 <= s <= 1.0001 for s in scores)
+    assert index.search(queries[0], K, threshold=scores[2]) == hits[:3]
+
+
+def test_delete_and_upsert_after_training(make_index, data):
+    vectors, queries = data
+    index = make_index()
+    ids = _fill(index, vectors)
+
+    removed = ids[:500]
+    assert index.delete(removed + ["missing"]) == 500
+    assert len(index) == N - 500 and "v0" not in index
+    live = vectors[500:]
+    assert _recall(index, live, ids[500:], queries, exclude=removed) >= 0.9
+
+    # Re-added ids reuse free rows and are found by their new vector
+    index.upsert(["v0"], queries[:1], [{"n": 0}])
+    assert index.search(queries[0], 1)[0][0] == "v0"
+    assert index.get(["v0"])[0]["n"] == 0
+
+
+def test_upsert_replaces_a_vector(make_index, data):
+    vectors, queries = data
+    index = make_index()
+    _fill(index, vectors)
+    index.upsert(["v42"], queries[1:2], [{"n": "new"}])
+    assert len(index) == N
+    assert index.search(queries[1], 1)[0] == ("v42", pytest.approx(1.0, abs=1e-5))
+    assert index.get(["v42"])[0]["n"] == "new"
+
+
+def test_reopen_keeps_vectors_and_lists(make_index, data):
+    vectors, queries = data
+    index = make_index()
+    ids = _fill(index, vectors)
+    expected = index.search(queries[0], K)
+
+    reopened = make_index()
+    assert len(reopened) == N
+    assert reopened.stats()["lists"] == index.stats()["lists"]
+    assert reopened.search(queries[0], K) == expected
+    assert _recall(reopened, vectors, ids, queries) >= 0.9
+
+
+def test_find_uses_the_metadata_index(make_index, data):
+    vectors, _ = data
+    index = make_index(index_fields=("src_id", "tgt_id"))
+    edges = [("a", "b"), ("b", "c"), ("c", "a"), ("d", "e")]
+    index.upsert(
+        [f"rel-{i}" for i in range(len(edges))],
+        vectors[: len(edges)],
+        [{"src_id": s, "tgt_id": t} for s, t in edges],
+    )
+
+    assert sorted(index.find("src_id", "a") + index.find("tgt_id", "a")) == ["rel-0", "rel-2"]
+    assert index.find("src_id", "z") == []
+    plan = index._db.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM rows WHERE json_extract(meta, '$.src_id') = ?", ("a",)
+    ).fetchall()
+    assert "meta_src_id" in str(plan)
+    with pytest.raises(ValueError):
+        index.find("src_id') OR 1=1 --", "a")
+
+
+def test_get_runs_safely_alongside_writers(make_index, data):
+    vectors, _ = data
+    index = make_index()
+    ids = _fill(index, vectors[:500])
+    errors = []
+
+    def writer():
+        try:
+            for start in range(0, 500, 50):
+                index.upsert(ids[start : start + 50], vectors[start : start + 50], [{"n": -1}] * 50)
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    while thread.is_alive():
+        assert len(index.get(ids[:100])) == 100
+    thread.join()
+
+    assert errors == []
+    assert all(r["n"] == -1 for r in index.get(ids))
@@ -0,0 +1,70 @@
+import pytest
+
+from services import bm25_index
+from services.lightrag_service import _rrf
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setattr(bm25_index, "INDEX_DB", str(tmp_path / "bm25.db"))
+    bm25_index._reset_memory()
+    yield bm25_index
+    if bm25_index._db is not None:
+        bm25_index._db.close()
+    bm25_index._reset_memory()
+
+
+@pytest.mark.parametrize(
+    "pairs",
+    [
+        [(1, 1)],
+        [(1, 3), (2, 1), (9, 127), (10, 128)],
+        [(5, 1), (300, 2), (70_000, 16_384), (2**31, 2**20)],
+    ],
+)
+def test_varint_round_trip(pairs):
+    assert list(bm25_index._decode(bm25_index._encode(pairs, 0))) == pairs
+
+
+def test_varint_blobs_append(index):
+    first, second = [(3, 2), (200, 1)], [(201, 5), (90_000, 1)]
+    blob = bm25_index._encode(first, 0) + bm25_index._encode(second, first[-1][0])
+    assert list(bm25_index._decode(blob)) == first + second
+
+
+def test_small_gaps_take_one_byte_each():
+    assert len(bm25_index._encode([(1, 1), (2, 1), (3, 1)], 0)) == 6
+
+
+def test_search_ranks_exact_term_first(index):
+    index.add(
+        {
+            "a": "The backup policy follows ISO-27001 controls.",
+            "b": "Backups run nightly.",
+            "c": "Unrelated text about onboarding.",
+        }
+    )
+    hits = index.search("ISO-27001 backup")
+    assert hits[0][0] == "a"
+    assert "c" not in [chunk_id for chunk_id, _ in hits]
+
+
+def test_deleted_and_replaced_chunks_leave_results(index):
+    index.add({"a": "alpha beta", "b": "alpha gamma"})
+    index.delete(["a"])
+    assert [chunk_id for chunk_id, _ in index.search("alpha")] == ["b"]
+    index.add({"b": "delta"})
+    assert index.search("alpha") == []
+    assert [chunk_id for chunk_id, _ in index.search("delta")] == ["b"]
+
+
+def test_rrf_orders_by_summed_reciprocal_rank():
+    scores = _rrf([["a", "b", "c"], ["b", "d"]], k=60)
+    assert sorted(scores, key=scores.get, reverse=True) == ["b", "a", "d", "c"]
+    assert scores["b"] == pytest.approx(1 / 62 + 1 / 61)
+    assert scores["d"] == pytest.approx(1 / 62)
+
+
+def test_rrf_single_ranking_keeps_its_order():
+    scores = _rrf([["x", "y", "z"]], k=60)
+    assert sorted(scores, key=scores.get, reverse=True) == ["x", "y", "z"]
@@ -0,0 +1,44 @@
+import time
+from collections import OrderedDict
+
+import pytest
+
+from services import cache_service
+
+MESSAGES = [{"role": "user", "content": "What is LightRAG?"}]
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_service, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(cache_service, "CACHE_DB", str(tmp_path / "llm_cache.db"))
+    monkeypatch.setattr(cache_service, "_db", None)
+    monkeypatch.setattr(cache_service, "_memory_cache", OrderedDict())
+    yield cache_service
+    if cache_service._db is not None:
+        cache_service._db.close()
+
+
+def _meta_and_table(db):
+    meta = db.execute("SELECT items, bytes FROM meta WHERE id = 1").fetchone()
+    table = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+    return meta, table
+
+
+def test_rewriting_a_key_keeps_meta_in_sync(cache):
+    cache.put(MESSAGES, "m", 100, 0.1, "abc")
+    cache.put(MESSAGES, "m", 100, 0.1, "abcdef")
+
+    meta, table = _meta_and_table(cache._get_db())
+    assert meta == table == (1, 6)
+    assert cache.get(MESSAGES, "m", 100, 0.1) == "abcdef"
+
+
+def test_rewriting_an_expired_key_keeps_meta_in_sync(cache):
+    db = cache._get_db()
+    cache._db_put(db, "k", "old value", "m", time.time() - 2 * cache.CACHE_TTL)
+    cache._db_put(db, "k", "new", "m", time.time())
+
+    meta, table = _meta_and_table(db)
+    assert meta == table == (1, 3)
+
@@ -0,0 +1,131 @@
+import time
+
+import pytest
+
+import config
+from services import chat_service, llm_service
+
+PIECE = "The policy requires nightly backups. "  # 37 chars
+
+
+class FakeLLM:
+    """Stub for llm_service: a drafter stream, a refiner stream and critic verdicts."""
+
+    def __init__(self, verdicts, pieces=10, delay=0.0):
+        self.verdicts = list(verdicts)  # one per critic call, in order
+        self.pieces = pieces
+        self.delay = delay
+        self.critic_calls = []  # "partial" or "full"
+        self.drafted = 0
+
+    def stream_completion(self, messages, model=None, max_tokens=None, temperature=None, **kwargs):
+        if "Critic's note" in messages[-1]["content"]:
+            yield from ["Corrected ", "answer."]
+            return
+        for _ in range(self.pieces):
+            if self.delay:
+                time.sleep(self.delay)
+            self.drafted += 1
+            yield PIECE
+
+    def chat_completion(self, messages, model=None, **kwargs):
+        partial = "still being written" in messages[-1]["content"]
+        self.critic_calls.append("partial" if partial else "full")
+        verdict = self.verdicts.pop(0)
+        return verdict
+
+
+@pytest.fixture
+def swarm(monkeypatch):
+    monkeypatch.setattr(config, "CRITIC_GATE_ENABLED", False)
+    monkeypatch.setattr(config, "SWARM_CRITIC_COVERAGE", 0.8)
+
+    def run(fake, start_chars):
+        monkeypatch.setattr(config, "SWARM_CRITIC_START_CHARS", start_chars)
+        monkeypatch.setattr(llm_service, "stream_completion", fake.stream_completion)
+        monkeypatch.setattr(llm_service, "chat_completion", fake.chat_completion)
+        events = list(
+            chat_service._pipelined_swarm("q?", "context", [{"role": "user", "content": "q?"}], "m", 100, 0.1)
+        )
+        answer = ""
+        for e in events:
+            if e["type"] == "chunk":
+                answer += e["text"]
+            elif e["type"] == "replace":
+                answer = e["text"]
+        return events, answer
+
+    return run
+
+
+def test_approval_covering_the_draft_publishes_it(swarm):
+    fake = FakeLLM(["APPROVED"])
+    events, answer = swarm(fake, start_chars=9 * len(PIECE))
+
+    assert fake.critic_calls == ["partial"]
+    assert answer == PIECE * 10
+    assert not any(e["type"] == "replace" for e in events)
+
+
+def test_approval_of_a_short_prefix_is_rechecked(swarm):
+    fake = FakeLLM(["APPROVED", "APPROVED"])
+    events, answer = swarm(fake, start_chars=len(PIECE))
+
+    assert fake.critic_calls == ["partial", "full"]
+    assert answer == PIECE * 10
+    assert "370/370 chars reviewed" in events[-2]["text"]
+
+
+def test_recheck_rejection_replaces_the_draft(swarm):
+    fake = FakeLLM(["APPROVED", "Page 3 is misquoted."])
+    events, answer = swarm(fake, start_chars=len(PIECE))
+
+    assert fake.critic_calls == ["partial", "full"]
+    assert answer == "Corrected answer."
+
+
+def test_early_rejection_stops_the_draft_and_replaces_it(swarm):
+    fake = FakeLLM(["Unsupported claim about backups."], pieces=200, delay=0.005)
+    events, answer = swarm(fake, start_chars=len(PIECE))
+
+    assert fake.critic_calls == ["partial"]
+    assert fake.drafted < 200  # drafting stopped once the rejection arrived
+    types = [e["type"] for e in events]
+    assert types.index("replace") > types.index("chunk")
+    assert answer == "Corrected answer."
+
+
+def test_failed_critic_leaves_the_draft(swarm):
+    fake = FakeLLM([])
+    failures = chat_service.critic_failures()
+    events, answer = swarm(fake, start_chars=9 * len(PIECE))
+
+    assert answer == PIECE * 10
+    assert chat_service.critic_failures() > failures
+
+
+@pytest.mark.parametrize(
+    "model, ollama_slots, swarm_mode, expected",
+    [
+        ("ollama/qwen2.5:3b", 1, "pipelined", "serial"),
+        ("ollama/qwen2.5:3b", 2, "pipelined", "pipelined"),
+        ("upstage/solar-pro-3:free", 1, "pipelined", "pipelined"),
+        ("upstage/solar-pro-3:free", 1, "serial", "serial"),
+    ],
+)
+def test_single_slot_providers_run_serial(monkeypatch, model, ollama_slots, swarm_mode, expected):
+    limits = {name: dict(v) for name, v in config.RATE_LIMITS.items()}
+    limits["ollama"]["concurrency"] = ollama_slots
+    limits["openrouter"]["concurrency"] = 8
+    monkeypatch.setattr(config, "RATE_LIMITS", limits)
+    monkeypatch.setattr(config, "SWARM_MODE", swarm_mode)
+    assert chat_service._swarm_mode(model) == expected
+
+
+def test_default_model_follows_its_provider(monkeypatch):
+    monkeypatch.setattr(config, "DEFAULT_MODEL", "ollama/qwen2.5:3b")
+    monkeypatch.setattr(config, "SWARM_MODE", "pipelined")
+    monkeypatch.setattr(
+        config, "RATE_LIMITS", {**config.RATE_LIMITS, "ollama": {"concurrency": 1}}
+    )
+    assert chat_service._swarm_mode(None) == "serial"
@@ -0,0 +1,102 @@
+import pytest
+
+from services import chat_service, llm_service
+
+
+def _call(id_, name, arguments):
+    return {"id": id_, "type": "function", "function": {"name": name, "arguments": arguments}}
+
+
+class FakeStream:
+    """Replays one scripted model turn per stream_events call: (text pieces, tool calls)."""
+
+    def __init__(self, turns):
+        self.turns = list(turns)
+        self.seen = []  # message roles sent on each turn
+
+    def stream_events(self, messages, model=None, max_tokens=None, temperature=None, tools=None):
+        self.seen.append([m["role"] for m in messages])
+        pieces, calls = self.turns.pop(0)
+        for text in pieces:
+            yield {"type": "chunk", "text": text}
+        for i, call in enumerate(calls):
+            yield {
+                "type": "tool_call_delta",
+                "index": i,
+                "id": call["id"],
+                "name": call["function"]["name"],
+                "arguments": call["function"]["arguments"],
+            }
+        yield {"type": "done", "content": "".join(pieces), "tool_calls": calls, "finish_reason": None, "ttft_s": 0.0}
+
+
+@pytest.fixture
+def loop(monkeypatch):
+    monkeypatch.setattr(chat_service, "_latency", {})
+
+    def run(turns, run_tool, max_iterations=8):
+        fake = FakeStream(turns)
+        monkeypatch.setattr(llm_service, "stream_events", fake.stream_events)
+        messages = [{"role": "user", "content": "do it"}]
+        events = list(chat_service.stream_tool_loop(messages, [], run_tool, max_iterations=max_iterations))
+        return events, messages, fake
+
+    return run
+
+
+def test_tool_results_are_fed_back_until_the_model_answers(loop):
+    calls = []
+
+    def run_tool(name, args):
+        calls.append((name, args))
+        return "file contents"
+
+    events, messages, fake = loop(
+        [
+            (["Reading."], [_call("c1", "read_file", '{"filepath": "a.py"}')]),
+            (["Done", "."], []),
+        ],
+        run_tool,
+    )
+
+    assert calls == [("read_file", {"filepath": "a.py"})]
+    assert [e["type"] for e in events] == ["chunk", "tool_call_delta", "tool_call", "tool_result", "chunk", "chunk"]
+    assert events[-2]["text"] == "\n\nDone"  # text after a tool round starts a new paragraph
+    assert fake.seen[1] == ["user", "assistant", "tool"]
+    assert messages[2] == {"role": "tool", "tool_call_id": "c1", "name": "read_file", "content": "file contents"}
+    assert chat_service.latency_stats()["tools"]["turns"] == 1
+
+
+def test_invalid_json_arguments_are_announced_before_their_error(loop):
+    def run_tool(name, args):
+        raise AssertionError("must not run with unparsed arguments")
+
+    events, messages, _ = loop(
+        [([], [_call("c1", "write_file", '{"filepath": "a.py", "content": ')]), (["Sorry."], [])],
+        run_tool,
+    )
+
+    call, result = [e for e in events if e["type"] in ("tool_call", "tool_result")]
+    assert call == {"type": "tool_call", "id": "c1", "name": "write_file", "arguments": '{"filepath": "a.py", "content": '}
+    assert result["id"] == "c1" and result["text"].startswith("Error: invalid JSON arguments")
+    assert messages[2]["content"] == result["text"]
+
+
+def test_tool_errors_become_results(loop):
+    def run_tool(name, args):
+        raise PermissionError("outside the workspace")
+
+    events, _, _ = loop([([], [_call("c1", "execute_bash", "")]), (["ok"], [])], run_tool)
+
+    call, result = [e for e in events if e["type"] in ("tool_call", "tool_result")]
+    assert call["arguments"] == {}
+    assert result["text"] == "Error: outside the workspace"
+
+
+def test_iterations_are_capped(loop):
+    turns = [([], [_call(f"c{i}", "execute_bash", '{"command": "ls"}')]) for i in range(3)]
+
+    events, _, _ = loop(turns, lambda name, args: "ok", max_iterations=2)
+
+    assert sum(e["type"] == "tool_result" for e in events) == 2
+    assert events[-1] == {"type": "chunk", "text": "All tools executed."}
@@ -0,0 +1,70 @@
+import asyncio
+
+import httpx
+import pytest
+
+from services import client_pool
+
+OLLAMA = "http://localhost:11434/v1"
+OPENROUTER = "https://openrouter.ai/api/v1"
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    for name in ("_http_clients", "_async_http_clients", "_clients", "_async_clients", "_stats"):
+        monkeypatch.setattr(client_pool, name, {})
+    yield client_pool
+    client_pool.close_all()
+
+
+def test_sync_clients_are_reused_per_base_url(pool):
+    first = pool.get_client(OLLAMA, "ollama", 600)
+    again = pool.get_client(OLLAMA, "ollama", 600)
+    other_key = pool.get_client(OLLAMA, "other", 600)
+    other_url = pool.get_client(OPENROUTER, "ollama", 600)
+
+    assert again is first
+    assert other_key is not first and other_url is not first
+    # Clients of one base URL share its transport; another URL gets its own
+    assert other_key._client is first._client
+    assert other_url._client is not first._client
+    assert pool.stats()[OLLAMA]["hits"] == 1
+    assert pool.stats()[OLLAMA]["misses"] == 2
+
+
+def test_async_clients_are_pooled_per_event_loop(pool):
+    async def fetch():
+        return pool.get_async_client(OLLAMA, "ollama", 600), pool.get_async_client(OLLAMA, "ollama", 600)
+
+    loop_a, loop_b = asyncio.new_event_loop(), asyncio.new_event_loop()
+    try:
+        a1, a2 = loop_a.run_until_complete(fetch())
+        b1, _ = loop_b.run_until_complete(fetch())
+        a3, _ = loop_a.run_until_complete(fetch())
+    finally:
+        loop_a.close()
+        loop_b.close()
+
+    assert a1 is a2 is a3
+    assert b1 is not a1
+    assert b1._client is not a1._client  # an AsyncClient is bound to one loop
+    assert len(pool._async_http_clients) == 2
+
+
+def test_stats_report_open_connections(pool):
+    pool.get_client(OLLAMA, "ollama", 600)
+
+    entry = pool.stats()[OLLAMA]
+    assert entry["open_connections"] == 0
+    assert entry["http2"] == pool._use_http2()
+
+
+def test_stats_survive_a_transport_without_pool_internals(pool, monkeypatch):
+    class Opaque(httpx.BaseTransport):
+        def handle_request(self, request):
+            raise NotImplementedError
+
+    pool.get_client(OLLAMA, "ollama", 600)
+    monkeypatch.setitem(pool._http_clients, OLLAMA, httpx.Client(transport=Opaque()))
+
+    assert pool.stats()[OLLAMA]["open_connections"] is None
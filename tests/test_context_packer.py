@@ -0,0 +1,71 @@
+import pytest
+
+import config
+from services import context_packer
+from utils import tokens
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    monkeypatch.setattr(tokens, "_load", lambda name: None)  # chars/4, same with or without tiktoken
+
+
+def _section(title, sentences):
+    return f"# {title}\n" + " ".join(sentences)
+
+
+FILLER = [f"Sentence number {i} talks about unrelated office logistics and parking." for i in range(30)]
+CONTEXT = "\n\n".join(
+    [
+        _section("Operations", FILLER[:15]),
+        "[Page 7] The backup policy requires encrypted snapshots every night. " + " ".join(FILLER[15:]),
+    ]
+)
+
+
+def test_context_that_fits_is_unchanged():
+    text = "Short context. Two sentences."
+    assert context_packer.pack(text, "anything", 1000) == text
+
+
+def test_duplicate_sentences_are_dropped():
+    text = "LightRAG builds a graph. It stores chunks.\n\nLightRAG builds a graph. It answers questions."
+    packed = context_packer.pack(text, "graph", 1000)
+    assert packed.count("LightRAG builds a graph.") == 1
+    assert "It answers questions." in packed
+
+
+@pytest.mark.parametrize("budget", [40, 120, 300])
+def test_packed_context_stays_within_budget(budget):
+    packed = context_packer.pack(CONTEXT, "backup policy snapshots", budget)
+    assert tokens.count(packed) <= budget
+    assert tokens.count(packed) < tokens.count(CONTEXT)
+
+
+def test_relevant_sentences_are_kept_with_their_page():
+    packed = context_packer.pack(CONTEXT, "backup policy snapshots", 60)
+    assert "[Page 7] The backup policy requires encrypted snapshots every night." in packed
+
+
+def test_kept_sentences_stay_in_original_order():
+    packed = context_packer.pack(CONTEXT, "sentence number", 150)
+    numbers = [int(s.split()[2]) for s in packed.split(". ") if s.startswith("Sentence number")]
+    assert numbers and numbers == sorted(numbers)
+
+
+def test_budget_from_model_window(monkeypatch):
+    monkeypatch.setattr(config, "get_model_info", lambda model: {"ctx": "32K"})
+    monkeypatch.setattr(config, "CONTEXT_FILL_RATIO", 0.5)
+    monkeypatch.setattr(config, "CONTEXT_MIN_TOKENS", 512)
+    assert context_packer.context_window("m") == 32 * 1024
+    assert context_packer.budget("m") == 16 * 1024
+    assert context_packer.budget("m", reserved=1024) == 15 * 1024
+    assert context_packer.budget("m", cap=2000) == 2000
+    assert context_packer.budget("m", reserved=16 * 1024) == 512  # floor
+
+
+def test_unknown_window_uses_the_default(monkeypatch):
+    monkeypatch.setattr(config, "get_model_info", lambda model: {"ctx": "?"})
+    assert context_packer.context_window("m") == config.CONTEXT_DEFAULT_WINDOW
+    monkeypatch.setattr(config, "get_model_info", lambda model: {"ctx": "1M"})
+    assert context_packer.context_window("m") == 1024 * 1024
@@ -0,0 +1,147 @@
+from collections import deque
+
+import pytest
+
+import config
+from services import conversation_memory
+from utils import tokens
+
+
+def _history(n, words=6):
+    """n alternating user/assistant messages of `words` words each (cost words + 4 tokens)."""
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": " ".join([f"m{i}"] * words)}
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(conversation_memory, "MEMORY_DIR", str(tmp_path))
+    monkeypatch.setattr(conversation_memory, "MEMORY_DB", str(tmp_path / "conversations.db"))
+    monkeypatch.setattr(conversation_memory, "_db", None)
+    monkeypatch.setattr(conversation_memory, "_turns", deque(maxlen=conversation_memory.MAX_TURNS))
+    monkeypatch.setattr(
+        conversation_memory, "_counters", dict.fromkeys(conversation_memory._counters, 0)
+    )
+    # One token per word keeps window sizes exact
+    monkeypatch.setattr(tokens, "count_many", lambda texts, model=None: [len(t.split()) for t in texts])
+    monkeypatch.setattr(tokens, "count", lambda text, model=None: len(text.split()))
+    monkeypatch.setattr(config, "MEMORY_WINDOW_TOKENS", 30)
+    monkeypatch.setattr(config, "MEMORY_WINDOW_MIN_MESSAGES", 2)
+    monkeypatch.setattr(config, "MEMORY_FOLD_BATCH", 4)
+    yield conversation_memory
+    if conversation_memory._db is not None:
+        conversation_memory._db.close()
+
+
+@pytest.fixture
+def folds(monkeypatch):
+    """Stubs the LLM fold; records (summary, folded message contents) per call."""
+    calls = []
+
+    def fold(summary, messages, model=None):
+        calls.append((summary, [m["content"] for m in messages]))
+        return f"summary of {len(messages)} messages after '{summary}'"
+
+    monkeypatch.setattr(conversation_memory, "fold", fold)
+    return calls
+
+
+def test_window_holds_the_newest_messages_within_the_budget(memory):
+    # 10 tokens per message: three fit in 30
+    assert memory._window_start(_history(10)) == 7
+    assert memory._window_start(_history(2)) == 0
+    assert memory._window_start([]) == 0
+
+
+def test_window_keeps_the_minimum_messages_even_over_budget(memory, monkeypatch):
+    assert memory._window_start(_history(6, words=100)) == 4
+    monkeypatch.setattr(config, "MEMORY_WINDOW_MIN_MESSAGES", 0)
+    assert memory._window_start(_history(6, words=100)) == 6
+
+
+def test_recall_uses_the_summary_while_history_matches(memory):
+    history = _history(8)
+    memory._save(
+        "c",
+        {"summary": "earlier talk", "folded": 5, "fingerprint": memory._fingerprint(history[:5])},
+    )
+
+    summary, window = memory.recall("c", history + _history(1))
+
+    assert summary == "earlier talk"
+    assert window == [{"role": m["role"], "content": m["content"]} for m in history[5:] + _history(1)]
+
+
+def test_recall_resets_when_the_history_was_edited(memory):
+    history = _history(8)
+    memory._save(
+        "c",
+        {"summary": "earlier talk", "folded": 5, "fingerprint": memory._fingerprint(history[:5])},
+    )
+    edited = [dict(m) for m in history]
+    edited[1]["content"] = "a different answer"
+
+    summary, window = memory.recall("c", edited)
+    assert summary == ""
+    assert len(window) == 8
+
+    # A cleared conversation is shorter than what was folded
+    summary, window = memory.recall("c", history[:3])
+    assert summary == "" and len(window) == 3
+
+
+def test_recall_caps_unfolded_history_at_the_baseline(memory):
+    summary, window = memory.recall("new", _history(memory.BASELINE_MESSAGES + 5))
+    assert summary == ""
+    assert len(window) == memory.BASELINE_MESSAGES
+
+
+def test_folds_wait_for_a_full_batch(memory, folds):
+    # 6 messages: the window starts at 3, so only 3 have left it
+    memory._fold_conversation("c", _history(6))
+    assert folds == []
+    assert memory._load("c")["folded"] == 0
+
+    history = _history(10)  # window starts at 7: a batch of 7
+    memory._fold_conversation("c", history)
+    assert folds == [("", [m["content"] for m in history[:7]])]
+    state = memory._load("c")
+    assert state["folded"] == 7
+    assert state["fingerprint"] == memory._fingerprint(history[:7])
+
+
+def test_later_folds_only_read_the_new_messages(memory, folds):
+    memory._fold_conversation("c", _history(10))
+    memory._fold_conversation("c", _history(12))  # 2 more left the window: wait
+    memory._fold_conversation("c", _history(14))  # 4 more: fold them
+
+    assert len(folds) == 2
+    summary, contents = folds[1]
+    assert summary == "summary of 7 messages after ''"
+    assert contents == [m["content"] for m in _history(14)[7:11]]
+    assert memory._load("c")["folded"] == 11
+    assert memory.stats()["folded_messages"] == 11
+
+
+def test_edited_history_is_refolded_from_scratch(memory, folds):
+    memory._fold_conversation("c", _history(10))
+    edited = _history(10)
+    edited[0]["content"] = "changed question"
+    memory._fold_conversation("c", edited)
+
+    assert folds[1][0] == ""
+    assert folds[1][1][0] == "changed question"
+    assert memory.stats()["resets"] == 1
+
+
+def test_failed_fold_keeps_the_previous_state(memory, monkeypatch):
+    def broken(summary, messages, model=None):
+        raise RuntimeError("LLM down")
+
+    monkeypatch.setattr(memory, "fold", broken)
+    memory._fold_conversation("c", _history(10))
+
+    assert memory._load("c")["folded"] == 0
+    assert memory.stats()["fold_errors"] == 1
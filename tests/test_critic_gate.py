@@ -0,0 +1,151 @@
+import random
+import re
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import config
+from core import swarm
+from services import critic_gate, lightrag_service
+
+CONTEXT = (
+    "[Page 3] LightRAG stores entities and relations in a knowledge graph. "
+    "Chunks are embedded with a local sentence transformer model. "
+    "[Page 4] Queries combine graph neighbours with the closest chunk vectors."
+)
+GROUNDED = (
+    "LightRAG stores entities and relations in a knowledge graph [Page 3]. "
+    "Queries combine graph neighbours with the closest chunk vectors [Page 4]."
+)
+INVENTED = "The system was designed on the moon by seven penguins in 1850."
+
+
+def _bag_of_words(texts):
+    """Stub for embed_texts: normalised word counts, so identical sentences score 1.0."""
+    vocab = sorted({w for t in texts for w in re.findall(r"\w+", t.lower())})
+    index = {w: i for i, w in enumerate(vocab)}
+    vectors = np.zeros((len(texts), len(vocab)), dtype="float32")
+    for row, text in enumerate(texts):
+        for word in re.findall(r"\w+", text.lower()):
+            vectors[row, index[word]] += 1
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def embedded(monkeypatch):
+    """Stubs embed_texts; returns the batches it was asked to embed."""
+    batches = []
+
+    def embed_texts(texts):
+        batches.append(list(texts))
+        return _bag_of_words(texts)
+
+    monkeypatch.setattr(lightrag_service, "embed_texts", embed_texts)
+    return batches
+
+
+@pytest.fixture
+def gate(monkeypatch, embedded):
+    monkeypatch.setattr(critic_gate, "_stats", dict.fromkeys(critic_gate._stats, 0))
+    monkeypatch.setattr(config, "CRITIC_GATE_ENABLED", True)
+    monkeypatch.setattr(config, "CRITIC_GATE_THRESHOLD", 0.85)
+    monkeypatch.setattr(config, "CRITIC_GATE_SIMILARITY", 0.6)
+    monkeypatch.setattr(config, "CRITIC_GATE_AUDIT_RATE", 0.0)
+    return critic_gate
+
+
+@pytest.fixture
+def critic(monkeypatch):
+    """Replaces the LLM critic; records the drafts it reviews and returns `verdict`."""
+    critic = SimpleNamespace(drafts=[], verdict="APPROVED")
+
+    def critique_draft(question, context, draft, model, partial=False):
+        critic.drafts.append(draft)
+        return critic.verdict
+
+    monkeypatch.setattr(swarm, "critique_draft", critique_draft)
+    return critic
+
+
+def test_grounded_draft_scores_high(gate):
+    assert gate.groundedness(GROUNDED, CONTEXT) == pytest.approx(1.0)
+
+
+def test_unsupported_sentences_lower_the_score(gate):
+    score = gate.groundedness(GROUNDED + " " + INVENTED, CONTEXT)
+    supported = sum(len(s) for s in gate._sentences(GROUNDED))
+    assert score == pytest.approx(supported / (supported + len(INVENTED)))
+
+
+def test_citing_a_page_missing_from_the_context_scores_zero(gate, embedded):
+    draft = GROUNDED + " Chunks are embedded with a local sentence transformer model [Page 9]."
+    assert gate.groundedness(draft, CONTEXT) == 0.0
+    assert embedded == []  # decided before anything is embedded
+
+
+def test_no_claims_to_check_gives_none(gate, embedded):
+    assert gate.groundedness("Sure! [Page 3]", CONTEXT) is None
+    assert gate.groundedness("", CONTEXT) is None
+    assert gate.groundedness(INVENTED, "Too short.") is None
+    assert embedded == []
+
+
+def test_confident_draft_skips_the_critic(gate, critic):
+    verdict = gate.review("what is lightrag?", CONTEXT, GROUNDED, "m")
+
+    assert verdict.startswith("APPROVED (critic skipped: groundedness 1.00")
+    assert critic.drafts == []
+    assert gate.stats()["skipped"] == 1 and gate.stats()["critic_runs"] == 0
+
+
+def test_weak_draft_goes_to_the_critic(gate, critic):
+    critic.verdict = "REJECTED: invented claims"
+    verdict = gate.review("what is lightrag?", CONTEXT, INVENTED, "m")
+
+    assert verdict == "REJECTED: invented claims"
+    assert critic.drafts == [INVENTED]
+    stats = gate.stats()
+    assert stats["critic_runs"] == 1 and stats["approval_rate"] == 0.0
+
+
+def test_no_context_or_disabled_gate_always_runs_the_critic(gate, critic, embedded, monkeypatch):
+    gate.review("q", "", GROUNDED, "m")
+    monkeypatch.setattr(config, "CRITIC_GATE_ENABLED", False)
+    gate.review("q", CONTEXT, GROUNDED, "m")
+
+    assert critic.drafts == [GROUNDED, GROUNDED]
+    assert embedded == []
+
+
+def test_scoring_errors_fall_back_to_the_critic(gate, critic, monkeypatch):
+    def broken(texts):
+        raise RuntimeError("model not loaded")
+
+    monkeypatch.setattr(lightrag_service, "embed_texts", broken)
+    assert gate.review("q", CONTEXT, GROUNDED, "m") == "APPROVED"
+    assert critic.drafts == [GROUNDED]
+
+
+def test_audit_sample_follows_the_seeded_rate(gate, critic, monkeypatch):
+    monkeypatch.setattr(config, "CRITIC_GATE_AUDIT_RATE", 0.3)
+    random.seed(1234)
+    expected = sum(random.random() < 0.3 for _ in range(50))
+
+    random.seed(1234)
+    for _ in range(50):
+        gate.review("q", CONTEXT, GROUNDED, "m")
+
+    stats = gate.stats()
+    assert len(critic.drafts) == stats["audited"] == expected
+    assert stats["skipped"] == 50 - expected
+    assert stats["audit_approval_rate"] == 1.0
+
+
+def test_rejected_audit_is_counted(gate, critic, monkeypatch):
+    monkeypatch.setattr(config, "CRITIC_GATE_AUDIT_RATE", 1.0)
+    critic.verdict = "REJECTED"
+
+    assert gate.review("q", CONTEXT, GROUNDED, "m") == "REJECTED"
+    stats = gate.stats()
+    assert stats["audited"] == 1 and stats["audit_approval_rate"] == 0.0
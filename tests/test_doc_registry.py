@@ -0,0 +1,87 @@
+import pytest
+
+import config
+from services import doc_registry
+
+
+def _page(n, topic, paragraphs=6):
+    body = "\n\n".join(
+        f"Paragraph {i} about {topic}: " + " ".join(f"{topic}{i}w{j}" for j in range(12))
+        for i in range(paragraphs)
+    )
+    return f"[Page {n}]\n{body}"
+
+
+def _document(topics):
+    return "\n\n".join(_page(n, topic) for n, topic in enumerate(topics, start=1))
+
+
+TOPICS = ["graphs", "vectors", "chunks", "queries", "caches", "workers", "indexes", "prompts"]
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(doc_registry, "REGISTRY_PATH", str(tmp_path / "doc_registry.json"))
+    monkeypatch.setattr(doc_registry, "_registry", None)
+    monkeypatch.setattr(config, "CHUNK_SIZE", 600)
+    return doc_registry
+
+
+def test_first_upload_sends_every_chunk(registry):
+    text = _document(TOPICS)
+    report = registry.plan(b"v1", text)
+
+    assert not report["duplicate_file"]
+    assert report["total_chunks"] > 4
+    assert report["new_chunks"] == registry.chunk_document(text)
+    assert report["skipped_chunks"] == report["skipped_chars"] == 0
+
+
+def test_identical_bytes_are_a_duplicate(registry):
+    text = _document(TOPICS)
+    registry.commit(registry.plan(b"v1", text), "a.pdf")
+
+    report = registry.plan(b"v1", text)
+    assert report["duplicate_file"]
+    assert report["new_chunks"] == []
+    assert registry.lookup_file(report["file_hash"])["filename"] == "a.pdf"
+
+
+def test_inserting_a_page_only_sends_the_new_text(registry):
+    before = registry.chunk_document(_document(TOPICS))
+    registry.commit(registry.plan(b"v1", _document(TOPICS)), "a.pdf")
+
+    # Every page after the insert is renumbered
+    edited = TOPICS[:2] + ["penguins"] + TOPICS[2:]
+    report = registry.plan(b"v2", _document(edited))
+
+    assert not report["duplicate_file"]
+    assert any("penguins" in c for c in report["new_chunks"])
+    # Only the chunks that border the new page are re-sent with it
+    assert len([c for c in report["new_chunks"] if "penguins" not in c]) <= 2
+    assert report["skipped_chunks"] >= len(before) - 3
+
+
+def test_markers_and_whitespace_do_not_change_the_hash(registry):
+    assert registry._chunk_hash("[Page 3]\nSome  text\nhere") == registry._chunk_hash(
+        "[Page 4]\nSome text here"
+    )
+    assert registry._chunk_hash("Some text here") != registry._chunk_hash("Other text here")
+
+
+def test_chunks_keep_their_page_marker(registry):
+    chunks = registry.chunk_document(_document(TOPICS))
+    assert all(c.startswith("[Page ") for c in chunks)
+
+
+def test_commit_persists_across_reloads(registry, monkeypatch):
+    text = _document(TOPICS[:3])
+    report = registry.plan(b"v1", text)
+    registry.commit(report, "a.pdf")
+
+    monkeypatch.setattr(doc_registry, "_registry", None)
+    again = registry.plan(b"v1-resaved", text)
+    assert not again["duplicate_file"]
+    assert again["new_chunks"] == []
+    assert again["skipped_chunks"] == report["total_chunks"]
+    assert registry.lookup_file(report["file_hash"])["chunks"] == report["total_chunks"]
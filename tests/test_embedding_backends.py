@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+import config
+from services import embedding_backends, embedding_cache, lightrag_service
+
+
+class FakeModel:
+    def __init__(self, name, shift=0.0):
+        self.name = name
+        self.shift = shift
+        self.encoded = 0
+
+    def encode(self, texts, **kwargs):
+        self.encoded += 1
+        rows = np.ones((len(texts), 4), dtype="float32")
+        rows[:, 0] += self.shift
+        return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def loaders(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_backends, "EXPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "EMBEDDING_PARITY_MIN", 0.99)
+    loaded = []
+
+    def torch():
+        loaded.append("torch")
+        return FakeModel("torch")
+
+    def install(onnx):
+        monkeypatch.setattr(embedding_backends, "_load_torch", torch)
+        monkeypatch.setattr(embedding_backends, "_LOADERS", {"torch": torch, "onnx-int8": onnx})
+        return loaded
+
+    return install
+
+
+def test_parity_pass_keeps_the_onnx_model(loaders):
+    loaded = loaders(lambda: FakeModel("onnx"))
+    model = embedding_backends.load_model("onnx-int8")
+
+    assert model.name == "onnx"
+    assert embedding_backends.active_backend(model) == "onnx-int8"
+    assert loaded == ["torch"]  # the reference, for the first parity check only
+
+
+def test_parity_failure_reuses_the_reference(loaders):
+    loaded = loaders(lambda: FakeModel("onnx", shift=5.0))
+    model = embedding_backends.load_model("onnx-int8")
+
+    assert model.name == "torch"
+    assert embedding_backends.active_backend(model) == "torch"
+    assert loaded == ["torch"]
+
+
+def test_parity_verdict_is_recorded(loaders):
+    loaded = loaders(lambda: FakeModel("onnx"))
+    embedding_backends.load_model("onnx-int8")
+    embedding_backends.load_model("onnx-int8")
+    assert loaded == ["torch"]
+
+
+def test_missing_onnxruntime_falls_back_to_torch(loaders):
+    def missing():
+        raise ImportError("No module named 'onnxruntime'")
+
+    loaded = loaders(missing)
+    model = embedding_backends.load_model("onnx-int8")
+    assert embedding_backends.active_backend(model) == "torch"
+    assert loaded == ["torch"]
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        embedding_backends.load_model("tpu")
+
+
+@pytest.mark.parametrize("active", ["torch", "onnx-int8"])
+def test_cache_files_follow_the_loaded_backend(tmp_path, monkeypatch, active):
+    model = FakeModel(active)
+    model.lunartech_backend = active
+    monkeypatch.setattr(config, "EMBEDDING_BACKEND", "onnx-int8")
+    monkeypatch.setattr(embedding_cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(embedding_cache, "VECTORS_PATH", None)
+    monkeypatch.setattr(embedding_cache, "INDEX_DB", None)
+    monkeypatch.setattr(embedding_cache, "_db", None)
+    monkeypatch.setattr(lightrag_service, "get_embedding_model", lambda: model)
+
+    embedding_cache.get_many(["text"])
+    assert embedding_cache.VECTORS_PATH.endswith("_onnx_int8.f32") == (active == "onnx-int8")
+    assert embedding_cache.INDEX_DB.startswith(str(tmp_path))
+    embedding_cache._db.close()
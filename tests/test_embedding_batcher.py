@@ -0,0 +1,89 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import config
+from services import embedding_batcher, lightrag_service
+
+
+def _text(id_, length):
+    """A text whose vector is [id, length] under the stub model."""
+    return f"{id_}:" + "w" * length
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """Stubs the local model; returns the list of batches it encoded."""
+    batches = []
+
+    def encode(texts):
+        batches.append(list(texts))
+        if any("boom" in t for t in texts):
+            raise RuntimeError("CUDA out of memory")
+        return np.array([[float(t.split(":")[0]), len(t)] for t in texts], dtype="float32")
+
+    monkeypatch.setattr(lightrag_service, "_model_encode", encode)
+    monkeypatch.setattr(embedding_batcher, "MAX_WAIT", 0.2)
+    monkeypatch.setattr(embedding_batcher, "MAX_BATCH_TEXTS", 256)
+    monkeypatch.setattr(embedding_batcher, "_stats", dict.fromkeys(embedding_batcher._stats, 0))
+    return batches
+
+
+def test_concurrent_requests_share_one_batch(model):
+    futures = [embedding_batcher.submit([_text(i, 5), _text(i + 100, 1)]) for i in range(5)]
+    results = [f.result(timeout=5) for f in futures]
+
+    assert len(model) == 1 and len(model[0]) == 10
+    for i, vectors in enumerate(results):
+        assert vectors[:, 0].tolist() == [i, i + 100]
+    stats = embedding_batcher.stats()
+    assert stats["requests"] == 5 and stats["batches"] == 1 and stats["max_batch"] == 10
+
+
+def test_results_come_back_in_request_order_after_length_sorting(model):
+    lengths = [40, 3, 25, 1, 12]
+    texts = [_text(i, n) for i, n in enumerate(lengths)]
+
+    vectors = embedding_batcher.encode(texts)
+
+    # The model saw the texts shortest first ...
+    assert [len(t) for t in model[0]] == sorted(len(t) for t in texts)
+    # ... but each caller gets its own texts' vectors back, in its own order
+    assert vectors[:, 0].tolist() == [0, 1, 2, 3, 4]
+    assert vectors[:, 1].tolist() == [len(t) for t in texts]
+
+
+def test_batch_size_is_capped(model, monkeypatch):
+    monkeypatch.setattr(embedding_batcher, "MAX_BATCH_TEXTS", 4)
+    futures = [embedding_batcher.submit([_text(i, 2), _text(i, 3)]) for i in range(3)]
+    for f in futures:
+        f.result(timeout=5)
+
+    assert [len(b) for b in model] == [4, 2]
+
+
+def test_a_failed_batch_fails_every_request_in_it(model):
+    ok = embedding_batcher.submit([_text(1, 2)])
+    bad = embedding_batcher.submit(["boom:"])
+
+    for future in (ok, bad):
+        with pytest.raises(RuntimeError, match="out of memory"):
+            future.result(timeout=5)
+
+
+def test_empty_requests_skip_the_queue(model):
+    vectors = embedding_batcher.encode([])
+    assert vectors.shape == (0, config.EMBEDDING_DIM)
+    assert model == []
+
+
+def test_aencode_awaits_the_shared_batch(model):
+    async def main():
+        return await asyncio.gather(
+            embedding_batcher.aencode([_text(1, 4)]), embedding_batcher.aencode([_text(2, 1)])
+        )
+
+    first, second = asyncio.run(main())
+    assert first[:, 0].tolist() == [1] and second[:, 0].tolist() == [2]
+    assert len(model) == 1
@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pytest
+
+import config
+from services import embedding_cache
+
+DIM = 8
+
+
+def _vectors(n, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype("float32")
+
+
+def _texts(n, prefix="text"):
+    return [f"{prefix} {i}" for i in range(n)]
+
+
+def _reopen(cache):
+    """Drops the in-memory state so the next call reads the files again."""
+    cache._db.close()
+    cache._db = cache._index = cache._vectors = cache._dim = None
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "VECTORS_PATH", str(tmp_path / "embeddings.f32"))
+    monkeypatch.setattr(embedding_cache, "INDEX_DB", str(tmp_path / "embeddings.db"))
+    monkeypatch.setattr(embedding_cache, "INITIAL_ROWS", 4)
+    for name in ("_db", "_index", "_vectors", "_dim"):
+        monkeypatch.setattr(embedding_cache, name, None)
+    monkeypatch.setattr(embedding_cache, "_stats", {"hits": 0, "misses": 0})
+    monkeypatch.setattr(config, "EMBEDDING_CACHE_ENABLED", True)
+    yield embedding_cache
+    if embedding_cache._db is not None:
+        embedding_cache._db.close()
+
+
+def test_memmap_grows_past_initial_rows_and_keeps_old_rows(cache):
+    first, second = _vectors(3, seed=1), _vectors(7, seed=2)
+    cache.put_many(_texts(3, "a"), first)
+    assert cache.stats()["bytes_allocated"] == 4 * DIM * 4
+
+    cache.put_many(_texts(7, "b"), second)  # 10 rows: the file grows to fit them
+
+    assert cache._vectors.shape[0] >= 10
+    assert os.path.getsize(cache.VECTORS_PATH) == cache._vectors.shape[0] * DIM * 4
+    vectors, missing = cache.get_many(_texts(3, "a") + _texts(7, "b"))
+    assert missing == []
+    np.testing.assert_array_equal(np.vstack(vectors), np.vstack([first, second]))
+    assert cache.stats()["items"] == 10
+
+
+def test_reopening_reads_the_sqlite_index_and_vector_file(cache):
+    stored = _vectors(6)
+    cache.put_many(_texts(6), stored)
+    _reopen(cache)
+
+    vectors, missing = cache.get_many(_texts(6) + ["never stored"])
+
+    assert missing == [6]
+    np.testing.assert_array_equal(np.vstack(vectors[:6]), stored)
+    assert cache._dim == DIM
+
+    cache.put_many(["never stored"], _vectors(1, seed=9))  # appends after the reopened rows
+    assert cache._index[cache._hash("never stored")] == 6
+
+
+def test_index_without_its_vector_file_starts_over(cache):
+    cache.put_many(_texts(2), _vectors(2))
+    _reopen(cache)
+    os.remove(cache.VECTORS_PATH)
+
+    _, missing = cache.get_many(_texts(2))
+    assert missing == [0, 1]
+    assert cache.stats()["items"] == 0
+
+
+def test_encode_only_sends_unique_misses(cache):
+    cache.put_many(["known"], _vectors(1))
+    batches = []
+
+    def encode_fn(texts):
+        batches.append(list(texts))
+        return np.full((len(texts), DIM), len(batches), dtype="float32")
+
+    result = cache.encode(["new", "known", "new", "other"], encode_fn)
+
+    assert batches == [["new", "other"]]
+    assert result.shape == (4, DIM)
+    np.testing.assert_array_equal(result[0], result[2])
+    np.testing.assert_array_equal(result[1], _vectors(1)[0])
+
+
+def test_vectors_of_another_dimension_are_not_mixed_in(cache):
+    cache.put_many(["a"], _vectors(1))
+    cache.put_many(["b"], np.ones((1, DIM * 2), dtype="float32"))
+
+    _, missing = cache.get_many(["b"])
+    assert missing == [0]
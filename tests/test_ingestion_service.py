@@ -0,0 +1,160 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+import config
+from services import doc_registry, document_processor, ingestion_service, lightrag_service
+
+
+class FakeInsert:
+    """Stand-in for lightrag_service.submit_insert; each insert waits for `go`, then for `finish`."""
+
+    def __init__(self):
+        self.go = threading.Event()
+        self.finish = threading.Event()
+        self.finish.set()
+        self.started = threading.Event()
+        self.texts = []
+        self.error = None
+
+    def __call__(self, text, observer=None, should_start=None):
+        future = Future()
+
+        def run():
+            self.go.wait(5)
+            if should_start is not None and not should_start():
+                future.set_result(False)
+                return
+            self.started.set()
+            self.finish.wait(5)
+            if self.error:
+                future.set_exception(self.error)
+                return
+            self.texts.append(text)
+            future.set_result(True)
+
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+
+@pytest.fixture
+def ingest(monkeypatch):
+    monkeypatch.setattr(config, "INGEST_WORKERS", 1)
+    monkeypatch.setattr(ingestion_service, "_queue", queue.Queue(maxsize=2))
+    monkeypatch.setattr(ingestion_service, "_jobs", {})
+    monkeypatch.setattr(ingestion_service, "_workers", [])
+    monkeypatch.setattr(
+        document_processor,
+        "extract_text",
+        lambda file_obj, filename: {"full_text": file_obj.read().decode(), "page_count": 1},
+    )
+    monkeypatch.setattr(document_processor, "document_quality_score", lambda result: {})
+    commits = []
+    monkeypatch.setattr(
+        doc_registry,
+        "plan",
+        lambda data, text: {
+            "file_hash": str(hash(data)),
+            "new_chunks": [] if text == "unchanged" else [text],
+            "chunk_hashes": ["h"],
+            "skipped_chunks": 0,
+        },
+    )
+    monkeypatch.setattr(doc_registry, "commit", lambda report, filename: commits.append(filename))
+    insert = FakeInsert()
+    monkeypatch.setattr(lightrag_service, "submit_insert", insert)
+    insert.go.set()
+    yield ingestion_service, insert, commits
+    insert.go.set()
+    insert.finish.set()
+    ingestion_service._queue.join()  # the worker finishes before the patches are undone
+
+
+def _wait(job_id, *statuses):
+    for _ in range(500):
+        job = ingestion_service.get_job(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job stuck in {job['status']}")
+
+
+def test_job_completes_after_the_insert_and_commits_the_registry(ingest):
+    service, insert, commits = ingest
+    job = _wait(service.submit("a.txt", b"alpha text"), "completed")
+
+    assert insert.texts == ["alpha text"]
+    assert commits == ["a.txt"]
+    assert job["progress"] == pytest.approx(1.0)
+    assert job["result"]["chunk_count"] >= 1
+    assert "_cancel" not in job
+
+
+def test_unchanged_document_skips_the_insert(ingest):
+    service, insert, commits = ingest
+    _wait(service.submit("a.txt", b"unchanged"), "completed")
+    assert insert.texts == [] and commits == []
+
+
+def test_failed_insert_does_not_commit(ingest):
+    service, insert, commits = ingest
+    insert.error = RuntimeError("LightRAG has not processed the document yet (status: pending)")
+    job = _wait(service.submit("a.txt", b"alpha"), "failed")
+
+    assert "not processed" in job["error"]
+    assert commits == []
+
+
+def test_cancel_before_the_insert_turn(ingest):
+    service, insert, commits = ingest
+    insert.go.clear()  # the pipeline is busy
+    job_id = service.submit("a.txt", b"alpha")
+    _wait(job_id, "running")
+
+    assert service.cancel(job_id) is True
+    insert.go.set()
+    _wait(job_id, "cancelled")
+    assert insert.texts == [] and commits == []
+
+
+def test_running_insert_cannot_be_cancelled(ingest):
+    service, insert, commits = ingest
+    insert.finish.clear()
+    job_id = service.submit("a.txt", b"alpha")
+    assert insert.started.wait(5)
+
+    assert service.get_job(job_id)["cancellable"] is False
+    assert service.cancel(job_id) is False
+    insert.finish.set()
+    _wait(job_id, "completed")
+    assert commits == ["a.txt"]
+
+
+def test_cancel_queued_job(ingest):
+    service, insert, commits = ingest
+    insert.finish.clear()
+    first = service.submit("a.txt", b"alpha")
+    assert insert.started.wait(5)
+    second = service.submit("b.txt", b"beta")
+
+    assert service.cancel(second) is True
+    assert service.get_job(second)["status"] == "cancelled"
+    insert.finish.set()
+    _wait(first, "completed")
+    time.sleep(0.05)
+    assert insert.texts == ["alpha"]
+    assert commits == ["a.txt"]
+
+
+def test_full_queue_rejects_uploads(ingest):
+    service, insert, commits = ingest
+    insert.finish.clear()
+    service.submit("a.txt", b"alpha")
+    assert insert.started.wait(5)
+    service.submit("b.txt", b"beta")
+    service.submit("c.txt", b"gamma")
+    with pytest.raises(RuntimeError, match="queue is full"):
+        service.submit("d.txt", b"delta")
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from services import lightrag_service
+
+
+class FakeRAG:
+    def __init__(self, status="processed"):
+        self.status = status
+        self.running = 0
+        self.max_running = 0
+        self.inserted = []
+
+    async def ainsert(self, text):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.05)
+        self.running -= 1
+        self.inserted.append(text)
+        return f"track-{len(self.inserted)}"
+
+    async def aget_docs_by_track_id(self, track_id):
+        return {f"doc-{track_id}": {"status": self.status}}
+
+
+@pytest.fixture
+def rag(monkeypatch):
+    fake = FakeRAG()
+    bumps = []
+
+    async def initialized(rag):
+        pass
+
+    monkeypatch.setattr(lightrag_service, "get_rag", lambda: fake)
+    monkeypatch.setattr(lightrag_service, "_ensure_initialized_async", initialized)
+    monkeypatch.setattr(lightrag_service, "_bump_graph_version", lambda: bumps.append(1))
+    fake.bumps = bumps
+    return fake
+
+
+def test_inserts_run_one_at_a_time(rag):
+    futures = [lightrag_service.submit_insert(f"doc {i}") for i in range(3)]
+    assert [f.result(5) for f in futures] == [True, True, True]
+    assert rag.max_running == 1
+    assert sorted(rag.inserted) == ["doc 0", "doc 1", "doc 2"]
+    assert len(rag.bumps) == 3
+
+
+def test_unprocessed_document_fails_the_insert(rag):
+    rag.status = "pending"  # another process held LightRAG's pipeline
+    with pytest.raises(RuntimeError, match="pending"):
+        lightrag_service.submit_insert("doc").result(5)
+    assert rag.bumps == [1]
+
+
+def test_should_start_false_skips_the_insert(rag):
+    assert lightrag_service.submit_insert("doc", should_start=lambda: False).result(5) is False
+    assert rag.inserted == [] and rag.bumps == []
+
+
+def test_observer_sees_only_its_own_insert(rag, monkeypatch):
+    events = {"a": [], "b": []}
+
+    async def ainsert(text):
+        await asyncio.sleep(0.01)
+        lightrag_service._notify_ingest("llm")
+        return None
+
+    monkeypatch.setattr(rag, "ainsert", ainsert)
+    futures = [
+        lightrag_service.submit_insert(name, observer=lambda e, n, name=name: events[name].append(e))
+        for name in events
+    ]
+    for f in futures:
+        f.result(5)
+    assert events == {"a": ["llm"], "b": ["llm"]}
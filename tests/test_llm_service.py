@@ -0,0 +1,254 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import config
+from services import cache_service, llm_service, rate_limiter
+
+
+def _response(content, tool_calls=None, total=30):
+    message = SimpleNamespace(content=content, tool_calls=tool_calls)
+    usage = SimpleNamespace(prompt_tokens=total - 10, completion_tokens=10, total_tokens=total)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def _chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+def _tool_chunk(index, id=None, name=None, arguments=None, finish_reason=None):
+    function = SimpleNamespace(name=name, arguments=arguments)
+    call = SimpleNamespace(index=index, id=id, function=function)
+    delta = SimpleNamespace(content=None, tool_calls=[call])
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)])
+
+
+def _text_chunk(content, finish_reason=None):
+    delta = SimpleNamespace(content=content, tool_calls=None)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)])
+
+
+class FakeStream:
+    """A sync provider stream that records whether it was closed."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAsyncClient:
+    """Stands in for AsyncOpenAI: records create() kwargs and replays a response or stream."""
+
+    def __init__(self, response=None, chunks=()):
+        self.response = response
+        self.chunks = list(chunks)
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, stream=False, **kwargs):
+        self.calls.append(dict(kwargs, stream=stream))
+        if not stream:
+            return self.response
+
+        async def _stream():
+            for chunk in self.chunks:
+                yield chunk
+
+        return _stream()
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_providers", {})
+    monkeypatch.setattr(llm_service, "_token_usage", dict.fromkeys(llm_service._token_usage, 0))
+    monkeypatch.setattr(cache_service, "get", lambda *a, **k: None)
+    monkeypatch.setattr(cache_service, "put", lambda *a, **k: None)
+    return llm_service
+
+
+@pytest.fixture
+def install(monkeypatch):
+    """Routes get_async_client to a fake; returns the (model, provider) it was asked for."""
+
+    def _install(client):
+        seen = {}
+
+        def get_async_client(model=None, provider=None):
+            seen.update(model=model, provider=provider)
+            return client
+
+        monkeypatch.setattr(llm_service, "get_async_client", get_async_client)
+        return seen
+
+    return _install
+
+
+def test_resolve_routes_models_to_providers(monkeypatch):
+    monkeypatch.setattr(config, "OLLAMA_BASE_URL", "http://ollama/v1")
+    monkeypatch.setattr(config, "GEMINI_BASE_URL", "http://gemini/v1")
+    monkeypatch.setattr(config, "GEMINI_API_KEY", "g-key")
+    monkeypatch.setattr(config, "OPENROUTER_BASE_URL", "http://openrouter/v1")
+    monkeypatch.setattr(config, "OPENROUTER_API_KEY", "or-key")
+
+    assert llm_service._resolve("ollama/qwen2.5:3b") == (
+        "ollama", "http://ollama/v1", "ollama", llm_service.OLLAMA_TIMEOUT, "qwen2.5:3b"
+    )
+    assert llm_service._resolve("google/gemini-2.0-flash", "gemini") == (
+        "gemini", "http://gemini/v1", "g-key", llm_service.DEFAULT_TIMEOUT, "gemini-2.0-flash"
+    )
+    assert llm_service._resolve("google/gemini-2.0-flash") == (
+        "openrouter", "http://openrouter/v1", "or-key", llm_service.DEFAULT_TIMEOUT,
+        "google/gemini-2.0-flash",
+    )
+    # A forced provider wins over the model prefix
+    assert llm_service._resolve("ollama/qwen2.5:3b", "ollama")[0] == "ollama"
+    assert llm_service.provider_of("x-ai/grok-3") == "openrouter"
+
+
+def test_achat_completion_sends_provider_model_id_and_tracks_usage(llm, install):
+    client = FakeAsyncClient(_response("hello", total=42))
+    seen = install(client)
+
+    result = asyncio.run(
+        llm.achat_completion(
+            [{"role": "user", "content": "hi"}],
+            model="ollama/qwen2.5:3b",
+            temperature=0.7,
+            provider="ollama",
+        )
+    )
+
+    assert result == "hello"
+    assert seen == {"model": "ollama/qwen2.5:3b", "provider": "ollama"}
+    [call] = client.calls
+    assert call["model"] == "qwen2.5:3b"
+    assert "timeout" not in call  # the pooled client's timeout applies
+    assert llm.get_token_usage()["total"] == 42
+    assert rate_limiter.stats()["ollama"]["in_flight"] == 0
+
+
+def test_achat_completion_forwards_a_timeout_override(llm, install):
+    client = FakeAsyncClient(_response("ok"))
+    install(client)
+
+    asyncio.run(
+        llm.achat_completion(
+            [{"role": "user", "content": "hi"}], model="x-ai/grok-3", use_cache=False, timeout=600
+        )
+    )
+
+    assert client.calls[0]["timeout"] == 600
+
+
+def test_achat_completion_returns_the_message_for_tool_calls(llm, install):
+    tool_calls = [SimpleNamespace(id="call-1")]
+    install(FakeAsyncClient(_response(None, tool_calls=tool_calls)))
+
+    message = asyncio.run(
+        llm.achat_completion(
+            [{"role": "user", "content": "search"}],
+            model="x-ai/grok-3",
+            tools=[{"type": "function"}],
+        )
+    )
+
+    assert message.tool_calls is tool_calls
+
+
+def test_lightrag_llm_func_uses_the_lightrag_timeout(llm, install, monkeypatch):
+    monkeypatch.setattr(config, "LIGHTRAG_LLM_TIMEOUT", 321.0)
+    client = FakeAsyncClient(_response("entities"))
+    install(client)
+
+    result = asyncio.run(
+        llm.lightrag_llm_func("extract", system_prompt="sys", model="x-ai/grok-3", max_tokens=64)
+    )
+
+    assert result == "entities"
+    [call] = client.calls
+    assert call["timeout"] == 321.0
+    assert [m["role"] for m in call["messages"]] == ["system", "user"]
+
+
+def test_astream_completion_yields_deltas_and_releases_the_slot(llm, install):
+    client = FakeAsyncClient(chunks=[_chunk("Hel"), _chunk(None), _chunk("lo"), SimpleNamespace(choices=[])])
+    install(client)
+
+    async def collect():
+        return [
+            text
+            async for text in llm.astream_completion(
+                [{"role": "user", "content": "hi"}], model="x-ai/grok-3"
+            )
+        ]
+
+    assert asyncio.run(collect()) == ["Hel", "lo"]
+    assert client.calls[0]["stream"] is True
+    assert rate_limiter.stats()["openrouter"]["in_flight"] == 0
+
+
+@pytest.fixture
+def stream(llm, monkeypatch):
+    """Routes get_client to a fake whose create() replays the given chunks."""
+    monkeypatch.setattr(llm_service, "_stream_ttft", {"streams": 0, "ttft_s": 0.0})
+
+    def _install(chunks):
+        fake = FakeStream(chunks)
+        client = SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(create=lambda stream, **kwargs: fake))
+        )
+        monkeypatch.setattr(llm_service, "get_client", lambda model=None: client)
+        return fake
+
+    return _install
+
+
+def test_stream_events_assembles_tool_call_deltas(stream):
+    fake = stream(
+        [
+            _text_chunk("Let me look."),
+            _tool_chunk(0, id="call-a", name="read_file", arguments='{"file'),
+            _tool_chunk(1, id="call-b", name="execute_bash", arguments=""),
+            _tool_chunk(0, arguments='path": "a.py"}'),
+            _tool_chunk(1, arguments='{"command": "ls"}', finish_reason="tool_calls"),
+            SimpleNamespace(choices=[]),
+        ]
+    )
+
+    events = list(llm_service.stream_events([{"role": "user", "content": "hi"}], model="x-ai/grok-3"))
+
+    deltas = [e for e in events if e["type"] == "tool_call_delta"]
+    assert [(d["index"], d["id"], d["name"]) for d in deltas] == [
+        (0, "call-a", "read_file"),
+        (1, "call-b", "execute_bash"),
+        (0, None, None),
+        (1, None, None),
+    ]
+    done = events[-1]
+    assert done["type"] == "done" and done["content"] == "Let me look."
+    assert done["finish_reason"] == "tool_calls"
+    assert done["tool_calls"] == [
+        {"id": "call-a", "type": "function", "function": {"name": "read_file", "arguments": '{"filepath": "a.py"}'}},
+        {"id": "call-b", "type": "function", "function": {"name": "execute_bash", "arguments": '{"command": "ls"}'}},
+    ]
+    assert done["ttft_s"] is not None
+    assert fake.closed
+    assert rate_limiter.stats()["openrouter"]["in_flight"] == 0
+
+
+def test_stream_events_releases_the_stream_when_the_consumer_stops(stream):
+    fake = stream([_text_chunk("a"), _text_chunk("b")])
+
+    events = llm_service.stream_events([{"role": "user", "content": "hi"}], model="x-ai/grok-3")
+    assert next(events) == {"type": "chunk", "text": "a"}
+    events.close()
+
+    assert fake.closed
+    assert rate_limiter.stats()["openrouter"]["in_flight"] == 0
@@ -0,0 +1,84 @@
+import pytest
+
+from core import longwriter
+from services import handbook_service, lightrag_service
+
+PLAN = [
+    {"title": "Basics", "rag_query": "basics of graphs", "target_words": 50},
+    {"title": "Storage", "rag_query": "graph storage", "target_words": 50},
+    {"title": "Summary", "rag_query": "", "target_words": 50},
+]
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    """Stubs the planner and section writer; records what each section was given."""
+    written = []
+
+    def write_section(topic, section, context, previous_sections=None, model=None, section_context=None):
+        written.append({"title": section["title"], "section_context": section_context})
+        return f"## {section['title']}\n\n" + "word " * 10
+
+    monkeypatch.setattr(longwriter, "create_plan", lambda **kwargs: [dict(s) for s in PLAN])
+    monkeypatch.setattr(longwriter, "write_section", write_section)
+    return written
+
+
+def test_sections_get_their_own_rag_context(writer):
+    events = []
+
+    def rag_query_func(query):
+        events.append(("query", query))
+        return f"context for {query}"
+
+    rag_query_func.prefetch = lambda queries: events.append(("prefetch", queries))
+    shown = []
+
+    result = longwriter.generate_handbook(
+        "Graphs", "general context", rag_query_func=rag_query_func, section_callback=shown.append
+    )
+
+    # Every section query is prefetched once, before the first section asks
+    assert events[0] == ("prefetch", ["basics of graphs", "graph storage", ""])
+    assert events[1:] == [("query", "basics of graphs"), ("query", "graph storage")]
+    assert [w["section_context"] for w in writer] == [
+        "context for basics of graphs",
+        "context for graph storage",
+        None,
+    ]
+    assert [s["title"] for s in shown] == ["Basics", "Storage", "Summary"]
+    assert result["section_count"] == 3
+
+
+def test_failing_rag_queries_do_not_stop_the_handbook(writer):
+    def rag_query_func(query):
+        raise RuntimeError("graph unavailable")
+
+    result = longwriter.generate_handbook("Graphs", "general context", rag_query_func=rag_query_func)
+
+    assert result["section_count"] == 3
+    assert all(w["section_context"] is None for w in writer)
+
+
+def test_rag_query_func_serves_prefetched_results(monkeypatch):
+    batches, single = [], []
+
+    def query_many(queries, mode="hybrid"):
+        batches.append((list(queries), mode))
+        return [None if q == "empty" else f"ctx:{q}" for q in queries]
+
+    def get_rag_context(query, mode="hybrid"):
+        single.append((query, mode))
+        return f"live:{query}"
+
+    monkeypatch.setattr(lightrag_service, "query_many", query_many)
+    monkeypatch.setattr(lightrag_service, "get_rag_context", get_rag_context)
+
+    rag_query_func = handbook_service.make_rag_query_func("local")
+    rag_query_func.prefetch(["a", "b", "a", "", "empty"])
+    rag_query_func.prefetch(["a"])  # nothing new to fetch
+
+    assert batches == [(["a", "b", "empty"], "local")]
+    assert rag_query_func("a") == "ctx:a"
+    assert rag_query_func("empty") == "live:empty"  # failed prefetches are retried live
+    assert single == [("empty", "local")]
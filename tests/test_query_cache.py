@@ -0,0 +1,71 @@
+from collections import OrderedDict
+
+import pytest
+
+import config
+from services import query_cache
+
+NO_CONTEXT = "Sorry, I'm not able to provide an answer to that question.[no-context]"
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(query_cache, "QUERY_CACHE_DB", str(tmp_path / "rag_query_cache.db"))
+    monkeypatch.setattr(query_cache, "_db", None)
+    monkeypatch.setattr(query_cache, "_memory_cache", OrderedDict())
+    monkeypatch.setattr(query_cache, "_stats", {})
+    monkeypatch.setattr(config, "DEFAULT_MODEL", "ollama/qwen2.5:3b")
+    yield query_cache
+    if query_cache._db is not None:
+        query_cache._db.close()
+
+
+def test_hits_come_from_memory_then_disk(cache, monkeypatch):
+    cache.put("what is lightrag?", "hybrid", 3, "A graph RAG library.")
+    assert cache.get("what is lightrag? ", "hybrid", 3) == "A graph RAG library."
+
+    monkeypatch.setattr(query_cache, "_memory_cache", OrderedDict())
+    assert cache.get("what is lightrag?", "hybrid", 3) == "A graph RAG library."
+    assert cache.stats()["modes"]["hybrid"] == {
+        "hits_memory": 1,
+        "hits_disk": 1,
+        "misses": 0,
+        "hit_rate": 1.0,
+    }
+
+
+@pytest.mark.parametrize("value", ["", "   \n", None, NO_CONTEXT])
+def test_empty_and_no_context_results_are_not_cached(cache, value):
+    cache.put("q", "hybrid", 1, value)
+
+    assert cache.get("q", "hybrid", 1) is None
+    assert cache.stats()["memory_items"] == 0
+    assert cache._get_db().execute("SELECT COUNT(*) FROM queries").fetchone()[0] == 0
+
+
+def test_key_includes_the_models(cache, monkeypatch):
+    cache.put("q", "hybrid", 1, "answer from qwen")
+
+    monkeypatch.setattr(config, "DEFAULT_MODEL", "google/gemini-2.0-flash")
+    assert cache.get("q", "hybrid", 1) is None
+    monkeypatch.setattr(config, "DEFAULT_MODEL", "ollama/qwen2.5:3b")
+    monkeypatch.setattr(config, "EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+    assert cache.get("q", "hybrid", 1) is None
+
+
+def test_mode_and_graph_version_are_separate_entries(cache):
+    cache.put("q", "hybrid", 1, "v1 answer")
+    cache.put("q", "context:hybrid", 1, "{}")
+    cache.put("q", "hybrid", 2, "v2 answer")
+    cache.invalidate_before(2)
+
+    assert cache.get("q", "hybrid", 1) is None
+    assert cache.get("q", "context:hybrid", 1) is None
+    assert cache.get("q", "hybrid", 2) == "v2 answer"
+
+
+def test_expired_entries_are_misses(cache, monkeypatch):
+    cache.put("q", "hybrid", 1, "answer")
+    monkeypatch.setattr(query_cache, "QUERY_TTL", -1)
+
+    assert cache.get("q", "hybrid", 1) is None
@@ -0,0 +1,91 @@
+import asyncio
+from collections import OrderedDict
+
+import pytest
+
+from services import lightrag_service, query_cache, reranker
+
+
+class FakeRAG:
+    """aquery_data/aquery stand-ins that track concurrency and can fail or hang per question."""
+
+    def __init__(self):
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+    async def _run(self, question):
+        self.calls.append(question)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(0.05)
+            if "fail" in question:
+                raise RuntimeError("extraction failed")
+            if "hang" in question:
+                await asyncio.sleep(10)
+        finally:
+            self.running -= 1
+
+    async def aquery_data(self, question, param=None):
+        await self._run(question)
+        chunk = {"content": f"[Page 1] passage about {question}"}
+        return {"data": {"entities": [], "relationships": [], "chunks": [chunk]}}
+
+    async def aquery(self, question, param=None):
+        await self._run(question)
+        return f"answer about {question}"
+
+
+@pytest.fixture
+def rag(tmp_path, monkeypatch):
+    fake = FakeRAG()
+
+    async def initialized(rag):
+        pass
+
+    monkeypatch.setattr(lightrag_service, "get_rag", lambda: fake)
+    monkeypatch.setattr(lightrag_service, "_ensure_initialized_async", initialized)
+    monkeypatch.setattr(lightrag_service, "get_graph_version", lambda: 1)
+    monkeypatch.setattr(reranker, "enabled", lambda: False)
+    monkeypatch.setattr(query_cache, "QUERY_CACHE_DB", str(tmp_path / "rag_query_cache.db"))
+    monkeypatch.setattr(query_cache, "_db", None)
+    monkeypatch.setattr(query_cache, "_memory_cache", OrderedDict())
+    monkeypatch.setattr(query_cache, "_stats", {})
+    yield fake
+    if query_cache._db is not None:
+        query_cache._db.close()
+
+
+def test_results_keep_input_order_under_the_concurrency_cap(rag):
+    questions = [f"topic {i}" for i in range(6)] + ["topic 2"]
+    results = lightrag_service.query_many(questions, context_only=True, concurrency=2)
+
+    assert [r.split("passage about ")[1] for r in results] == questions
+    assert sorted(rag.calls) == sorted(set(questions))  # the duplicate is fetched once
+    assert rag.max_running == 2
+
+
+def test_cached_questions_are_not_fetched_again(rag):
+    first = lightrag_service.query_many(["a", "b"], context_only=True)
+    second = lightrag_service.query_many(["b", "c", "a"], context_only=True)
+
+    assert rag.calls.count("a") == rag.calls.count("b") == 1
+    assert second == [first[1], second[1], first[0]]
+
+
+def test_failed_and_timed_out_queries_give_none(rag):
+    results = lightrag_service.query_many(["ok", "fail", "hang"], context_only=True, timeout=0.3)
+
+    assert results[0].endswith("passage about ok")
+    assert results[1:] == [None, None]
+    # Failures are not cached, so they are retried next time
+    lightrag_service.query_many(["fail"], context_only=True, timeout=0.3)
+    assert rag.calls.count("fail") == 2
+
+
+def test_answer_mode_uses_lightrag_answers(rag):
+    results = lightrag_service.query_many(["a", "b"], context_only=False)
+
+    assert results == ["answer about a", "answer about b"]
+    assert query_cache.get("a", "hybrid", 1) == "answer about a"
@@ -0,0 +1,91 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import config
+from services import rate_limiter
+from services.rate_limiter import _Bucket
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, headers):
+        super().__init__("429 Too Many Requests")
+        self.response = SimpleNamespace(headers=headers)
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_providers", {})
+    monkeypatch.setattr(config, "RATE_LIMITS", {"test": {"rpm": 60, "tpm": 0, "concurrency": 2}})
+    monkeypatch.setattr(config, "RATE_LIMIT_DEFAULT_BACKOFF", 7.0)
+    return rate_limiter
+
+
+def test_bucket_refills_at_its_rate():
+    bucket = _Bucket(60)  # 1 token/second
+    now = bucket.updated
+    bucket.take(60)
+    assert bucket.delay(1, now) == pytest.approx(1.0)
+    assert bucket.delay(1, now + 0.5) == pytest.approx(0.5)
+    assert bucket.delay(1, now + 1.0) == 0.0
+    assert bucket.delay(60, now + 1000) == 0.0
+    assert bucket.tokens == 60  # capped at capacity
+
+
+def test_bucket_request_above_capacity_waits_for_a_full_bucket():
+    bucket = _Bucket(60)
+    now = bucket.updated
+    assert bucket.delay(500, now) == 0.0
+    bucket.take(500)
+    assert bucket.tokens == 0
+    assert bucket.delay(500, now) == pytest.approx(60.0)
+
+
+def test_bucket_give_refunds_up_to_capacity():
+    bucket = _Bucket(120)
+    bucket.take(100)
+    bucket.give(30)
+    assert bucket.tokens == pytest.approx(50, abs=0.1)
+    bucket.give(1000)
+    assert bucket.tokens == 120
+
+
+def test_rpm_limit_queues_the_next_request(limiter):
+    limiter.release(limiter.acquire("test"))
+    provider = limiter._get_provider("test")
+    provider.rpm.tokens = 0
+    assert limiter._try("test", 0) == pytest.approx(1.0, abs=0.05)
+
+
+def test_concurrency_cap(limiter):
+    limiter.acquire("test")
+    limiter.acquire("test")
+    assert limiter._try("test", 0) == rate_limiter.POLL_INTERVAL
+
+
+def test_retry_after_pauses_the_provider(limiter):
+    lease = limiter.acquire("test")
+    limiter.release(lease, RateLimited({"retry-after": "2"}))
+
+    wait = limiter._try("test", 0)
+    assert 1.5 < wait <= 2.0
+    assert limiter.stats()["test"]["rate_limited_429"] == 1
+    assert limiter.stats()["test"]["in_flight"] == 0
+
+
+def test_retry_after_parsing(limiter):
+    assert limiter._retry_after(RateLimited({"Retry-After": "3"})) == 3.0
+    assert limiter._retry_after(RateLimited({})) == 7.0
+    assert limiter._retry_after(RateLimited({"retry-after": "Wed, 21 Oct 2026 07:28:00 GMT"})) == 7.0
+    assert limiter._retry_after(ValueError("boom")) is None
+    assert limiter._retry_after(ConnectionError("connect failed on port 4290 (429 tries)")) is None
+
+
+def test_other_errors_do_not_pause(limiter):
+    lease = limiter.acquire("test")
+    limiter.release(lease, ValueError("boom"))
+    assert limiter._get_provider("test").blocked_until < time.monotonic()
+    assert limiter._try("test", 0) == 0.0
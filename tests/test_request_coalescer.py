@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+
+from services import request_coalescer
+
+
+def _run_together(key, fn, n):
+    """Calls do(key, fn) from n threads; returns (results, errors)."""
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(request_coalescer.do(key, fn))
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+
+def _leader(release: threading.Event, calls: list, outcome):
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    return fn
+
+
+def _wait_for_followers(n):
+    for _ in range(500):
+        if request_coalescer._stats["coalesced"] >= n:
+            return
+        time.sleep(0.01)
+
+
+def test_followers_share_the_leaders_result(monkeypatch):
+    monkeypatch.setattr(request_coalescer, "_stats", {"leaders": 0, "coalesced": 0})
+    release, calls, result = threading.Event(), [], {"answer": 42}
+    threads, results, errors = _run_together("k", _leader(release, calls, result), 5)
+    _wait_for_followers(4)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert calls == [1]
+    assert errors == []
+    assert len(results) == 5 and all(r is result for r in results)
+    assert request_coalescer.stats() == {"leaders": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_followers_see_the_leaders_exception(monkeypatch):
+    monkeypatch.setattr(request_coalescer, "_stats", {"leaders": 0, "coalesced": 0})
+    release, calls, error = threading.Event(), [], RuntimeError("upstream down")
+    threads, results, errors = _run_together("k", _leader(release, calls, error), 3)
+    _wait_for_followers(2)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert calls == [1]
+    assert results == []
+    assert len(errors) == 3 and all(e is error for e in errors)
+
+
+class Rerun(BaseException):
+    """Stands in for Streamlit's RerunException, which is not an Exception."""
+
+
+def test_followers_are_released_when_the_leader_is_interrupted(monkeypatch):
+    monkeypatch.setattr(request_coalescer, "_stats", {"leaders": 0, "coalesced": 0})
+    release, calls, error = threading.Event(), [], Rerun()
+    threads, results, errors = _run_together("k", _leader(release, calls, error), 3)
+    _wait_for_followers(2)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert not any(t.is_alive() for t in threads)
+    assert len(errors) == 3 and all(e is error for e in errors)
+    assert request_coalescer.stats()["in_flight"] == 0
+
+
+def test_sequential_calls_are_not_coalesced():
+    calls = []
+    request_coalescer.do("seq", lambda: calls.append(1))
+    request_coalescer.do("seq", lambda: calls.append(1))
+    assert calls == [1, 1]
+
+
+def test_async_followers_share_result_and_exception():
+    calls = []
+
+    async def ok():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def boom():
+        await asyncio.sleep(0.05)
+        raise ValueError("bad")
+
+    async def main():
+        assert await asyncio.gather(*(request_coalescer.ado("a", ok) for _ in range(4))) == ["done"] * 4
+        outcomes = await asyncio.gather(
+            *(request_coalescer.ado("b", boom) for _ in range(3)), return_exceptions=True
+        )
+        assert all(isinstance(e, ValueError) for e in outcomes)
+
+    asyncio.run(main())
+    assert calls == [1]
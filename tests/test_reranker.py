@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+import pytest
+
+import config
+from services import reranker
+from services.lightrag_service import RetrievalResult
+from utils import tokens
+
+
+class FakeModel:
+    """Scores a passage by the number after "score=" in it; optionally slow per batch."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+
+    def predict(self, pairs, batch_size=None, show_progress_bar=False):
+        self.batches.append([p for _, p in pairs])
+        time.sleep(self.delay)
+        return [float(p.split("score=")[1].split()[0]) for _, p in pairs]
+
+
+def _chunk(name, score, words=1):
+    return {"content": f"{name} score={score} " + " ".join(["w"] * words)}
+
+
+def _names(result):
+    return [c["content"].split()[0] for c in result.chunks]
+
+
+@pytest.fixture
+def model(monkeypatch):
+    fake = FakeModel()
+    monkeypatch.setattr(reranker, "_model", fake)
+    monkeypatch.setattr(reranker, "_cache", OrderedDict())
+    monkeypatch.setattr(reranker, "_turns", deque(maxlen=reranker.MAX_TURNS))
+    monkeypatch.setattr(reranker, "_counters", dict.fromkeys(reranker._counters, 0))
+    monkeypatch.setattr(config, "RERANK_BATCH_SIZE", 2)
+    monkeypatch.setattr(config, "RERANK_MAX_MS", 10_000)
+    # One token per whitespace-separated word
+    monkeypatch.setattr(tokens, "count_many", lambda texts, model=None: [len(t.split()) for t in texts])
+    return fake
+
+
+def test_items_are_ordered_best_first(model):
+    result = RetrievalResult(
+        question="q", mode="hybrid", chunks=[_chunk("a", 0.1), _chunk("b", 0.9), _chunk("c", 0.5)]
+    )
+    reranked = reranker.rerank("q", result, token_budget=100)
+
+    assert _names(reranked) == ["b", "c", "a"]
+    assert reranker.stats()["turns"] == 1
+
+
+def test_time_cap_keeps_the_unscored_tail_in_retrieval_order(model, monkeypatch):
+    model.delay = 0.05
+    monkeypatch.setattr(config, "RERANK_MAX_MS", 20)  # only the first batch fits
+    chunks = [_chunk(name, score) for name, score in zip("abcdef", [0.1, 0.9, 0.8, 0.7, 0.2, 0.95])]
+
+    reranked = reranker.rerank("q", RetrievalResult(question="q", mode="hybrid", chunks=chunks), 100)
+
+    assert len(model.batches) == 1
+    # a and b were scored and sorted; c-f were never scored and stay in order
+    assert _names(reranked) == ["b", "a", "c", "d", "e", "f"]
+    assert reranker.stats()["capped"] == 1
+
+
+def test_cached_scores_are_reused_on_the_next_turn(model):
+    chunks = [_chunk("a", 0.1), _chunk("b", 0.9)]
+    reranker.rerank("q", RetrievalResult(question="q", mode="hybrid", chunks=list(chunks)), 100)
+    reranker.rerank("q", RetrievalResult(question="q", mode="hybrid", chunks=list(chunks)), 100)
+
+    assert len(model.batches) == 1
+    assert reranker.stats()["cache_hit_rate"] == 0.5
+
+
+def test_budget_drops_items_that_do_not_fit(model):
+    result = RetrievalResult(
+        question="q",
+        mode="hybrid",
+        chunks=[_chunk("a", 0.9, words=8), _chunk("b", 0.8, words=20), _chunk("c", 0.1, words=3)],
+        entities=[{"entity_name": "E", "description": "score=0.5"}],
+    )
+    reranked = reranker.rerank("q", result, token_budget=20)
+
+    # a (10 tokens), the entity (2) and c (5) fit; b (22) does not
+    assert _names(reranked) == ["a", "c"]
+    assert [e["entity_name"] for e in reranked.entities] == ["E"]
+    assert reranked.tokens == 17
+    assert reranker.stats()["last"]["saved"] == 22
+
+
+def test_raw_context_and_loading_model_are_skipped(model, monkeypatch):
+    raw = RetrievalResult(question="q", mode="hybrid", raw_context="pre-rendered")
+    assert reranker.rerank("q", raw) is raw
+
+    monkeypatch.setattr(reranker, "_model", None)
+    monkeypatch.setattr(reranker, "_model_thread", object())  # load already in progress
+    result = RetrievalResult(question="q", mode="hybrid", chunks=[_chunk("a", 0.1)])
+    assert reranker.rerank("q", result) is result
+
+    assert reranker.stats()["skipped"] == 2 and model.batches == []
+
+
+def test_counters_add_up_across_threads(model):
+    def turn():
+        for _ in range(50):
+            reranker.rerank("q", RetrievalResult(question="q", mode="hybrid", chunks=[_chunk("a", 0.1)]), 100)
+
+    threads = [threading.Thread(target=turn) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = reranker.stats()
+    assert stats["turns"] == 200
+    assert stats["cache_hit_rate"] == pytest.approx(199 / 200, abs=0.02)
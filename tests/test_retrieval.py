@@ -0,0 +1,135 @@
+from collections import OrderedDict
+
+import pytest
+
+from services import lightrag_service, query_cache
+from services.lightrag_service import RetrievalResult, _pack_budget
+from utils import tokens
+
+
+def _chunk(page, words):
+    return {"content": f"[Page {page}] " + " ".join(["word"] * words)}
+
+
+def _entity(name, words):
+    return {"entity_name": name, "entity_type": "concept", "description": " ".join(["d"] * words)}
+
+
+def _relation(src, tgt):
+    return {"src_id": src, "tgt_id": tgt, "description": "uses"}
+
+
+@pytest.fixture
+def word_tokens(monkeypatch):
+    """One token per whitespace-separated word."""
+    monkeypatch.setattr(tokens, "count", lambda text, model=None: len(text.split()))
+    monkeypatch.setattr(tokens, "count_many", lambda texts, model=None: [len(t.split()) for t in texts])
+    monkeypatch.setattr(
+        tokens,
+        "truncate_to_tokens",
+        lambda text, max_tokens, model=None, suffix="": " ".join(text.split()[:max_tokens]),
+    )
+
+
+def test_to_context_renders_sections_and_keeps_page_markers():
+    result = RetrievalResult(
+        question="q",
+        mode="hybrid",
+        entities=[_entity("LightRAG", 2)],
+        relations=[_relation("LightRAG", "Graph")],
+        chunks=[_chunk(3, 2), _chunk(7, 1)],
+    )
+    context = result.to_context()
+
+    assert context.index("## Entities") < context.index("## Relations") < context.index("## Source Passages")
+    assert "- LightRAG (concept): d d" in context
+    assert "- LightRAG → Graph: uses" in context
+    assert "[Page 3] word word\n\n[Page 7] word" in context
+
+
+def test_raw_context_is_used_verbatim():
+    result = RetrievalResult(question="q", mode="hybrid", raw_context="pre-rendered [Page 2]")
+    assert result.to_context() == "pre-rendered [Page 2]"
+    assert not result.is_empty
+    assert RetrievalResult(question="q", mode="hybrid").is_empty
+
+
+def test_budget_keeps_chunks_first_then_entities_then_relations(word_tokens):
+    result = RetrievalResult(
+        question="q",
+        mode="hybrid",
+        chunks=[_chunk(1, 8), _chunk(2, 8)],  # 10 tokens each, marker included
+        entities=[_entity("A", 3), _entity("B", 3)],  # 4 tokens each
+        relations=[_relation("A", "B")],  # 3 tokens
+    )
+    packed = _pack_budget(result, 30)
+
+    assert [c["content"][:8] for c in packed.chunks] == ["[Page 1]", "[Page 2]"]
+    assert [e["entity_name"] for e in packed.entities] == ["A", "B"]
+    assert packed.relations == []  # 28 used, 2 left
+    assert packed.tokens == 28
+
+
+def test_budget_stops_at_the_first_item_that_does_not_fit(word_tokens):
+    result = RetrievalResult(
+        question="q",
+        mode="hybrid",
+        chunks=[_chunk(1, 4), _chunk(2, 20), _chunk(3, 1)],
+    )
+    packed = _pack_budget(result, 12)
+
+    # Lower-ranked items are not pulled ahead of one that was cut
+    assert [c["content"][:8] for c in packed.chunks] == ["[Page 1]"]
+    assert packed.tokens == 6
+
+
+def test_raw_context_is_truncated_to_the_remaining_budget(word_tokens):
+    result = RetrievalResult(question="q", mode="hybrid", raw_context=" ".join(["w"] * 50))
+    packed = _pack_budget(result, 20)
+
+    assert len(packed.raw_context.split()) == 20
+    assert packed.tokens == 20
+
+
+class FakeRAG:
+    def __init__(self):
+        self.calls = 0
+
+    async def aquery_data(self, question, param=None):
+        self.calls += 1
+        return {
+            "data": {
+                "entities": [_entity("A", 3)],
+                "relationships": [_relation("A", "B")],
+                "chunks": [_chunk(1, 8), _chunk(2, 8)],
+            }
+        }
+
+
+@pytest.fixture
+def rag(tmp_path, monkeypatch, word_tokens):
+    fake = FakeRAG()
+
+    async def initialized(rag):
+        pass
+
+    monkeypatch.setattr(lightrag_service, "get_rag", lambda: fake)
+    monkeypatch.setattr(lightrag_service, "_ensure_initialized_async", initialized)
+    monkeypatch.setattr(lightrag_service, "get_graph_version", lambda: 5)
+    monkeypatch.setattr(query_cache, "QUERY_CACHE_DB", str(tmp_path / "rag_query_cache.db"))
+    monkeypatch.setattr(query_cache, "_db", None)
+    monkeypatch.setattr(query_cache, "_memory_cache", OrderedDict())
+    monkeypatch.setattr(query_cache, "_stats", {})
+    yield fake
+    if query_cache._db is not None:
+        query_cache._db.close()
+
+
+def test_retrieve_caches_the_full_result_and_packs_per_call(rag):
+    small = lightrag_service.retrieve("what is A?", mode="hybrid", token_budget=12)
+    large = lightrag_service.retrieve("what is A?", mode="hybrid", token_budget=100)
+
+    assert rag.calls == 1
+    assert len(small.chunks) == 1 and small.entities == []
+    assert len(large.chunks) == 2 and len(large.entities) == 1 and len(large.relations) == 1
+    assert large.tokens == 10 + 10 + 4 + 3
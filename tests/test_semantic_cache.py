@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+import config
+from services import chat_service, lightrag_service, semantic_cache
+
+VECTORS = {
+    "What is LightRAG?": [1.0, 0.0, 0.0],
+    "what's lightrag": [0.98, 0.2, 0.0],  # cosine ~0.98
+    "How do I install it?": [0.0, 1.0, 0.0],
+    "Tell me more": [0.0, 0.0, 1.0],
+}
+
+
+def _embed(texts):
+    rows = np.array([VECTORS[t] for t in texts], dtype="float32")
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(config, "SEMANTIC_CACHE_ENABLED", True)
+    monkeypatch.setattr(config, "SEMANTIC_CACHE_THRESHOLD", 0.92)
+    monkeypatch.setattr(lightrag_service, "embed_texts", _embed)
+    monkeypatch.setattr(semantic_cache, "_scopes", {})
+    monkeypatch.setattr(semantic_cache, "_entry_scope", {})
+    monkeypatch.setattr(
+        semantic_cache, "_stats", {"lookups": 0, "hits": 0, "misses": 0, "false_hits": 0, "stores": 0}
+    )
+    return semantic_cache
+
+
+def test_near_duplicate_question_hits(cache):
+    scope = cache.make_scope("m")
+    entry_id = cache.store("What is LightRAG?", scope, "A graph RAG engine.")
+    hit = cache.lookup("what's lightrag", scope)
+
+    assert hit["id"] == entry_id
+    assert hit["answer"] == "A graph RAG engine."
+    assert hit["question"] == "What is LightRAG?"
+    assert hit["similarity"] == pytest.approx(0.98, abs=0.01)
+
+
+def test_different_question_misses(cache):
+    scope = cache.make_scope("m")
+    cache.store("What is LightRAG?", scope, "A graph RAG engine.")
+    assert cache.lookup("How do I install it?", scope) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_scopes_are_isolated(cache):
+    cache.store("What is LightRAG?", cache.make_scope("m", "a.pdf"), "answer")
+    assert cache.lookup("What is LightRAG?", cache.make_scope("m", "b.pdf")) is None
+    assert cache.lookup("What is LightRAG?", cache.make_scope("other", "a.pdf")) is None
+
+
+def test_expired_entries_miss(cache, monkeypatch):
+    scope = cache.make_scope("m")
+    cache.store("What is LightRAG?", scope, "answer")
+    monkeypatch.setattr(cache, "CACHE_TTL", -1)
+    assert cache.lookup("What is LightRAG?", scope) is None
+
+
+def test_empty_answers_are_not_stored(cache):
+    assert cache.store("What is LightRAG?", cache.make_scope("m"), "") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_false_hit_drops_the_entry(cache):
+    scope = cache.make_scope("m")
+    entry_id = cache.store("What is LightRAG?", scope, "answer")
+    cache.report_false_hit(entry_id)
+
+    assert cache.lookup("What is LightRAG?", scope) is None
+    assert cache.stats()["false_hits"] == 1
+
+
+def test_oldest_entries_are_evicted(cache, monkeypatch):
+    monkeypatch.setattr(cache, "MAX_ENTRIES_PER_SCOPE", 2)
+    scope = cache.make_scope("m")
+    cache.store("What is LightRAG?", scope, "first")
+    cache.store("How do I install it?", scope, "second")
+    cache.store("Tell me more", scope, "third")
+
+    assert cache.lookup("What is LightRAG?", scope) is None
+    assert cache.lookup("Tell me more", scope)["answer"] == "third"
+
+
+def test_follow_ups_skip_the_tier(cache):
+    history = [{"role": "user", "content": "What is LightRAG?"}, {"role": "assistant", "content": "A graph RAG engine."}]
+    assert chat_service._semantic_scope("m", False, None, "hybrid", None, history) is None
+    assert chat_service._semantic_scope("m", False, None, "hybrid", None, []) is not None
+
+
+def test_document_scope_follows_the_graph_version(cache, monkeypatch):
+    monkeypatch.setattr(lightrag_service, "get_graph_version", lambda: 3)
+    before = chat_service._semantic_scope("m", True, None, "hybrid", None)
+    monkeypatch.setattr(lightrag_service, "get_graph_version", lambda: 4)
+    after = chat_service._semantic_scope("m", True, None, "hybrid", None)
+
+    assert before != after
+    assert before != chat_service._semantic_scope("m", False, None, "hybrid", None)
+
+
+def test_disabled_tier_has_no_scope(cache, monkeypatch):
+    monkeypatch.setattr(config, "SEMANTIC_CACHE_ENABLED", False)
+    assert chat_service._semantic_scope("m", False, None, "hybrid", None) is None
+
+
+def test_stream_answer_follow_up_is_not_served_from_cache(cache, monkeypatch):
+    scope = chat_service._semantic_scope("m", False, None, "hybrid", None)
+    cache.store("Tell me more", scope, "unrelated cached answer")
+    monkeypatch.setattr(config, "SWARM_MODE", "serial")
+    monkeypatch.setattr(chat_service, "_serial_swarm", lambda *a: iter([{"type": "chunk", "text": "fresh"}]))
+    history = [{"role": "user", "content": "What is LightRAG?"}, {"role": "assistant", "content": "A graph RAG engine."}]
+
+    events = list(chat_service.stream_answer("Tell me more", chat_history=history, model="m"))
+    assert not any(e["type"] == "cache_hit" for e in events)
+    assert "".join(e["text"] for e in events if e["type"] == "chunk") == "fresh"
@@ -0,0 +1,61 @@
+import pytest
+
+import config
+from core.smart_features import smart_rag_mode
+
+
+@pytest.fixture
+def bm25_on(monkeypatch):
+    monkeypatch.setattr(config, "BM25_ENABLED", True)
+
+
+def _mode_without_bm25(monkeypatch, question):
+    monkeypatch.setattr(config, "BM25_ENABLED", False)
+    try:
+        return smart_rag_mode(question)
+    finally:
+        monkeypatch.setattr(config, "BM25_ENABLED", True)
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        'Where is "zero trust onboarding" described?',
+        "What does ISO-27001 require for backups?",
+        "Explain error ERR1042",
+        "What changed in v2.1?",
+        "Does the report cover release 3.10.4?",
+        "Status of order 4481920",
+    ],
+)
+def test_exact_terms_pick_fusion(bm25_on, question):
+    assert smart_rag_mode(question) == "fusion"
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "What happened in 2024?",
+        "How did revenue change in Q3?",
+        "Tell me about GPT4 pricing",
+        "Is COVID-19 mentioned?",
+        "Is pi about 3.14 here?",
+    ],
+)
+def test_years_and_short_tokens_keep_their_mode(bm25_on, monkeypatch, question):
+    mode = smart_rag_mode(question)
+    assert mode != "fusion"
+    assert mode == _mode_without_bm25(monkeypatch, question)
+
+
+def test_year_question_stays_hybrid(bm25_on):
+    assert smart_rag_mode("What happened in 2024?") == "hybrid"
+
+
+def test_broad_questions_skip_fusion(bm25_on):
+    assert smart_rag_mode("Compare ISO-27001 and ISO-27002 overall") == "global"
+
+
+def test_fusion_needs_bm25(monkeypatch):
+    monkeypatch.setattr(config, "BM25_ENABLED", False)
+    assert smart_rag_mode("What does ISO-27001 require?") != "fusion"
@@ -0,0 +1,68 @@
+import pytest
+
+from utils import tokens
+
+
+class CharEncoder:
+    """Stand-in tiktoken encoding: one token per character."""
+
+    def encode_ordinary(self, text):
+        return [ord(c) for c in text]
+
+    def decode(self, ids):
+        return "".join(chr(i) for i in ids)
+
+
+@pytest.fixture
+def exact(monkeypatch):
+    monkeypatch.setattr(tokens, "encoder", lambda model=None: CharEncoder())
+
+
+@pytest.fixture
+def estimated(monkeypatch):
+    monkeypatch.setattr(tokens, "encoder", lambda model=None: None)
+
+
+def test_short_text_is_returned_unchanged(exact):
+    assert tokens.truncate_to_tokens("hello", 5, suffix="...") == "hello"
+
+
+def test_cut_includes_the_suffix(exact):
+    out = tokens.truncate_to_tokens("abcdefghij", 6, suffix="...")
+    assert out == "abc..."
+    assert len(CharEncoder().encode_ordinary(out)) == 6
+
+
+def test_suffix_longer_than_budget(exact):
+    assert tokens.truncate_to_tokens("abcdefghij", 2, suffix="...") == "..."
+
+
+def test_cut_inside_a_character_drops_the_replacement_tail(monkeypatch):
+    class ByteEncoder(CharEncoder):
+        def encode_ordinary(self, text):
+            return list(text.encode("utf-8"))
+
+        def decode(self, ids):
+            return bytes(ids).decode("utf-8", errors="replace")
+
+    monkeypatch.setattr(tokens, "encoder", lambda model=None: ByteEncoder())
+    assert tokens.truncate_to_tokens("aş", 2) == "a"  # "ş" is two bytes
+
+
+@pytest.mark.parametrize("text, max_tokens", [("", 10), ("abc", 0), ("abc", -1)])
+def test_empty_results(exact, text, max_tokens):
+    assert tokens.truncate_to_tokens(text, max_tokens) == ""
+
+
+def test_estimate_fallback_cuts_characters(estimated):
+    text = "x" * 100
+    assert tokens.truncate_to_tokens(text, 25) == text
+    out = tokens.truncate_to_tokens(text, 10, suffix="...")
+    assert out == "x" * 37 + "..."
+    assert len(out) == 10 * tokens.CHARS_PER_TOKEN
+
+
+def test_estimate_rounds_up():
+    assert tokens.estimate("") == 0
+    assert tokens.estimate("abc") == 1
+    assert tokens.estimate("abcde") == 2
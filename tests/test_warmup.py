@@ -0,0 +1,129 @@
+import json
+from collections import OrderedDict
+
+import pytest
+
+from services import lightrag_service, query_cache, reranker, warmup
+
+
+@pytest.fixture
+def fresh(monkeypatch):
+    """A process that has not warmed up yet."""
+    monkeypatch.setattr(warmup, "_thread", None)
+    monkeypatch.setattr(
+        warmup,
+        "_state",
+        {
+            "status": "cold",
+            "started_at": None,
+            "seconds": None,
+            "stages": {s: {"status": "pending", "seconds": None, "error": None} for s in warmup.STAGES},
+        },
+    )
+    monkeypatch.setattr(reranker, "enabled", lambda: False)
+    return warmup
+
+
+def _warm_up(monkeypatch, embed=None):
+    calls = []
+    monkeypatch.setattr(lightrag_service, "embed_texts", embed or (lambda texts: calls.append(texts)))
+    monkeypatch.setattr(lightrag_service, "get_rag", lambda: "rag")
+    monkeypatch.setattr(lightrag_service, "_ensure_initialized", lambda rag: calls.append(rag))
+    warmup.start()
+    warmup._thread.join(timeout=5)
+    return calls
+
+
+def test_start_runs_every_stage_once(fresh, monkeypatch):
+    calls = _warm_up(monkeypatch)
+    thread = warmup._thread
+    warmup.start()  # a rerun does not start a second thread
+
+    assert warmup._thread is thread
+    assert calls == [["warm up"], "rag"]
+    status = warmup.status()
+    assert status["status"] == "ready" and warmup.is_ready()
+    assert all(s["status"] == "ready" for s in status["stages"].values())
+
+
+def test_a_failed_stage_does_not_stop_the_others(fresh, monkeypatch):
+    def embed(texts):
+        raise RuntimeError("model download failed")
+
+    calls = _warm_up(monkeypatch, embed=embed)
+
+    status = warmup.status()
+    assert status["status"] == "failed" and not warmup.is_ready()
+    assert status["stages"]["embedding"]["error"] == "model download failed"
+    assert status["stages"]["rag"]["status"] == "ready"
+    assert calls == ["rag"]
+
+
+def test_only_the_first_query_is_recorded(fresh):
+    warmup.record_first_query(2.5)
+    warmup.record_first_query(0.1)
+
+    assert warmup.first_query_recorded()
+    with open(warmup.HISTORY_PATH, encoding="utf-8") as f:
+        history = json.load(f)
+    assert [(h["latency_s"], h["warm"]) for h in history] == [(2.5, False)]
+
+
+def test_latency_report_averages_cold_and_warm_runs(fresh):
+    with open(warmup.HISTORY_PATH, "w", encoding="utf-8") as f:
+        json.dump([{"latency_s": 4.0, "warm": False}, {"latency_s": 2.0, "warm": False}], f)
+    fresh._state["status"] = "ready"
+    warmup.record_first_query(0.5)
+
+    report = warmup.latency_report()
+    assert report["cold"] == {"runs": 2, "avg_s": 3.0}
+    assert report["warm"] == {"runs": 1, "avg_s": 0.5}
+    assert report["current"]["warm"] is True
+
+
+class FakeRAG:
+    async def aquery_data(self, question, param=None):
+        return {"data": {"entities": [], "relationships": [], "chunks": [{"content": "[Page 1] text"}]}}
+
+    async def aquery(self, question, param=None):
+        return "an answer"
+
+
+@pytest.fixture
+def rag(tmp_path, monkeypatch):
+    async def initialized(rag):
+        pass
+
+    monkeypatch.setattr(lightrag_service, "get_rag", FakeRAG)
+    monkeypatch.setattr(lightrag_service, "_ensure_initialized_async", initialized)
+    monkeypatch.setattr(lightrag_service, "get_graph_version", lambda: 1)
+    monkeypatch.setattr(query_cache, "QUERY_CACHE_DB", str(tmp_path / "rag_query_cache.db"))
+    monkeypatch.setattr(query_cache, "_db", None)
+    monkeypatch.setattr(query_cache, "_memory_cache", OrderedDict())
+    monkeypatch.setattr(query_cache, "_stats", {})
+    yield
+    if query_cache._db is not None:
+        query_cache._db.close()
+
+
+def test_query_cache_hits_are_not_timed_as_the_first_query(rag):
+    query_cache.put("cached question", "hybrid", 1, "cached answer")
+
+    assert lightrag_service.query("cached question") == "cached answer"
+    assert not warmup.first_query_recorded()
+
+    lightrag_service.query("new question")
+    assert warmup.first_query_recorded()
+
+
+@pytest.mark.parametrize(
+    "entry_point",
+    [
+        lambda: lightrag_service.retrieve("q"),
+        lambda: lightrag_service.query_many(["q"], context_only=True),
+        lambda: lightrag_service.query_many(["q"], context_only=False),
+    ],
+)
+def test_every_entry_point_records_the_first_query(rag, entry_point):
+    entry_point()
+    assert warmup.first_query_recorded()
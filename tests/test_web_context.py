@@ -0,0 +1,126 @@
+import threading
+import time
+from concurrent.futures import wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import config
+from services import web_context
+
+PARAGRAPH = "<p>" + "LightRAG keeps a knowledge graph next to the chunk vectors. " * 4 + "</p>\n"
+SLOW_S = 0.6
+
+
+class _Pages(BaseHTTPRequestHandler):
+    hits = {}
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        _Pages.hits[path] = _Pages.hits.get(path, 0) + 1
+        if path.startswith("/slow"):
+            time.sleep(SLOW_S)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.end_headers()
+        try:
+            if path.startswith("/big"):
+                for _ in range(20_000):  # ~5 MB of paragraphs
+                    self.wfile.write(PARAGRAPH.encode())
+            else:
+                self.wfile.write(f"<html><body>{PARAGRAPH}</body></html>".encode())
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client stopped reading early
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Pages.hits = {}
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Pages)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def web(tmp_path, monkeypatch, server):
+    monkeypatch.setattr(web_context, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(web_context, "CACHE_DB", str(tmp_path / "web_cache.db"))
+    monkeypatch.setattr(web_context, "_db", None)
+    yield web_context
+    wait(list(web_context._in_flight.values()))  # late fetches still write to this cache
+    if web_context._db is not None:
+        web_context._db.close()
+
+
+def _counter(name):
+    return web_context.stats()[name]
+
+
+def test_fetches_run_concurrently(web, server):
+    urls = [f"{server}/slow/{i}" for i in range(4)]
+    started = time.monotonic()
+    pages = web.fetch_many(urls, timeout=5)
+    elapsed = time.monotonic() - started
+
+    assert all(pages[url] and "knowledge graph" in pages[url] for url in urls)
+    assert elapsed < SLOW_S * 2  # serial would take 4 * SLOW_S
+
+
+def test_fetch_many_respects_timeout(web, server):
+    late = _counter("late")
+    started = time.monotonic()
+    pages = web.fetch_many([f"{server}/slow/late", f"{server}/fast"], timeout=0.2)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < SLOW_S
+    assert pages[f"{server}/slow/late"] is None
+    assert "knowledge graph" in pages[f"{server}/fast"]
+    assert _counter("late") == late + 1
+
+
+def test_late_page_falls_back_to_snippet(web, server):
+    results = [
+        {"title": "Slow", "href": f"{server}/slow/snippet", "body": "snippet of the slow page"},
+        {"title": "Fast", "href": f"{server}/fast", "body": "snippet of the fast page"},
+    ]
+    block = web.gather("what is lightrag", results=results, deadline=0.2)
+
+    assert block.startswith(web_context.HEADER)
+    assert "- Source: Slow\n  Info: snippet of the slow page" in block
+    assert f"- Source: Fast ({server}/fast)\n  Content: LightRAG keeps" in block
+
+
+def test_second_fetch_is_served_from_cache(web, server):
+    url = f"{server}/fast"
+    first = web.fetch_many([url], timeout=5)[url]
+    hits = _counter("cache_hits")
+    second = web.fetch_many([url], timeout=5)[url]
+
+    assert second == first
+    assert _counter("cache_hits") == hits + 1
+    assert _Pages.hits["/fast"] == 1
+    assert web.recent_fetches()[-1]["cached"] is True
+
+
+def test_download_stops_at_max_bytes(web, server, monkeypatch):
+    monkeypatch.setattr(config, "WEB_PAGE_CHARS", 10_000_000)
+    monkeypatch.setattr(config, "WEB_MAX_BYTES", 256 * 1024)
+    web.fetch(f"{server}/big/bytes")
+
+    record = web.recent_fetches()[-1]
+    assert record["error"] is None
+    assert 256 * 1024 <= record["bytes"] < 1024 * 1024  # the page is ~5 MB
+
+
+def test_download_stops_at_page_chars(web, server, monkeypatch):
+    monkeypatch.setattr(config, "WEB_PAGE_CHARS", 500)
+    text = web.fetch(f"{server}/big/chars")
+
+    assert len(text) == 500
+    assert web.recent_fetches()[-1]["bytes"] < 1024 * 1024
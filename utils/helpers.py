@@ -3,7 +3,8 @@ LunarTech AI - Yardımcı Fonksiyonlar
 """
 
 import re
-import tiktoken
+
+from utils import tokens
 
 
 def count_words(text: str) -> int:
@@ -11,13 +12,9 @@ def count_words(text: str) -> int:
     return len(text.split())
 
 
-def count_tokens(text: str, model: str = "gpt-4") -> int:
-    """Metindeki token sayısını döndürür (tiktoken ile)."""
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-    except KeyError:
-        encoding = tiktoken.get_encoding("cl100k_base")
-    return len(encoding.encode(text))
+def count_tokens(text: str, model: str = None) -> int:
+    """Metindeki token sayısını döndürür (model ailesinin önbellekli tiktoken encoder'ı ile)."""
+    return tokens.count(text, model)
 
 
 def truncate_text(text: str, max_chars: int = 50000) -> str:
@@ -0,0 +1,134 @@
+"""
+LunarTech AI — Token Accounting
+One cached tiktoken encoder per model family, batched counting, a cheap
+estimate for hot loops and token-accurate truncation. Models without a
+public tokenizer (Qwen, Gemini, Claude, Llama, ...) are counted with
+cl100k_base, which is close enough for budgeting. Without tiktoken (or its
+encoding files) every call falls back to the estimate.
+"""
+
+import functools
+import threading
+
+try:
+    import tiktoken
+
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+from utils import logger
+
+DEFAULT_ENCODING = "cl100k_base"
+CHARS_PER_TOKEN = 4  # estimate() ratio; ~±20% on English and Turkish prose
+_CACHE_MAX_CHARS = 8192  # only short, often repeated strings (templates) are memoised
+
+# Model id prefixes (provider prefix stripped) whose tokenizer tiktoken ships
+_FAMILIES = (
+    ("gpt-4o", "o200k_base"),
+    ("gpt-4.1", "o200k_base"),
+    ("gpt-5", "o200k_base"),
+    ("o1", "o200k_base"),
+    ("o3", "o200k_base"),
+    ("o4", "o200k_base"),
+    ("gpt-4", "cl100k_base"),
+    ("gpt-3.5", "cl100k_base"),
+)
+
+_warned = False
+_warn_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=256)
+def encoding_name(model: str = None) -> str:
+    """tiktoken encoding used to count tokens for `model`."""
+    name = (model or "").split("/")[-1].lower()
+    for prefix, encoding in _FAMILIES:
+        if name.startswith(prefix):
+            return encoding
+    return DEFAULT_ENCODING
+
+
+@functools.lru_cache(maxsize=None)
+def _load(name: str):
+    global _warned
+    if TIKTOKEN_AVAILABLE:
+        try:
+            return tiktoken.get_encoding(name)
+        except Exception as e:
+            error = str(e)
+    else:
+        error = "tiktoken is not installed"
+    with _warn_lock:
+        if not _warned:
+            _warned = True
+            logger.warning("Token counts are estimated", encoding=name, error=error)
+    return None
+
+
+def encoder(model: str = None):
+    """Shared encoder for the model's family, or None when only estimates are possible."""
+    return _load(encoding_name(model))
+
+
+# ── Counting ──────────────────────────────────────────────
+
+
+def estimate(text: str) -> int:
+    """Cheap character-based token estimate for hot loops; no encoding."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN if text else 0
+
+
+@functools.lru_cache(maxsize=1024)
+def _count_cached(text: str, name: str) -> int:
+    return len(_load(name).encode_ordinary(text))
+
+
+def count(text: str, model: str = None) -> int:
+    """Exact token count (special-token strings in the text are counted as plain text)."""
+    if not text:
+        return 0
+    name = encoding_name(model)
+    enc = _load(name)
+    if enc is None:
+        return estimate(text)
+    if len(text) <= _CACHE_MAX_CHARS:
+        return _count_cached(text, name)
+    return len(enc.encode_ordinary(text))
+
+
+def count_many(texts: list[str], model: str = None) -> list[int]:
+    """Token counts for many strings in one call (tiktoken encodes the batch in threads)."""
+    enc = encoder(model)
+    if enc is None:
+        return [estimate(t) for t in texts]
+    texts = [t or "" for t in texts]
+    if sum(len(t) for t in texts) < 20000:
+        # Below this, thread hand-off costs more than it saves
+        return [count(t, model) for t in texts]
+    return [len(ids) for ids in enc.encode_ordinary_batch(texts)]
+
+
+# ── Truncation ────────────────────────────────────────────
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = None, suffix: str = "") -> str:
+    """
+    Cuts text to at most max_tokens tokens (suffix included, appended only
+    when something was cut). Character cut at CHARS_PER_TOKEN without tiktoken.
+    """
+    if not text or max_tokens <= 0:
+        return ""
+    enc = encoder(model)
+    if enc is None:
+        limit = max_tokens * CHARS_PER_TOKEN
+        if len(text) <= limit:
+            return text
+        return text[: max(0, limit - len(suffix))] + suffix
+
+    ids = enc.encode_ordinary(text)
+    if len(ids) <= max_tokens:
+        return text
+    keep = max(0, max_tokens - (len(enc.encode_ordinary(suffix)) if suffix else 0))
+    # A cut inside a multi-byte character decodes to U+FFFD; drop that tail
+    return enc.decode(ids[:keep]).rstrip("�") + suffix